@@ -1,14 +1,39 @@
 from __future__ import annotations
 
 import json
+import sqlite3
 from dataclasses import asdict
 from typing import Any, Dict, List, Optional, Tuple
 
 import streamlit as st
 
-from services.openai_service import OpenAIService, StrategyResult
-from services.spotify_service import SpotifyService, TrackRow
-from utils.prompt_templates import build_strategy_prompt
+from services.metrics import METRICS, start_metrics_server
+from services.openai_service import (
+    OpenAIService,
+    StrategyResult,
+    TokenUsage,
+    strategy_from_json,
+    strategy_to_json,
+)
+from services.pipeline import (
+    STRATEGY_FALLBACK,
+    STRATEGY_LLM,
+    STRATEGY_LOCAL,
+    RecommendationRequest,
+    local_strategy,
+    strategy_within_budget,
+    strategy_key,
+    submit_llm_strategy,
+)
+from services.reranker import TargetProfile, target_profile
+from services.result_store import ResultStore, table_columns
+from services.cache_warmer import CacheWarmer
+from services.search_cache import SearchCache
+from services.shared_state import SharedState, make_shared_state
+from services.strategy_cache import StrategyCache
+from services.track_corpus import TrackCorpus
+from services.traffic_log import TrafficLog
+from services.spotify_service import SearchPrefetch, SpotifyService, TrackRow
 
 # -----------------------------
 # Secrets / Config
@@ -19,6 +44,19 @@ REQUIRED_SECRET_KEYS = (
     "SPOTIFY_CLIENT_SECRET",
 )
 
+# 선택 항목: ADMIN_TOKEN (?admin=<token> 으로 지표 패널 표시), METRICS_PORT (/metrics 노출),
+# CACHE_WARM_TOP_N (인기 입력 상위 N개 조합의 캐시를 백그라운드에서 미리 채움),
+# SHARED_STATE_URL (여러 워커/레플리카가 토큰·캐시 공유: sqlite:///.cache/shared.sqlite 또는 redis://host:6379/0)
+OPTIONAL_SECRET_KEYS = (
+    "ADMIN_TOKEN",
+    "METRICS_PORT",
+    "CACHE_WARM_TOP_N",
+    "SHARED_STATE_URL",
+)
+
+# 재시작/재배포 후에도 유지되는 로컬 캐시 디렉터리
+CACHE_DIR = ".cache"
+
 
 def load_secrets() -> Dict[str, str]:
     """
@@ -27,20 +65,21 @@ def load_secrets() -> Dict[str, str]:
     2) .env (local fallback)
     """
     # 1) st.secrets 우선
+    all_keys = REQUIRED_SECRET_KEYS + OPTIONAL_SECRET_KEYS
     secrets: Dict[str, str] = {}
-    for k in REQUIRED_SECRET_KEYS:
+    for k in all_keys:
         v = st.secrets.get(k) if hasattr(st, "secrets") else None
         if v:
             secrets[k] = str(v)
 
     # 2) .env fallback
-    if len(secrets) < len(REQUIRED_SECRET_KEYS):
+    if len(secrets) < len(all_keys):
         try:
             from dotenv import load_dotenv
             import os
 
             load_dotenv()
-            for k in REQUIRED_SECRET_KEYS:
+            for k in all_keys:
                 if k not in secrets:
                     v = os.getenv(k)
                     if v:
@@ -61,13 +100,198 @@ def validate_secrets(secrets: Dict[str, str]) -> Tuple[bool, List[str]]:
 # Cached service factories
 # -----------------------------
 @st.cache_resource(show_spinner=False)
-def get_openai_service(api_key: str) -> OpenAIService:
-    return OpenAIService(api_key=api_key)
+def get_shared_state(url: str) -> Optional[SharedState]:
+    return make_shared_state(url) if url else None
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_service(api_key: str, shared_url: str = "") -> OpenAIService:
+    return OpenAIService(
+        api_key=api_key,
+        strategy_cache=StrategyCache(
+            max_entries=256,
+            ttl_s=3600,
+            mood_similarity=0.9,
+            shared=get_shared_state(shared_url),
+            dumps=strategy_to_json,
+            loads=strategy_from_json,
+        ),
+        # 최근 응답 p95를 넘기면(최소 8초) 예비 요청 1개
+        hedge_quantile=0.95,
+        hedge_min_s=8.0,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_spotify_service(client_id: str, client_secret: str, shared_url: str = "") -> SpotifyService:
+    shared = get_shared_state(shared_url)
+    return SpotifyService(
+        client_id=client_id,
+        client_secret=client_secret,
+        search_cache=SearchCache(path=f"{CACHE_DIR}/spotify_search.sqlite", shared=shared),
+        track_corpus=TrackCorpus(path=f"{CACHE_DIR}/track_corpus.sqlite"),
+        shared_state=shared,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_result_store() -> ResultStore:
+    return ResultStore(max_entries=2000, ttl_s=6 * 3600)
+
+
+@st.cache_resource(show_spinner=False)
+def get_traffic_log() -> TrafficLog:
+    return TrafficLog(path=f"{CACHE_DIR}/traffic.sqlite")
+
+
+@st.cache_resource(show_spinner=False)
+def start_cache_warmer(
+    openai_key: str, client_id: str, client_secret: str, top_n: int, shared_url: str = ""
+) -> CacheWarmer:
+    # 프로세스당 1회: 시작 직후 + 10분마다, 주기당 OpenAI 10회 / Spotify 120회 이하
+    warmer = CacheWarmer(
+        get_openai_service(openai_key, shared_url),
+        get_spotify_service(client_id, client_secret, shared_url),
+        get_traffic_log(),
+        top_n=top_n,
+    )
+    warmer.start()
+    return warmer
 
 
 @st.cache_resource(show_spinner=False)
-def get_spotify_service(client_id: str, client_secret: str) -> SpotifyService:
-    return SpotifyService(client_id=client_id, client_secret=client_secret)
+def start_metrics_exporter(port: int) -> bool:
+    # 프로세스당 1회: /metrics (Prometheus text), /metrics.json
+    return start_metrics_server(port) is not None
+
+
+# -----------------------------
+# Render helpers
+# -----------------------------
+# 점진 표시 시 몇 곡마다 테이블을 갱신할지
+TABLE_BATCH_SIZE = 5
+# 에너지/톤 재정렬 시 목표 곡 수의 몇 배를 후보로 모을지
+RERANK_POOL = 2
+
+# 전략 생성 방식 (즉시 = 로컬 전략으로 먼저 보여주고 AI 전략이 오면 교체)
+STRATEGY_INSTANT = "instant"
+STRATEGY_MODE_LABELS = {
+    STRATEGY_FALLBACK: "AI (늦으면 기본 규칙으로 대체)",
+    STRATEGY_INSTANT: "즉시 (기본 규칙 → AI로 다듬기)",
+    STRATEGY_LOCAL: "기본 규칙만 (AI 미사용)",
+}
+# 이 시간 안에 AI 전략이 오지 않으면 로컬 전략 사용 (AI 호출은 백그라운드에서 계속 → 전략 캐시에 저장)
+LLM_BUDGET_S = 12.0
+
+
+def render_strategy_card(strategy: StrategyResult, source: str = STRATEGY_LLM) -> None:
+    st.subheader("🧠 AI 해석 카드" if source == STRATEGY_LLM else "⚡ 빠른 추천 카드 (기본 규칙)")
+    c1, c2 = st.columns([2, 1])
+
+    with c1:
+        st.markdown(
+            f"""
+            <div style="padding:16px;border-radius:16px;border:1px solid rgba(255,255,255,0.15);">
+              <div style="font-size:18px;font-weight:700;margin-bottom:8px;">{strategy.playlist_theme}</div>
+              <div style="opacity:0.9;"><b>요약</b>: {strategy.mood_summary}</div>
+              <div style="opacity:0.9;margin-top:6px;"><b>이유</b>: {strategy.reason}</div>
+            </div>
+            """,
+            unsafe_allow_html=True,
+        )
+
+    with c2:
+        st.write("**keywords**")
+        st.write(strategy.keywords)
+        st.write("**seed_genres**")
+        st.write(strategy.seed_genres)
+
+    st.download_button(
+        label="⬇️ 전략 JSON 다운로드",
+        data=json.dumps(asdict(strategy), ensure_ascii=False, indent=2).encode("utf-8"),
+        file_name="playlist_strategy.json",
+        mime="application/json",
+        use_container_width=True,
+        # 즉시 모드는 한 번의 실행에서 카드를 두 번 그리므로 출처별로 구분
+        key=f"download_strategy_{source}",
+    )
+
+
+def search_and_render(
+    spotify_svc: SpotifyService,
+    strategy: StrategyResult,
+    table_slot: Any,
+    market: str,
+    n_tracks: int,
+    allow_explicit: bool,
+    target: Optional[TargetProfile],
+    progressive: bool,
+    prefetch: Optional[SearchPrefetch],
+) -> List[TrackRow]:
+    """곡을 찾는 대로 table_slot에 배치 단위로 그리고, 최종 곡 목록을 반환"""
+    candidates: List[TrackRow] = []
+    # audio-features가 막힌 앱(403)은 재정렬 근거가 없으므로 후보를 늘리지 않는다
+    expand = target is not None and spotify_svc.features_available
+    for t in spotify_svc.iter_tracks_from_strategy(
+        strategy=strategy,
+        market=market,
+        target_count=n_tracks * RERANK_POOL if expand else n_tracks,
+        allow_explicit=allow_explicit,
+        concurrent=True,
+        prefetch=prefetch,
+    ):
+        candidates.append(t)
+        # 점진 표시는 검색 순서 기준 앞쪽 n곡까지만 (재정렬 후 최종 순서로 교체)
+        if progressive and len(candidates) <= n_tracks and len(candidates) % TABLE_BATCH_SIZE == 0:
+            table_slot.dataframe(table_columns(candidates), use_container_width=True, hide_index=True)
+
+    tracks = candidates[:n_tracks]
+    if target is not None:
+        tracks = spotify_svc.rerank_tracks(candidates, target, limit=n_tracks)
+    table_slot.dataframe(table_columns(tracks), use_container_width=True, hide_index=True)
+    return tracks
+
+
+@st.fragment
+def render_results() -> None:
+    """
+    지난 결과를 다시 그린다 (fragment: 내부 위젯 조작 시 이 부분만 재실행).
+    세션에는 handle만 있고, 전략/곡은 프로세스 전역 ResultStore에서 컬럼 단위로 바로 읽는다.
+    """
+    store = get_result_store()
+    result = store.get(st.session_state.get("last_result"))
+    if result is None:
+        return
+
+    render_strategy_card(result.strategy, result.source)
+    if result.track_ids:
+        st.subheader("🎧 추천 곡")
+        st.dataframe(
+            table_columns(store.tracks(result)),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+@st.fragment(run_every=5)
+def render_admin_metrics() -> None:
+    """관리자 전용 실시간 지표 (5초마다 이 부분만 갱신)"""
+    snapshot = METRICS.to_dict()
+    st.caption(f"uptime {snapshot['uptime_s']}s")
+    st.write("**단계별 지연 (ms)**")
+    st.dataframe(
+        [{"stage": name, **stats} for name, stats in snapshot["stages"].items()],
+        use_container_width=True,
+        hide_index=True,
+    )
+    st.write("**카운터**")
+    st.json(snapshot["counters"], expanded=False)
+    st.write("**현재값** (spotify_scheduler_queue_depth = Spotify 요청 대기열)")
+    st.json(snapshot["gauges"], expanded=False)
+    last_usage = st.session_state.get("last_openai_usage")
+    if last_usage:
+        st.write("**마지막 요청 OpenAI 토큰** (cached = 프롬프트 캐시 적중분, 접두부가 1024토큰 이상일 때만)")
+        st.dataframe(last_usage, use_container_width=True, hide_index=True)
 
 
 # -----------------------------
@@ -105,11 +329,45 @@ with st.sidebar:
 
     allow_explicit = st.toggle("Explicit 허용 여부", value=False)
 
+    strategy_mode = st.selectbox(
+        "전략 생성 방식",
+        options=list(STRATEGY_MODE_LABELS),
+        format_func=STRATEGY_MODE_LABELS.get,
+        index=0,
+        help="기본 규칙은 입력값(장르/에너지/톤/상황)만으로 즉시 검색 전략을 만듭니다.",
+    )
+
+    rerank = st.toggle(
+        "에너지/톤 맞춤 정렬",
+        value=True,
+        help="후보 곡의 audio features(에너지/밝기/템포)를 입력값과 비교해 가까운 순으로 정렬합니다.",
+    )
+
+    progressive = st.toggle(
+        "결과 점진 표시",
+        value=True,
+        help="전략이 나오면 바로 카드를 보여주고, 곡은 찾는 대로 표에 추가합니다.",
+    )
+
+    force_fresh = st.toggle(
+        "새 전략 강제 생성",
+        value=False,
+        help="같은 입력으로 최근에 만든 전략이 있어도 AI에게 다시 요청합니다.",
+    )
+
     if st.button("🔄 설정 초기화"):
         for k in list(st.session_state.keys()):
             del st.session_state[k]
         st.rerun()
 
+    admin_token = secrets.get("ADMIN_TOKEN")
+    if admin_token and st.query_params.get("admin") == admin_token:
+        with st.expander("📊 파이프라인 지표", expanded=False):
+            render_admin_metrics()
+
+if secrets.get("METRICS_PORT"):
+    start_metrics_exporter(int(secrets["METRICS_PORT"]))
+
 if not ok:
     st.error(
         "필수 Secrets가 누락되었습니다. 아래 키를 설정하세요:\n\n"
@@ -118,14 +376,23 @@ if not ok:
     st.info("Streamlit Cloud에서는 Advanced settings → Secrets에 등록하세요. (README 참고)")
     st.stop()
 
+if secrets.get("CACHE_WARM_TOP_N"):
+    start_cache_warmer(
+        secrets["OPENAI_API_KEY"],
+        secrets["SPOTIFY_CLIENT_ID"],
+        secrets["SPOTIFY_CLIENT_SECRET"],
+        int(secrets["CACHE_WARM_TOP_N"]),
+        secrets.get("SHARED_STATE_URL", ""),
+    )
+
 # Session defaults
 st.session_state.setdefault("mood_text", "")
 st.session_state.setdefault("context_text", "")
 st.session_state.setdefault("genres", [])
 st.session_state.setdefault("energy", 5)
 st.session_state.setdefault("tone", "밝고 신나는")
-st.session_state.setdefault("last_strategy", None)
-st.session_state.setdefault("last_tracks", None)
+st.session_state.setdefault("last_result", None)
+st.session_state.setdefault("last_openai_usage", None)
 
 col1, col2 = st.columns(2)
 
@@ -189,103 +456,94 @@ if run:
     st.session_state["energy"] = energy
     st.session_state["tone"] = tone
 
-    openai_svc = get_openai_service(secrets["OPENAI_API_KEY"])
-    spotify_svc = get_spotify_service(secrets["SPOTIFY_CLIENT_ID"], secrets["SPOTIFY_CLIENT_SECRET"])
+    shared_url = secrets.get("SHARED_STATE_URL", "")
+    openai_svc = get_openai_service(secrets["OPENAI_API_KEY"], shared_url)
+    spotify_svc = get_spotify_service(secrets["SPOTIFY_CLIENT_ID"], secrets["SPOTIFY_CLIENT_SECRET"], shared_url)
 
-    prompt = build_strategy_prompt(
+    req = RecommendationRequest(
         mood_text=mood_text,
         context_text=context_text,
-        preferred_genres=genres,
+        genres=list(genres),
         energy=energy,
         tone=tone,
         market=market,
         allow_explicit=allow_explicit,
         n_tracks=n_tracks,
+        model=model,
     )
 
-    with st.spinner("AI가 추천 전략을 만들고 있어요..."):
-        try:
-            strategy: StrategyResult = openai_svc.generate_strategy_json(
-                model=model,
-                prompt=prompt,
-                max_retries=2,
+    # 캐시 미리 채우기 대상 선정용 입력 빈도 기록
+    try:
+        get_traffic_log().record(strategy_key(req), asdict(req))
+    except sqlite3.Error:
+        METRICS.inc("traffic_log_errors")
+
+    # LLM이 search_queries를 하나씩 완성할 때마다 Spotify 검색을 미리 시작
+    prefetch = spotify_svc.start_prefetch(market=market)
+    # on_usage는 백그라운드/hedge 워커 스레드에서 불리므로 session_state 대신 지역 리스트에 모은다
+    usage: List[TokenUsage] = []
+
+    # 이번 실행 결과는 아래 영역에 바로바로 그린다 (전략 → 카드, 검색 → 표에 배치 단위로 추가)
+    results_area = st.container()
+    with results_area:
+        card_slot = st.empty()
+        st.subheader("🎧 추천 곡")
+        table_slot = st.empty()
+
+    def show(strategy: StrategyResult, source: str, search_prefetch: Optional[SearchPrefetch]) -> None:
+        with card_slot.container():
+            render_strategy_card(strategy, source)
+
+        with st.spinner("Spotify에서 곡을 찾는 중..."):
+            try:
+                tracks = search_and_render(
+                    spotify_svc,
+                    strategy,
+                    table_slot,
+                    market=market,
+                    n_tracks=n_tracks,
+                    allow_explicit=allow_explicit,
+                    target=target_profile(energy, tone) if rerank else None,
+                    progressive=progressive,
+                    prefetch=search_prefetch,
+                )
+                # 세션에는 handle만: 이전 결과는 바로 반납해 공유 곡 풀에서 정리되게 한다
+                store = get_result_store()
+                store.discard(st.session_state.get("last_result"))
+                st.session_state["last_result"] = store.put(strategy, source, tracks)
+            except Exception as e:
+                st.error("Spotify 검색에 실패했습니다. 인증/Secrets/market 설정을 확인해 주세요.")
+                st.exception(e)
+                st.stop()
+
+    try:
+        if strategy_mode == STRATEGY_LOCAL:
+            show(local_strategy(req), STRATEGY_LOCAL, prefetch)
+
+        elif strategy_mode == STRATEGY_INSTANT:
+            # 로컬 전략으로 먼저 채우고, 그동안 LLM 전략을 만들어 도착하면 교체
+            pending = submit_llm_strategy(
+                openai_svc, req, force_fresh=force_fresh, on_query=prefetch.submit, on_usage=usage.append
             )
-            st.session_state["last_strategy"] = asdict(strategy)
-        except Exception as e:
-            st.error("AI 전략 생성에 실패했습니다. 입력을 조금 바꾸거나 잠시 후 다시 시도해 주세요.")
-            st.exception(e)
-            st.stop()
-
-    with st.spinner("Spotify에서 곡을 찾는 중..."):
-        try:
-            tracks: List[TrackRow] = spotify_svc.search_tracks_from_strategy(
-                strategy=strategy,
-                market=market,
-                target_count=n_tracks,
-                allow_explicit=allow_explicit,
+            first = local_strategy(req)
+            show(first, STRATEGY_LOCAL, None)
+            with st.spinner("AI가 전략을 다듬고 있어요..."):
+                refined, source = strategy_within_budget(pending, req, LLM_BUDGET_S)
+            if source == STRATEGY_LLM and refined != first:
+                show(refined, STRATEGY_LLM, prefetch)
+
+        else:
+            pending = submit_llm_strategy(
+                openai_svc, req, force_fresh=force_fresh, on_query=prefetch.submit, on_usage=usage.append
             )
-            st.session_state["last_tracks"] = [t.to_dict() for t in tracks]
-        except Exception as e:
-            st.error("Spotify 검색에 실패했습니다. 인증/Secrets/market 설정을 확인해 주세요.")
-            st.exception(e)
-            st.stop()
-
-# -----------------------------
-# Render Results (session_state 유지)
-# -----------------------------
-strategy_data: Optional[Dict[str, Any]] = st.session_state.get("last_strategy")
-tracks_data: Optional[List[Dict[str, Any]]] = st.session_state.get("last_tracks")
-
-if strategy_data:
-    st.subheader("🧠 AI 해석 카드")
-    c1, c2 = st.columns([2, 1])
-
-    with c1:
-        st.markdown(
-            f"""
-            <div style="padding:16px;border-radius:16px;border:1px solid rgba(255,255,255,0.15);">
-              <div style="font-size:18px;font-weight:700;margin-bottom:8px;">{strategy_data.get("playlist_theme","")}</div>
-              <div style="opacity:0.9;"><b>요약</b>: {strategy_data.get("mood_summary","")}</div>
-              <div style="opacity:0.9;margin-top:6px;"><b>이유</b>: {strategy_data.get("reason","")}</div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-    with c2:
-        st.write("**keywords**")
-        st.write(strategy_data.get("keywords", []))
-        st.write("**seed_genres**")
-        st.write(strategy_data.get("seed_genres", []))
-
-    st.download_button(
-        label="⬇️ 전략 JSON 다운로드",
-        data=json.dumps(strategy_data, ensure_ascii=False, indent=2).encode("utf-8"),
-        file_name="playlist_strategy.json",
-        mime="application/json",
-        use_container_width=True,
-    )
-
-if tracks_data:
-    st.subheader("🎧 추천 곡")
-    # 순번 컬럼 보장
-    table_rows = []
-    for i, row in enumerate(tracks_data, start=1):
-        row = dict(row)
-        row["순번"] = i
-        table_rows.append(
-            {
-                "순번": row["순번"],
-                "곡명": row.get("track_name", ""),
-                "아티스트": row.get("artist_name", ""),
-                "앨범": row.get("album_name", ""),
-                "preview_url": row.get("preview_url", "미리듣기 없음"),
-                "spotify_url": row.get("spotify_url", ""),
-            }
-        )
-
-    st.dataframe(
-        table_rows,
-        use_container_width=True,
-        hide_index=True,
-    )
+            with st.spinner("AI가 추천 전략을 만들고 있어요..."):
+                strategy, source = strategy_within_budget(pending, req, LLM_BUDGET_S)
+            if source == STRATEGY_LOCAL:
+                st.info("AI 응답이 늦거나 실패해 기본 규칙 전략으로 추천했어요. 잠시 후 다시 시도하면 AI 전략을 받을 수 있어요.")
+            show(strategy, source, prefetch)
+    finally:
+        prefetch.close()
+        st.session_state["last_openai_usage"] = [asdict(u) for u in usage]
+else:
+    # 이전 결과 (session_state 유지)
+    render_results()
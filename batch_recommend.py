@@ -0,0 +1,318 @@
+"""
+헤드리스 배치 추천: JSONL 입력 → (build_strategy_prompt → OpenAIService → SpotifyService) → JSONL 출력.
+
+입력 한 줄 예:
+    {"id": "c-001", "mood": "설레요", "context": "퇴근길", "genres": ["k-pop"], "energy": 7,
+     "tone": "밝고 신나는", "market": "KR", "explicit": false, "n_tracks": 20}
+
+    python batch_recommend.py campaign.jsonl -o playlists.jsonl --workers 8 --resume
+
+- 출력 파일이 곧 체크포인트: --resume 시 이미 성공(ok=true)한 레코드는 건너뛴다
+- JSON으로 읽을 수 없는 입력 줄은 {"id": "line-N", "ok": false, "error": ...}로 기록하고 계속 진행
+- 진행/처리량 요약은 stderr로 출력
+- --async: asyncio 서비스(이벤트 루프 1개)로 실행. 네트워크 대기가 루프에서 겹치므로 --workers를 크게 잡아도
+  스레드는 결과만 기다린다 (HTTP 세션/재시도 대기를 스레드마다 붙잡지 않음)
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from services.openai_service import OpenAIService, StrategyResult, TokenUsage
+from services.pipeline import STRATEGY_LLM, STRATEGY_MODES, RecommendationRequest, run_recommendation
+from services.rate_limiter import RequestScheduler
+from services.search_cache import SearchCache
+from services.spotify_service import SpotifyService, TrackRow
+from services.strategy_cache import StrategyCache
+from services.track_corpus import TrackCorpus
+
+REQUIRED_ENV_KEYS = (
+    "OPENAI_API_KEY",
+    "SPOTIFY_CLIENT_ID",
+    "SPOTIFY_CLIENT_SECRET",
+)
+
+CACHE_DIR = ".cache"
+
+
+def load_env_secrets() -> Dict[str, str]:
+    # app.py와 같은 키, 배치는 .env / 환경변수만 사용
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except Exception:
+        pass
+    return {k: os.environ[k] for k in REQUIRED_ENV_KEYS if os.environ.get(k)}
+
+
+def record_key(record: Dict[str, Any], line_no: int) -> str:
+    return str(record.get("id", f"line-{line_no}"))
+
+
+def to_request(record: Dict[str, Any], model: str) -> RecommendationRequest:
+    return RecommendationRequest(
+        mood_text=str(record.get("mood", "")),
+        context_text=str(record.get("context", "")),
+        genres=[str(g) for g in record.get("genres") or []],
+        energy=int(record.get("energy", 5)),
+        tone=str(record.get("tone", "밝고 신나는")),
+        market=str(record.get("market", "KR")),
+        allow_explicit=bool(record.get("explicit", False)),
+        n_tracks=int(record.get("n_tracks", 10)),
+        model=str(record.get("model", model)),
+    )
+
+
+def read_done_keys(path: str) -> Set[str]:
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                # 중단 시점에 잘린 마지막 줄
+                continue
+            if rec.get("ok"):
+                done.add(str(rec.get("id")))
+    return done
+
+
+def iter_records(
+    path: str,
+    skip: Set[str],
+    on_invalid: Optional[Callable[[int, str, str], None]] = None,
+) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    """깨진 줄은 건너뛰고 on_invalid(line_no, key, error)로 알린다 (한 줄 때문에 배치 전체가 멈추지 않도록)"""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"JSON 객체가 아닙니다: {type(record).__name__}")
+            except ValueError as e:
+                key = f"line-{line_no}"
+                if on_invalid is not None and key not in skip:
+                    on_invalid(line_no, key, f"{type(e).__name__}: {e}")
+                continue
+            key = record_key(record, line_no)
+            if key in skip:
+                continue
+            yield line_no, key, record
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class BatchRunner:
+    """recommend: run_recommendation(openai, spotify, ·) 부분 적용 또는 AsyncRecommender.run (같은 키워드 인자)"""
+
+    def __init__(
+        self,
+        recommend: Callable[..., Tuple[StrategyResult, List[TrackRow]]],
+        scheduler: RequestScheduler,
+        model: str,
+        out: Any,
+        stream: bool,
+        strategy_mode: str = STRATEGY_LLM,
+    ) -> None:
+        self._recommend = recommend
+        self._scheduler = scheduler
+        self._model = model
+        self._out = out
+        self._stream = stream
+        self._strategy_mode = strategy_mode
+        self._write_lock = threading.Lock()
+        self.latencies_ms: List[float] = []
+        self.succeeded = 0
+        self.failed = 0
+        self.tokens = {"input": 0, "cached": 0, "output": 0}
+        self.ttft_ms: List[float] = []
+
+    def process(self, line_no: int, key: str, record: Dict[str, Any]) -> None:
+        t0 = time.perf_counter()
+        out: Dict[str, Any] = {"id": key, "line": line_no}
+        usage: List[TokenUsage] = []
+        try:
+            req = to_request(record, self._model)
+            strategy, tracks = self._recommend(
+                req,
+                stream=self._stream,
+                on_usage=usage.append,
+                strategy_mode=self._strategy_mode,
+            )
+            out.update(ok=True, strategy=asdict(strategy), tracks=[t.to_dict() for t in tracks])
+            # 전략 캐시 적중이면 OpenAI 호출이 없어 비어 있다
+            out["openai_usage"] = [asdict(u) for u in usage]
+        except Exception as e:
+            out.update(ok=False, error=f"{type(e).__name__}: {e}")
+        self._write(out, (time.perf_counter() - t0) * 1000, usage)
+
+    def record_invalid(self, line_no: int, key: str, error: str) -> None:
+        """입력 줄 자체를 읽지 못한 경우: 실패 레코드만 남기고 다음 줄로"""
+        self._write({"id": key, "line": line_no, "ok": False, "error": error}, 0.0, [])
+
+    def _write(self, out: Dict[str, Any], elapsed: float, usage: List[TokenUsage]) -> None:
+        out["elapsed_ms"] = round(elapsed, 1)
+        line = json.dumps(out, ensure_ascii=False)
+        with self._write_lock:
+            self._out.write(line + "\n")
+            self._out.flush()
+            if out["ok"]:
+                self.succeeded += 1
+                self.latencies_ms.append(elapsed)
+            else:
+                self.failed += 1
+            for u in usage:
+                self.tokens["input"] += u.input_tokens
+                self.tokens["cached"] += u.cached_tokens
+                self.tokens["output"] += u.output_tokens
+                self.ttft_ms.append(u.ttft_s * 1000)
+
+    def summary(self, wall_s: float, skipped: int) -> Dict[str, Any]:
+        lat = sorted(self.latencies_ms)
+        done = self.succeeded + self.failed
+
+        def pct(p: float) -> float:
+            return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))], 1) if lat else 0.0
+
+        return {
+            "processed": done,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped_resume": skipped,
+            "wall_s": round(wall_s, 2),
+            "records_per_s": round(done / wall_s, 3) if wall_s else 0.0,
+            "records_per_hour": round(done / wall_s * 3600) if wall_s else 0,
+            "latency_ms": {"p50": pct(50), "p95": pct(95), "p99": pct(99)},
+            "openai_tokens": {
+                **self.tokens,
+                "cached_ratio": round(self.tokens["cached"] / self.tokens["input"], 3) if self.tokens["input"] else 0.0,
+                "ttft_ms_p50": round(sorted(self.ttft_ms)[len(self.ttft_ms) // 2], 1) if self.ttft_ms else 0.0,
+            },
+            "spotify_scheduler": self._scheduler.stats(),
+        }
+
+
+def run_batch(runner: BatchRunner, records: Iterator[Tuple[int, str, Dict[str, Any]]], workers: int) -> None:
+    # 제출 창을 workers*2로 제한: 수천 줄 입력도 메모리에 한꺼번에 올리지 않는다
+    window = max(1, workers * 2)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as ex:
+        pending: Set[Future] = set()
+        for line_no, key, record in records:
+            pending.add(ex.submit(runner.process, line_no, key, record))
+            if len(pending) >= window:
+                _, pending = wait(pending, return_when=FIRST_COMPLETED)
+        wait(pending)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("input", help="입력 JSONL (- = stdin)")
+    ap.add_argument("-o", "--output", required=True, help="출력 JSONL (체크포인트 겸용)")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--resume", action="store_true", help="출력 파일에서 성공한 레코드는 건너뜀")
+    ap.add_argument("--max-in-flight", type=int, default=8, help="Spotify 동시 요청 상한")
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--no-stream", action="store_true", help="전략 스트리밍/미리 검색 끄기")
+    ap.add_argument(
+        "--strategy-mode",
+        choices=STRATEGY_MODES,
+        default=STRATEGY_LLM,
+        help="llm=AI 응답 대기, fallback=예산 초과 시 기본 규칙, local=기본 규칙만",
+    )
+    ap.add_argument("--async", dest="use_async", action="store_true", help="asyncio 서비스(이벤트 루프 1개)로 실행")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    secrets = load_env_secrets()
+    missing = [k for k in REQUIRED_ENV_KEYS if k not in secrets]
+    if missing:
+        print(f"필수 환경변수 누락: {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    strategy_cache = None if args.no_cache else StrategyCache(max_entries=4096)
+    scheduler = RequestScheduler()
+
+    def search_cache() -> Optional[SearchCache]:
+        return None if args.no_cache else SearchCache(path=f"{CACHE_DIR}/spotify_search.sqlite")
+
+    def track_corpus() -> Optional[TrackCorpus]:
+        return None if args.no_cache else TrackCorpus(path=f"{CACHE_DIR}/track_corpus.sqlite")
+
+    close: Callable[[], None]
+    if args.use_async:
+        # httpx/AsyncOpenAI는 --async일 때만 필요
+        from services.async_openai_service import AsyncOpenAIService
+        from services.async_runner import AsyncRecommender
+        from services.async_spotify_service import AsyncSpotifyService
+
+        recommender = AsyncRecommender(
+            lambda: AsyncOpenAIService(api_key=secrets["OPENAI_API_KEY"], strategy_cache=strategy_cache),
+            lambda: AsyncSpotifyService(
+                client_id=secrets["SPOTIFY_CLIENT_ID"],
+                client_secret=secrets["SPOTIFY_CLIENT_SECRET"],
+                max_in_flight=args.max_in_flight,
+                search_cache=search_cache(),
+                scheduler=scheduler,
+                track_corpus=track_corpus(),
+            ),
+        )
+        recommend: Callable[..., Tuple[StrategyResult, List[TrackRow]]] = recommender.run
+        close = recommender.close
+    else:
+        openai_svc = OpenAIService(api_key=secrets["OPENAI_API_KEY"], strategy_cache=strategy_cache)
+        spotify_svc = SpotifyService(
+            client_id=secrets["SPOTIFY_CLIENT_ID"],
+            client_secret=secrets["SPOTIFY_CLIENT_SECRET"],
+            max_in_flight=args.max_in_flight,
+            search_cache=search_cache(),
+            scheduler=scheduler,
+            track_corpus=track_corpus(),
+        )
+        recommend = functools.partial(run_recommendation, openai_svc, spotify_svc)
+        close = spotify_svc.close
+
+    done = read_done_keys(args.output) if args.resume else set()
+    mode = "a" if args.resume else "w"
+    t0 = time.perf_counter()
+    with open(args.output, mode, encoding="utf-8") as out:
+        runner = BatchRunner(
+            recommend,
+            scheduler,
+            model=args.model,
+            out=out,
+            stream=not args.no_stream,
+            strategy_mode=args.strategy_mode,
+        )
+        try:
+            records = iter_records(args.input, skip=done, on_invalid=runner.record_invalid)
+            run_batch(runner, records, workers=max(1, args.workers))
+        except KeyboardInterrupt:
+            print("중단됨: --resume 으로 이어서 실행할 수 있습니다.", file=sys.stderr)
+        summary = runner.summary(time.perf_counter() - t0, skipped=len(done))
+    close()
+
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 0 if runner.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Spotify 검색 응답 디코딩 마이크로 벤치마크: 응답 1건당 CPU 시간과 최대 메모리.
+- before: resp.json() 전체 파싱 + .get 체인으로 TrackRow + 캐시/코퍼스용 dataclasses.astuple
+- lean_json / lean_orjson: spotify_decode.search_track_fields (+ TrackRow.to_tuple)
+- 최대 메모리는 tracemalloc 기준 (Python 객체 할당만 잡히고 orjson 내부 버퍼는 제외)
+
+    python -m benchmarks.bench_decode --payloads 40 --repeat 20
+    python -m benchmarks.bench_decode --payload-dir recorded/   # 실제 응답 본문(*.json)
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+import tracemalloc
+from dataclasses import astuple
+from typing import Any, Callable, Dict, List
+
+from benchmarks.stub_servers import make_search_payload
+from services.spotify_decode import orjson, search_track_fields
+from services.spotify_service import TrackRow
+
+
+def decode_before(body: bytes) -> List[Any]:
+    # 변경 전 _fetch_search와 동일한 처리
+    data = json.loads(body.decode("utf-8"))
+    items = (data.get("tracks") or {}).get("items") or []
+    rows: List[TrackRow] = []
+    for it in items:
+        track_id = it.get("id") or ""
+        name = it.get("name") or ""
+        artists = it.get("artists") or []
+        artist_name = artists[0].get("name") if artists else ""
+        album = it.get("album") or {}
+        album_name = album.get("name") or ""
+        preview_url = it.get("preview_url") or "미리듣기 없음"
+        spotify_url = ((it.get("external_urls") or {}).get("spotify")) or ""
+        explicit = bool(it.get("explicit", False))
+        if track_id and spotify_url:
+            rows.append(TrackRow(track_id, name, artist_name, album_name, preview_url, spotify_url, explicit))
+    return [astuple(r) for r in rows] + [astuple(r) for r in rows]
+
+
+def _lean(backend: str) -> Callable[[bytes], List[Any]]:
+    def decode(body: bytes) -> List[Any]:
+        fields = search_track_fields(body, backend)
+        rows = [TrackRow(*f) for f in fields]
+        return [r.to_tuple() for r in rows]
+
+    return decode
+
+
+def _measure(fn: Callable[[bytes], List[Any]], bodies: List[bytes], repeat: int) -> Dict[str, float]:
+    fn(bodies[0])
+    t0 = time.process_time()
+    for _ in range(repeat):
+        for body in bodies:
+            fn(body)
+    cpu_us = (time.process_time() - t0) / (repeat * len(bodies)) * 1e6
+
+    peaks: List[int] = []
+    for body in bodies:
+        tracemalloc.start()
+        fn(body)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {"cpu_us_per_response": round(cpu_us, 1), "peak_kb_per_response": round(max(peaks) / 1024, 1)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--payloads", type=int, default=40)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--payload-dir", default=None, help="기록해 둔 /v1/search 응답 본문 디렉터리 (*.json)")
+    args = ap.parse_args()
+
+    if args.payload_dir:
+        bodies = []
+        for path in sorted(glob.glob(os.path.join(args.payload_dir, "*.json"))):
+            with open(path, "rb") as f:
+                bodies.append(f.read())
+    else:
+        bodies = [
+            json.dumps(make_search_payload(f"chill lofi {i}", "KR", 50), ensure_ascii=False).encode("utf-8")
+            for i in range(args.payloads)
+        ]
+    if not bodies:
+        raise SystemExit("페이로드가 없습니다")
+
+    report: Dict[str, Any] = {
+        "responses": len(bodies),
+        "mean_body_kb": round(sum(len(b) for b in bodies) / len(bodies) / 1024, 1),
+        "before": _measure(decode_before, bodies, args.repeat),
+        "lean_json": _measure(_lean("json"), bodies, args.repeat),
+    }
+    if orjson is not None:
+        report["lean_orjson"] = _measure(_lean("orjson"), bodies, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+오프라인 end-to-end 벤치마크: 로컬 stand-in(OpenAI Responses / Spotify token·search)에 대해
+OpenAIService + SpotifyService 파이프라인을 돌리고 결과를 JSON으로 출력한다.
+
+    python -m benchmarks.bench_pipeline --recommendations 200 --concurrency 8 \\
+        --openai-latency-ms 300 --spotify-latency-ms 150 --out bench_output.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.stub_servers import StubConfig, StubServer, point_spotify_at, unthrottled_scheduler
+from services.metrics import METRICS
+from services.openai_service import OpenAIService
+from services.rate_limiter import RequestScheduler
+from services.pipeline import STRATEGY_LLM, STRATEGY_MODES, RecommendationRequest, run_recommendation
+from services.search_cache import SearchCache
+from services.spotify_service import SpotifyService
+from services.strategy_cache import StrategyCache
+
+MOODS = ["설레요", "무기력해요", "우울해요", "신나요", "차분해요", "피곤해요", "행복해요", "긴장돼요"]
+CONTEXTS = ["공부 중", "운동", "퇴근길", "드라이브", "야근", "카페", "잠들기 전"]
+GENRES = ["k-pop", "pop", "hip-hop", "r&b", "rock", "indie", "edm", "j-pop", "lofi", "jazz", "classical", "metal", "acoustic"]
+TONES = ["밝고 신나는", "차분하고 안정적인", "감성적이고 잔잔한", "강렬하고 공격적인", "몽환적이고 판타지한", "코믹/가벼운"]
+MARKETS = ["KR", "US", "JP"]
+
+
+def build_workload(n: int, distinct: int, seed: int) -> List[RecommendationRequest]:
+    """distinct개의 입력 조합을 만든 뒤 Zipf 비슷한 편향 분포로 n건 샘플링 (인기 조합 반복)"""
+    rnd = random.Random(seed)
+    pool = [
+        RecommendationRequest(
+            mood_text=rnd.choice(MOODS),
+            context_text=rnd.choice(CONTEXTS),
+            genres=sorted(rnd.sample(GENRES, rnd.randint(0, 3))),
+            energy=rnd.randint(1, 10),
+            tone=rnd.choice(TONES),
+            market=rnd.choices(MARKETS, weights=[8, 3, 1])[0],
+            allow_explicit=rnd.random() < 0.3,
+            n_tracks=rnd.choice([10, 10, 15, 20, 30]),
+        )
+        for _ in range(distinct)
+    ]
+    weights = [1.0 / (i + 1) for i in range(distinct)]
+    return rnd.choices(pool, weights=weights, k=n)
+
+
+def _percentile(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(p / 100 * len(sorted_vals))) - 1))
+    return sorted_vals[idx]
+
+
+def _warm_up(openai_base_url: str, spotify_base_url: str) -> None:
+    """
+    측정 전 1회 실행: OpenAI 클라이언트의 지연 import/pydantic 스키마 생성 비용을 측정에서 제외.
+    캐시 없는 별도 인스턴스를 써서 캐시 통계에 영향을 주지 않는다.
+    """
+    openai_svc = OpenAIService(api_key="bench", base_url=f"{openai_base_url}/v1")
+    spotify_svc = SpotifyService(client_id="bench", client_secret="bench", scheduler=unthrottled_scheduler())
+    point_spotify_at(spotify_svc, spotify_base_url)
+    req = RecommendationRequest(mood_text="warm-up", n_tracks=5)
+    run_recommendation(openai_svc, spotify_svc, req, stream=True)
+    run_recommendation(openai_svc, spotify_svc, req, stream=False)
+    spotify_svc.close()
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workload = build_workload(args.recommendations, args.distinct, args.seed)
+    openai_cfg = StubConfig(
+        latency_s=args.openai_latency_ms / 1000,
+        error_rate=args.openai_error_rate,
+        slow_rate=args.openai_slow_rate,
+        slow_latency_s=args.openai_slow_ms / 1000,
+        defect_rate=args.openai_defect_rate,
+        stream_chunk_delay_s=args.openai_chunk_delay_ms / 1000,
+    )
+    spotify_cfg = StubConfig(
+        latency_s=args.spotify_latency_ms / 1000,
+        error_rate=args.spotify_error_rate,
+        n_items=args.payload_items,
+    )
+    cache_dir: Optional[str] = None if args.no_cache else tempfile.mkdtemp(prefix="bench-cache-")
+
+    with StubServer(openai_cfg) as openai_stub, StubServer(spotify_cfg) as spotify_stub:
+        _warm_up(openai_stub.base_url, spotify_stub.base_url)
+        for stub in (openai_stub, spotify_stub):
+            stub.reset_stats()
+        METRICS.reset()
+        rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        openai_svc = OpenAIService(
+            api_key="bench",
+            base_url=f"{openai_stub.base_url}/v1",
+            strategy_cache=None if args.no_cache else StrategyCache(),
+            hedge_quantile=args.hedge_quantile,
+            hedge_min_s=args.hedge_min_ms / 1000,
+        )
+        spotify_svc = SpotifyService(
+            client_id="bench",
+            client_secret="bench",
+            max_in_flight=args.max_in_flight,
+            scheduler=RequestScheduler(rate_per_s=args.spotify_rate_per_s, burst=int(args.spotify_rate_per_s)),
+            search_cache=None if cache_dir is None else SearchCache(path=os.path.join(cache_dir, "search.sqlite")),
+        )
+        point_spotify_at(spotify_svc, spotify_stub.base_url)
+
+        latencies: List[float] = []
+        failures = 0
+        n_tracks_returned = 0
+
+        def one(req: RecommendationRequest) -> None:
+            nonlocal failures, n_tracks_returned
+            t0 = time.perf_counter()
+            try:
+                _, tracks = run_recommendation(
+                    openai_svc,
+                    spotify_svc,
+                    req,
+                    stream=not args.no_stream,
+                    rerank=not args.no_rerank,
+                    strategy_mode=args.strategy_mode,
+                    llm_budget_s=args.llm_budget_ms / 1000,
+                )
+                n_tracks_returned += len(tracks)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            except Exception:
+                failures += 1
+
+        wall0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+            list(ex.map(one, workload))
+        wall_s = time.perf_counter() - wall0
+
+        peak = 0
+        if args.tracemalloc:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        lat = sorted(latencies)
+        snapshot = METRICS.to_dict()
+        counters, stages = snapshot["counters"], snapshot["stages"]
+        ok = len(lat)
+        search_calls = spotify_stub.stats.by_path.get("/v1/search", 0)
+        result: Dict[str, Any] = {
+            "config": {k: v for k, v in vars(args).items() if k != "out"},
+            "recommendations": len(workload),
+            "succeeded": ok,
+            "failed": failures,
+            "wall_s": round(wall_s, 3),
+            "throughput_rps": round(ok / wall_s, 3) if wall_s else 0.0,
+            "latency_ms": {
+                "p50": round(_percentile(lat, 50), 2),
+                "p95": round(_percentile(lat, 95), 2),
+                "p99": round(_percentile(lat, 99), 2),
+                "max": round(lat[-1], 2) if lat else 0.0,
+            },
+            "spotify": {
+                "search_calls": search_calls,
+                "token_calls": spotify_stub.stats.by_path.get("/api/token", 0),
+                "calls_per_recommendation": round(search_calls / max(1, len(workload)), 3),
+                "connections": spotify_stub.stats.connections,
+                "scheduler": spotify_svc.scheduler.stats(),
+            },
+            "openai": {
+                "calls": sum(v for k, v in openai_stub.stats.by_path.items() if k.endswith("/responses")),
+                "hedges": int(counters.get("openai_hedges", 0)),
+                "hedge_wins": int(counters.get("openai_hedge_wins", 0)),
+                "repairs": int(counters.get("openai_strategy_repairs", 0)),
+                "retries": int(counters.get("openai_retries", 0)),
+                "input_tokens": int(counters.get("openai_input_tokens", 0)),
+                # stand-in이 규칙(1024토큰 최소, 토큰 ≈ 문자/2)으로 흉내 낸 값: 실제 캐시 적중 근거가 아님
+                "cached_input_tokens": int(counters.get("openai_cached_input_tokens", 0)),
+                "cached_input_tokens_source": "stub_emulation",
+                "output_tokens": int(counters.get("openai_output_tokens", 0)),
+                "ttft_stream_p50_ms": stages.get("openai_ttft_stream", {}).get("p50_ms"),
+            },
+            "tracks_per_recommendation": round(n_tracks_returned / max(1, ok), 2),
+            "cache": {
+                "search": spotify_svc.search_cache.stats.to_dict() if spotify_svc.search_cache else None,
+                "strategy": openai_svc.strategy_cache.stats() if openai_svc.strategy_cache else None,
+            },
+            "memory": {
+                "tracemalloc_peak_kb": round(peak / 1024, 1) if args.tracemalloc else None,
+                "max_rss_kb": rss1,
+                "max_rss_growth_kb": rss1 - rss0,
+            },
+        }
+        spotify_svc.close()
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--recommendations", type=int, default=100)
+    ap.add_argument("--distinct", type=int, default=40, help="서로 다른 입력 조합 수")
+    ap.add_argument("--concurrency", type=int, default=4, help="동시 세션 수")
+    ap.add_argument("--max-in-flight", type=int, default=4)
+    ap.add_argument("--openai-latency-ms", type=float, default=200.0)
+    ap.add_argument("--openai-chunk-delay-ms", type=float, default=2.0)
+    ap.add_argument("--openai-error-rate", type=float, default=0.0)
+    ap.add_argument("--openai-slow-rate", type=float, default=0.0, help="꼬리 지연 요청 비율")
+    ap.add_argument("--openai-slow-ms", type=float, default=3000.0)
+    ap.add_argument("--openai-defect-rate", type=float, default=0.0, help="스키마 위반 전략 JSON 비율")
+    ap.add_argument("--hedge-quantile", type=float, default=None, help="예: 0.9 (지정 시 hedged 요청)")
+    ap.add_argument("--hedge-min-ms", type=float, default=500.0)
+    ap.add_argument("--spotify-latency-ms", type=float, default=100.0)
+    ap.add_argument("--spotify-error-rate", type=float, default=0.0)
+    ap.add_argument("--spotify-rate-per-s", type=float, default=10.0, help="RequestScheduler 토큰 버킷 속도")
+    ap.add_argument("--payload-items", type=int, default=50)
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--no-stream", action="store_true")
+    ap.add_argument("--strategy-mode", choices=STRATEGY_MODES, default=STRATEGY_LLM)
+    ap.add_argument("--llm-budget-ms", type=float, default=8000.0, help="--strategy-mode fallback 대기 예산")
+    ap.add_argument("--no-rerank", action="store_true", help="audio features 재정렬 끄기")
+    ap.add_argument("--tracemalloc", action="store_true", help="파이썬 힙 peak 측정 (지연 시간이 크게 늘어남)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default="-", help="결과 JSON 경로 (- = stdout)")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
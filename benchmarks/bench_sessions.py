@@ -0,0 +1,406 @@
+"""
+동시 세션 부하 테스트 (용량 산정용): app.py 스크립트를 Streamlit AppTest로 그대로 실행한다.
+- 세션마다 AppTest 1개 = 브라우저 탭 1개. 폼(기분/상황/장르/에너지/톤)을 채우고 "플리 추천 받기"를 누른다
+- AppTest는 같은 프로세스에서 스크립트를 돌리므로 st.cache_resource 서비스/캐시/ResultStore를
+  모든 세션이 공유한다 (streamlit run 프로세스 1개와 같은 구조, 웹소켓/브라우저 렌더링 비용은 제외)
+- OpenAI/Spotify는 로컬 stand-in, 앱 설정(Spotify 초당 요청 제한 등)은 그대로
+- 동시 세션 수 단계마다 캐시를 비운 새 프로세스 상태에서 같은 입력 분포로 측정하고,
+  처리량이 최고치 근처에서 더 늘지 않거나 p95가 SLO를 넘는 첫 단계를 포화 지점으로 보고한다
+
+    python -m benchmarks.bench_sessions --levels 1,2,4,8,16 --requests-per-session 3 \\
+        --openai-latency-ms 300 --spotify-latency-ms 150 --out sessions.json
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+import streamlit as st
+from streamlit import config
+from streamlit.runtime.runtime import Runtime
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest, app_test, local_script_runner
+from streamlit.testing.v1.util import build_mock_config_get_option
+
+from benchmarks.bench_pipeline import CONTEXTS, GENRES, MOODS, TONES, _percentile
+from benchmarks.stub_servers import StubConfig, StubServer, point_spotify_at
+from services.metrics import METRICS
+from services.pipeline import STRATEGY_FALLBACK, STRATEGY_LOCAL
+from services.spotify_service import SpotifyService
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+RUN_LABEL = "✨ 플리 추천 받기"
+STRATEGY_MODE_LABEL = "전략 생성 방식"
+# app.py 사이드바 선택지 ("instant" = app.STRATEGY_INSTANT, 스크립트라 import하지 않음)
+APP_STRATEGY_MODES = (STRATEGY_FALLBACK, "instant", STRATEGY_LOCAL)
+
+
+def make_form(rnd: random.Random) -> Dict[str, Any]:
+    return {
+        "mood": rnd.choice(MOODS),
+        "context": rnd.choice(CONTEXTS),
+        "genres": sorted(rnd.sample(GENRES, rnd.randint(0, 3))),
+        "energy": rnd.randint(1, 10),
+        "tone": rnd.choice(TONES),
+    }
+
+
+def _widget(widgets: Any, label: str) -> Any:
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"widget not found: {label}")
+
+
+class Session:
+    """브라우저 탭 1개: 첫 화면을 그린 뒤 폼 입력 → 추천 버튼 클릭을 반복"""
+
+    def __init__(self, secrets: Dict[str, str], strategy_mode: Optional[str], timeout_s: float) -> None:
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout_s)
+        self.app.secrets.update(secrets)
+        self._strategy_mode = strategy_mode
+
+    def open(self) -> None:
+        self.app.run()
+        if self._strategy_mode is not None:
+            _widget(self.app.sidebar.selectbox, STRATEGY_MODE_LABEL).set_value(self._strategy_mode)
+
+    def recommend(self, form: Dict[str, Any]) -> Optional[str]:
+        """한 번 클릭해 스크립트 실행이 끝날 때까지 진행. 성공(새 결과 handle, 예외/오류 없음)이면 None, 아니면 실패 사유"""
+        at = self.app
+        _widget(at.text_input, "오늘의 기분").input(form["mood"])
+        _widget(at.text_input, "현재 상황/활동").input(form["context"])
+        _widget(at.multiselect, "선호 장르").set_value(form["genres"])
+        _widget(at.slider, "에너지 레벨 (1~10)").set_value(form["energy"])
+        _widget(at.selectbox, "감정 톤").set_value(form["tone"])
+        before = at.session_state["last_result"] if "last_result" in at.session_state else None
+        _widget(at.button, RUN_LABEL).click().run()
+        if at.exception:
+            return f"exception: {at.exception[0].message.splitlines()[0][:80]}"
+        if at.error:
+            return f"error: {at.error[0].value[:80]}"
+        after = at.session_state["last_result"] if "last_result" in at.session_state else None
+        return None if after is not None and after != before else "no_result"
+
+
+@contextmanager
+def concurrent_app_tests(secrets: Dict[str, str]) -> Iterator[None]:
+    """
+    AppTest 여러 개를 동시에 돌리기 위한 전역 상태 고정 (AppTest는 실행마다 전역 상태를 설치했다가 되돌린다).
+    - Runtime 싱글턴: 먼저 끝난 실행이 지워도 마지막 mock runtime을 계속 쓴다 ("Runtime hasn't been created!" 방지)
+    - global.appTest / st.secrets: 되돌려져도 같은 값이 되도록 미리 깔아 둔다
+    - 스크립트 bytecode 캐시 1개 공유 (실제 서버와 같음, 3.11의 동시 ast.parse SystemError 방지)
+    """
+    last: List[Runtime] = []
+
+    def instance(cls: type) -> Runtime:
+        current = Runtime._instance
+        if current is not None:
+            last[:] = [current]
+            return current
+        if last:
+            return last[0]
+        raise RuntimeError("Runtime hasn't been created!")
+
+    def exists(cls: type) -> bool:
+        return Runtime._instance is not None or bool(last)
+
+    script_cache = ScriptCache()
+    saved_get_option = config.get_option
+    saved_secrets = st.secrets
+    bench_secrets = Secrets()
+    bench_secrets._secrets = dict(secrets)
+    st.secrets = bench_secrets
+    try:
+        with mock.patch.object(Runtime, "instance", classmethod(instance)), mock.patch.object(
+            Runtime, "exists", classmethod(exists)
+        ), mock.patch.object(
+            config, "get_option", build_mock_config_get_option({"global.appTest": True})
+        ), mock.patch.object(app_test, "ScriptCache", lambda: script_cache), mock.patch.object(
+            local_script_runner, "ScriptCache", lambda: script_cache
+        ):
+            yield
+    finally:
+        # 동시 실행의 패치 해제 순서가 엇갈려도 원래 상태로
+        config.get_option = saved_get_option
+        st.secrets = saved_secrets
+        Runtime._instance = None
+
+
+def _reset_process_state(cache_dir: str) -> None:
+    """단계마다 빈 캐시로 시작: cache_resource(서비스/캐시/ResultStore)를 비우고 .cache 위치를 새 디렉터리로"""
+    st.cache_resource.clear()
+    os.makedirs(cache_dir, exist_ok=True)
+    os.chdir(cache_dir)
+    METRICS.reset()
+    gc.collect()
+
+
+def run_level(
+    sessions: int, args: argparse.Namespace, secrets: Dict[str, str], cache_dir: str
+) -> Dict[str, Any]:
+    _reset_process_state(cache_dir)
+    latencies: List[float] = []
+    failures: Counter = Counter()
+    lock = threading.Lock()
+    # 모든 세션이 첫 화면을 그린 뒤 동시에 버튼을 누르기 시작
+    start = threading.Barrier(sessions + 1)
+
+    def one(idx: int) -> None:
+        rnd = random.Random(args.seed * 1000 + idx)
+        session = Session(secrets, args.strategy_mode, args.timeout_s)
+        try:
+            session.open()
+        except Exception as e:
+            with lock:
+                failures[f"open: {type(e).__name__}"] += args.requests_per_session
+            return
+        finally:
+            # 첫 화면에서 실패한 세션도 출발 신호는 맞춰 준다 (나머지 세션이 멈추지 않게)
+            start.wait()
+        for _ in range(args.requests_per_session):
+            t0 = time.perf_counter()
+            try:
+                failure = session.recommend(make_form(rnd))
+            except Exception as e:
+                failure = f"harness: {type(e).__name__}: {str(e)[:60]}"
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                if failure is None:
+                    latencies.append(elapsed_ms)
+                else:
+                    failures[failure] += 1
+            if args.think_ms:
+                time.sleep(rnd.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+    threads = [threading.Thread(target=one, args=(i,), daemon=True) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    start.wait()
+    wall0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall_s = time.perf_counter() - wall0
+
+    lat = sorted(latencies)
+    snapshot = METRICS.to_dict()
+    return {
+        "sessions": sessions,
+        "requests": sessions * args.requests_per_session,
+        "succeeded": len(lat),
+        "failed": sum(failures.values()),
+        "failure_reasons": dict(failures.most_common()),
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(lat) / wall_s, 3) if wall_s else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(lat, 50), 1),
+            "p95": round(_percentile(lat, 95), 1),
+            "p99": round(_percentile(lat, 99), 1),
+            "max": round(lat[-1], 1) if lat else 0.0,
+        },
+        "counters": {
+            k: int(v)
+            for k, v in snapshot["counters"].items()
+            if k.startswith(("openai_strategy_cache_hits", "openai_singleflight", "spotify_search_cache"))
+        },
+        # 포화 후 지연이 어느 단계(LLM 대기 / Spotify 제한 대기 / 검색 ...)에서 늘어나는지
+        "stages_ms": {
+            name: {"p50": stats["p50_ms"], "p95": stats["p95_ms"]} for name, stats in snapshot["stages"].items()
+        },
+    }
+
+
+def find_saturation(levels: List[Dict[str, Any]], min_gain: float, slo_ms: Optional[float]) -> Dict[str, Any]:
+    """
+    - 처리량 포화: 최고 처리량의 (1 - min_gain) 이상에 처음 도달한 단계. 그 뒤로는 세션을 늘려도 지연만 늘어난다
+      (그 단계가 마지막 단계면 아직 포화 전)
+    - SLO 위반: p95가 slo_ms를 넘는 첫 단계
+    capacity_sessions는 먼저 오는 쪽 기준 (SLO 위반이면 그 직전 단계 = 지연이 무너지기 전까지 받을 수 있는 세션 수)
+    """
+    if not levels:
+        return {"saturated_at_sessions": None, "reason": "not_reached", "capacity_sessions": 0, "peak_throughput_rps": 0.0}
+    peak = max(lv["throughput_rps"] for lv in levels)
+    knee = next(i for i, lv in enumerate(levels) if lv["throughput_rps"] >= peak * (1 - min_gain))
+    breach = next(
+        (i for i, lv in enumerate(levels) if slo_ms is not None and lv["latency_ms"]["p95"] > slo_ms),
+        None,
+    )
+    if breach is not None and breach <= knee:
+        return {
+            "saturated_at_sessions": levels[breach]["sessions"],
+            "reason": "p95_over_slo",
+            "capacity_sessions": levels[breach - 1]["sessions"] if breach else 0,
+            "peak_throughput_rps": peak,
+        }
+    if knee < len(levels) - 1:
+        return {
+            "saturated_at_sessions": levels[knee]["sessions"],
+            "reason": "throughput_plateau",
+            "capacity_sessions": levels[knee]["sessions"],
+            "peak_throughput_rps": peak,
+        }
+    return {
+        "saturated_at_sessions": None,
+        "reason": "not_reached",
+        "capacity_sessions": levels[-1]["sessions"],
+        "peak_throughput_rps": peak,
+    }
+
+
+def measure_session_memory(count: int, args: argparse.Namespace, secrets: Dict[str, str], cache_dir: str) -> Dict[str, Any]:
+    """
+    세션 count개를 1번씩 추천까지 진행한 뒤 살려 둔 채 늘어난 파이썬 힙 / count.
+    AppTest 요소 트리 + session_state + 공유 ResultStore 몫을 포함 (부하 단계와 분리: tracemalloc이 느리므로)
+    """
+    _reset_process_state(cache_dir)
+    # 서비스/클라이언트 생성 같은 1회성 비용은 기준선에 넣는다
+    warm = Session(secrets, args.strategy_mode, args.timeout_s)
+    warm.open()
+    warm.recommend(make_form(random.Random(args.seed)))
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    rnd = random.Random(args.seed)
+    kept: List[Session] = []
+    for _ in range(count):
+        session = Session(secrets, args.strategy_mode, args.timeout_s)
+        session.open()
+        session.recommend(make_form(rnd))
+        kept.append(session)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "sessions": len(kept),
+        "retained_kb_per_session": round((current - base) / max(1, len(kept)) / 1024, 1),
+        "tracemalloc_peak_kb": round(peak / 1024, 1),
+    }
+
+
+def _ramp(
+    args: argparse.Namespace,
+    secrets: Dict[str, str],
+    workdir: str,
+    openai_stub: StubServer,
+    spotify_stub: StubServer,
+) -> Dict[str, Any]:
+    # 스크립트 첫 실행(모듈 import, 클라이언트 생성) 비용은 측정에서 제외
+    _reset_process_state(os.path.join(workdir, "warm-up"))
+    warm = Session(secrets, args.strategy_mode, args.timeout_s)
+    warm.open()
+    warm.recommend(make_form(random.Random(0)))
+
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    levels: List[Dict[str, Any]] = []
+    for n in args.levels:
+        for stub in (openai_stub, spotify_stub):
+            stub.reset_stats()
+        level = run_level(n, args, secrets, os.path.join(workdir, f"level-{n}"))
+        level["openai_calls"] = sum(v for k, v in openai_stub.stats.by_path.items() if k.endswith("/responses"))
+        level["spotify_calls"] = sum(spotify_stub.stats.by_path.values())
+        levels.append(level)
+        print(
+            f"sessions={n:4d} rps={level['throughput_rps']:7.2f} "
+            f"p50={level['latency_ms']['p50']:8.1f}ms p95={level['latency_ms']['p95']:8.1f}ms "
+            f"failed={level['failed']}",
+            file=sys.stderr,
+        )
+        if args.stop_at_slo and args.slo_ms is not None and level["latency_ms"]["p95"] > args.slo_ms:
+            break
+    rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    memory = measure_session_memory(args.memory_sessions, args, secrets, os.path.join(workdir, "memory"))
+    memory["max_rss_kb"] = rss1
+    memory["max_rss_growth_kb_during_ramp"] = rss1 - rss0
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "levels": levels,
+        "saturation": find_saturation(levels, args.min_gain, args.slo_ms),
+        "memory": memory,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    openai_cfg = StubConfig(
+        latency_s=args.openai_latency_ms / 1000,
+        stream_chunk_delay_s=args.openai_chunk_delay_ms / 1000,
+        slow_rate=args.openai_slow_rate,
+        slow_latency_s=args.openai_slow_ms / 1000,
+    )
+    spotify_cfg = StubConfig(latency_s=args.spotify_latency_ms / 1000, n_items=args.payload_items)
+    workdir = tempfile.mkdtemp(prefix="bench-sessions-")
+    cwd = os.getcwd()
+    secrets = {"OPENAI_API_KEY": "bench", "SPOTIFY_CLIENT_ID": "bench", "SPOTIFY_CLIENT_SECRET": "bench"}
+    saved_base_url = os.environ.get("OPENAI_BASE_URL")
+    saved_urls = (SpotifyService.TOKEN_URL, SpotifyService.SEARCH_URL, SpotifyService.AUDIO_FEATURES_URL)
+
+    with StubServer(openai_cfg) as openai_stub, StubServer(spotify_cfg) as spotify_stub:
+        # 앱은 base_url 없이 OpenAI 클라이언트를 만들므로 환경변수로, Spotify는 클래스 엔드포인트를 교체
+        os.environ["OPENAI_BASE_URL"] = f"{openai_stub.base_url}/v1"
+        point_spotify_at(SpotifyService, spotify_stub.base_url)
+        try:
+            with concurrent_app_tests(secrets):
+                return _ramp(args, secrets, workdir, openai_stub, spotify_stub)
+        finally:
+            os.chdir(cwd)
+            SpotifyService.TOKEN_URL, SpotifyService.SEARCH_URL, SpotifyService.AUDIO_FEATURES_URL = saved_urls
+            if saved_base_url is None:
+                os.environ.pop("OPENAI_BASE_URL", None)
+            else:
+                os.environ["OPENAI_BASE_URL"] = saved_base_url
+
+
+def _levels(text: str) -> List[int]:
+    return sorted({int(x) for x in text.split(",") if x.strip()})
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--levels", type=_levels, default=[1, 2, 4, 8, 16], help="동시 세션 수 단계 (쉼표 구분)")
+    ap.add_argument("--requests-per-session", type=int, default=3, help="세션마다 추천 버튼을 누르는 횟수")
+    ap.add_argument("--think-ms", type=float, default=0.0, help="클릭 사이 평균 대기 (0 = 쉬지 않고 클릭)")
+    ap.add_argument("--strategy-mode", default=None, choices=APP_STRATEGY_MODES, help="사이드바 '전략 생성 방식' 값 (기본 = 앱 기본값)")
+    ap.add_argument("--timeout-s", type=float, default=120.0, help="스크립트 1회 실행 제한")
+    ap.add_argument("--openai-latency-ms", type=float, default=300.0)
+    ap.add_argument("--openai-chunk-delay-ms", type=float, default=2.0)
+    ap.add_argument("--openai-slow-rate", type=float, default=0.0)
+    ap.add_argument("--openai-slow-ms", type=float, default=3000.0)
+    ap.add_argument("--spotify-latency-ms", type=float, default=150.0)
+    ap.add_argument("--payload-items", type=int, default=50)
+    ap.add_argument("--min-gain", type=float, default=0.1, help="최고 처리량의 (1 - min_gain) 이상이면 포화 구간")
+    ap.add_argument("--slo-ms", type=float, default=None, help="p95가 이 값을 넘으면 포화")
+    ap.add_argument("--stop-at-slo", action="store_true", help="p95가 SLO를 넘으면 남은 단계 생략")
+    ap.add_argument("--memory-sessions", type=int, default=20, help="세션당 메모리 측정에 쓸 세션 수")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", default="-", help="결과 JSON 경로 (- = stdout)")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    result = run(args)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.out == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
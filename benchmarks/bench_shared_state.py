@@ -0,0 +1,78 @@
+"""
+워커 간 공유 상태 벤치마크: N개 워커 프로세스가 같은 쿼리 집합을 각자 순서로 검색할 때
+Spotify 토큰/검색 호출 수 비교 (공유 없음 vs SQLite 파일 vs Redis 프로토콜 stand-in).
+
+    python -m benchmarks.bench_shared_state --workers 4 --queries 60 --latency-ms 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.stub_servers import RedisStub, StubConfig, StubServer, point_spotify_at, unthrottled_scheduler
+from services.search_cache import SearchCache
+from services.shared_state import make_shared_state
+from services.spotify_service import SpotifyService
+
+
+def _worker(idx: int, base_url: str, shared_url: Optional[str], queries: List[str]) -> None:
+    shared = make_shared_state(shared_url) if shared_url else None
+    svc = SpotifyService(
+        "id",
+        "secret",
+        search_cache=SearchCache(shared=shared),
+        scheduler=unthrottled_scheduler(),
+        shared_state=shared,
+    )
+    point_spotify_at(svc, base_url)
+    order = list(queries)
+    random.Random(idx).shuffle(order)
+    for q in order:
+        svc._search_once(q=q, market="KR", limit=50)
+    svc.close()
+    if shared is not None:
+        shared.close()
+
+
+def _run(stub: StubServer, shared_url: Optional[str], workers: int, queries: List[str]) -> Dict[str, Any]:
+    stub.reset_stats()
+    t0 = time.perf_counter()
+    procs = [mp.Process(target=_worker, args=(i, stub.base_url, shared_url, queries)) for i in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return {
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "token_calls": stub.stats.by_path.get("/api/token", 0),
+        "search_calls": stub.stats.by_path.get("/v1/search", 0),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--queries", type=int, default=60)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    args = ap.parse_args()
+
+    queries = [f"chill lofi study {i}" for i in range(args.queries)]
+    report: Dict[str, Any] = {"workers": args.workers, "unique_queries": args.queries}
+
+    with StubServer(StubConfig(latency_s=args.latency_ms / 1000)) as stub, RedisStub() as redis_stub:
+        report["no_shared"] = _run(stub, None, args.workers, queries)
+        with tempfile.TemporaryDirectory() as tmp:
+            report["sqlite"] = _run(stub, f"sqlite:///{os.path.join(tmp, 'shared.sqlite')}", args.workers, queries)
+        report["redis_stub"] = _run(stub, redis_stub.url, args.workers, queries)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
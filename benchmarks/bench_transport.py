@@ -0,0 +1,72 @@
+"""
+SpotifyService transport 벤치마크: 요청마다 새 연결(requests.get) vs 공유 keep-alive 풀.
+
+    python -m benchmarks.bench_transport --queries 200 --latency-ms 0 --handshake-ms 60
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import requests
+
+from benchmarks.stub_servers import StubConfig, StubServer, point_spotify_at, unthrottled_scheduler
+from services.spotify_service import SpotifyService
+
+
+def _measure(fn: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    lat: List[float] = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    return {
+        "mean_ms": round(statistics.fmean(lat), 3),
+        "p50_ms": round(lat[len(lat) // 2], 3),
+        "p95_ms": round(lat[int(len(lat) * 0.95) - 1], 3),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--handshake-ms", type=float, default=0.0, help="새 연결당 지연 (TCP+TLS 흉내)")
+    args = ap.parse_args()
+
+    queries = [f"chill lofi study {i % 20}" for i in range(args.queries)]
+
+    with StubServer(StubConfig(latency_s=args.latency_ms / 1000, connect_latency_s=args.handshake_ms / 1000)) as stub:
+        svc = SpotifyService("id", "secret", scheduler=unthrottled_scheduler())
+        point_spotify_at(svc, stub.base_url)
+        token = svc._get_access_token()
+
+        def unpooled(q: str) -> object:
+            # 변경 전 구현과 동일: 모듈 레벨 requests.get → 매 요청 새 TCP 연결
+            resp = requests.get(
+                svc.SEARCH_URL,
+                headers={"Authorization": f"Bearer {token}"},
+                params={"q": q, "type": "track", "market": "KR", "limit": 50},
+                timeout=30,
+            )
+            resp.raise_for_status()
+            return resp.json()
+
+        conn0 = stub.stats.connections
+        before = _measure(unpooled, queries)
+        before["connections"] = stub.stats.connections - conn0
+
+        conn0 = stub.stats.connections
+        after = _measure(lambda q: svc._search_once(q=q, market="KR", limit=50), queries)
+        after["connections"] = stub.stats.connections - conn0
+        svc.close()
+
+    print(json.dumps({"queries": args.queries, "unpooled": before, "pooled": after}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import random
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class StubConfig:
+    latency_s: float = 0.0
+    # 새 연결마다 추가되는 지연 (실제 TCP+TLS 핸드셰이크 RTT 흉내)
+    connect_latency_s: float = 0.0
+    error_rate: float = 0.0
+    # 꼬리 지연: slow_rate 비율의 요청에 slow_latency_s 추가
+    slow_rate: float = 0.0
+    slow_latency_s: float = 0.0
+    # OpenAI 전략 JSON 중 일부 필드를 빼거나 타입을 바꿔 보내는 비율
+    defect_rate: float = 0.0
+    # 429 + Retry-After 응답 비율
+    rate_limit_rate: float = 0.0
+    retry_after_s: float = 1.0
+    n_items: int = 50
+    # OpenAI 스트리밍 응답에서 델타 조각 사이 지연 / 조각 크기(문자)
+    stream_chunk_delay_s: float = 0.0
+    stream_chunk_chars: int = 8
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    connections: int = 0
+    by_path: Dict[str, int] = field(default_factory=dict)
+
+
+def make_search_payload(q: str, market: str, limit: int, offset: int = 0) -> Dict[str, Any]:
+    """
+    Spotify /v1/search 응답과 비슷한 크기/모양의 페이로드.
+    같은 쿼리 → 같은 트랙 ID (쿼리 간 일부 겹치도록 해시 버킷 사용)
+    """
+    seed = int(hashlib.md5(q.lower().encode("utf-8")).hexdigest()[:8], 16)
+    rnd = random.Random(seed + offset)
+    markets = ["KR", "US", "JP", "GB", "DE", "FR", "BR", "CA", "AU", "MX"] * 8
+    items: List[Dict[str, Any]] = []
+    for i in range(limit):
+        tid = f"t{rnd.randrange(0, 4000):05d}"
+        items.append(
+            {
+                "id": tid,
+                "name": f"Track {tid}",
+                "explicit": rnd.random() < 0.25,
+                "preview_url": None if rnd.random() < 0.5 else f"https://p.scdn.co/mp3-preview/{tid}",
+                "external_urls": {"spotify": f"https://open.spotify.com/track/{tid}"},
+                "available_markets": markets,
+                "duration_ms": rnd.randrange(120000, 300000),
+                "popularity": rnd.randrange(0, 100),
+                "artists": [
+                    {
+                        "id": f"a{tid}",
+                        "name": f"Artist {int(tid[1:]) % 500}",
+                        "external_urls": {"spotify": f"https://open.spotify.com/artist/a{tid}"},
+                    }
+                ],
+                "album": {
+                    "id": f"al{tid}",
+                    "name": f"Album {int(tid[1:]) % 900}",
+                    "available_markets": markets,
+                    "images": [
+                        {"url": f"https://i.scdn.co/image/{tid}{s}", "height": s, "width": s}
+                        for s in (640, 300, 64)
+                    ],
+                    "release_date": "2020-01-01",
+                },
+            }
+        )
+    return {"tracks": {"href": "", "items": items, "limit": limit, "offset": offset, "total": 1000}}
+
+
+_VOCAB = {
+    "mood": ["chill", "upbeat", "sad", "dreamy", "energetic", "calm", "focus", "night", "rainy", "happy"],
+    "genre": ["k-pop", "pop", "lofi", "indie", "r&b", "edm", "jazz", "acoustic", "hip-hop", "rock"],
+    "ctx": ["study", "workout", "drive", "commute", "cafe", "sleep", "party", "coding"],
+}
+
+
+def make_strategy_payload(prompt: str) -> Dict[str, Any]:
+    """프롬프트 해시 기반의 결정적 전략 JSON (LLM 출력과 같은 스키마, 일부러 비슷한 쿼리 포함)"""
+    rnd = random.Random(int(hashlib.md5(prompt.encode("utf-8")).hexdigest()[:8], 16))
+    moods = rnd.sample(_VOCAB["mood"], 3)
+    genres = rnd.sample(_VOCAB["genre"], 3)
+    ctxs = rnd.sample(_VOCAB["ctx"], 2)
+    queries = [f"{m} {g}" for m in moods for g in genres[:2]] + [f"{ctxs[0]} {genres[0]}", f"{genres[0]} {moods[0]}"]
+    return {
+        "mood_summary": f"{moods[0]} 한 분위기",
+        "keywords": moods + ctxs,
+        "seed_genres": genres,
+        "search_queries": queries,
+        "playlist_theme": f"{ctxs[0]}를 위한 {moods[0]} 플레이리스트",
+        "reason": "입력한 기분과 상황에 맞춰 골랐어요.",
+    }
+
+
+def make_defective_strategy(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM이 가끔 내는 스키마 위반 흉내: 설명 필드 누락 + 리스트 필드를 문자열로"""
+    out = dict(payload)
+    out.pop("reason", None)
+    out["keywords"] = ", ".join(payload["keywords"])
+    out["seed_genres"] = payload["seed_genres"][0]
+    return out
+
+
+# OpenAI 프롬프트 캐시 규칙: 1024토큰 이상인 접두부만, 그 뒤로는 128토큰 단위로 적중
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_STEP_TOKENS = 128
+
+
+def emulated_cached_tokens(cached_chars: int) -> int:
+    """stand-in 전용 추정치 (토큰 ≈ 문자/2). 실제 캐시 적중의 근거가 아니라 규칙을 흉내 낸 값"""
+    tokens = cached_chars // 2
+    if tokens < PROMPT_CACHE_MIN_TOKENS:
+        return 0
+    extra = tokens - PROMPT_CACHE_MIN_TOKENS
+    return PROMPT_CACHE_MIN_TOKENS + extra // PROMPT_CACHE_STEP_TOKENS * PROMPT_CACHE_STEP_TOKENS
+
+
+def _response_object(text: str, model: str, prompt_chars: int, cached_chars: int = 0) -> Dict[str, Any]:
+    return {
+        "id": "resp_stub",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_stub",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "usage": {
+            "input_tokens": prompt_chars // 2,
+            "input_tokens_details": {"cached_tokens": emulated_cached_tokens(cached_chars)},
+            "output_tokens": len(text) // 3,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": prompt_chars // 2 + len(text) // 3,
+        },
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:  # type: ignore[attr-defined]
+            self.server.stats.connections += 1  # type: ignore[attr-defined]
+        if self.server.config.connect_latency_s:  # type: ignore[attr-defined]
+            time.sleep(self.server.config.connect_latency_s)  # type: ignore[attr-defined]
+
+    def _send_json(self, status: int, obj: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        use_gzip = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if use_gzip:
+            body = gzip.compress(body, compresslevel=1)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _before(self, path: str) -> bool:
+        server = self.server
+        with server.lock:  # type: ignore[attr-defined]
+            server.stats.requests += 1  # type: ignore[attr-defined]
+            server.stats.by_path[path] = server.stats.by_path.get(path, 0) + 1  # type: ignore[attr-defined]
+        cfg: StubConfig = server.config  # type: ignore[attr-defined]
+        if cfg.latency_s:
+            time.sleep(cfg.latency_s)
+        if cfg.slow_rate and random.random() < cfg.slow_rate:
+            time.sleep(cfg.slow_latency_s)
+        if cfg.error_rate and random.random() < cfg.error_rate:
+            self._send_json(503, {"error": {"status": 503, "message": "stub error"}})
+            return False
+        if cfg.rate_limit_rate and random.random() < cfg.rate_limit_rate:
+            self._send_json(
+                429,
+                {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                headers={"Retry-After": str(cfg.retry_after_s)},
+            )
+            return False
+        return True
+
+    def _read_body(self) -> bytes:
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n) if n else b""
+
+    def _send_sse(self, events: List[Dict[str, Any]], delay_s: float) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for ev in events:
+            data = f"event: {ev['type']}\ndata: {json.dumps(ev)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+            if delay_s and ev["type"] == "response.output_text.delta":
+                time.sleep(delay_s)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _seen_prefix_chars(self, messages: List[Any]) -> int:
+        """이전 요청과 메시지 단위로 겹치는 가장 긴 접두부 길이(문자) — 프롬프트 캐시 흉내"""
+        server = self.server
+        cached_chars = 0
+        matching = True
+        acc = ""
+        with server.lock:  # type: ignore[attr-defined]
+            seen = server.prompt_prefixes  # type: ignore[attr-defined]
+            for m in messages:
+                acc += json.dumps(m, ensure_ascii=False)
+                digest = hashlib.md5(acc.encode("utf-8")).hexdigest()
+                if matching and digest in seen:
+                    cached_chars = len(acc)
+                else:
+                    matching = False
+                seen.add(digest)
+        return cached_chars
+
+    def _handle_responses(self, body: bytes) -> None:
+        cfg: StubConfig = self.server.config  # type: ignore[attr-defined]
+        req = json.loads(body or b"{}")
+        prompt = json.dumps(req.get("input"), ensure_ascii=False)
+        cached_chars = self._seen_prefix_chars(req.get("input") or [])
+        payload = make_strategy_payload(prompt)
+        if cfg.defect_rate and random.random() < cfg.defect_rate:
+            payload = make_defective_strategy(payload)
+        text = json.dumps(payload, ensure_ascii=False)
+        resp = _response_object(text, model=req.get("model", "stub"), prompt_chars=len(prompt), cached_chars=cached_chars)
+        if not req.get("stream"):
+            self._send_json(200, resp)
+            return
+
+        step = max(1, cfg.stream_chunk_chars)
+        events: List[Dict[str, Any]] = [{"type": "response.created", "sequence_number": 0, "response": {**resp, "status": "in_progress", "output": []}}]
+        for i in range(0, len(text), step):
+            events.append(
+                {
+                    "type": "response.output_text.delta",
+                    "sequence_number": len(events),
+                    "item_id": "msg_stub",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": text[i : i + step],
+                    "logprobs": [],
+                }
+            )
+        events.append({"type": "response.completed", "sequence_number": len(events), "response": resp})
+        self._send_sse(events, delay_s=cfg.stream_chunk_delay_s)
+
+    def do_POST(self) -> None:  # noqa: N802
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if path.endswith("/responses"):
+            if self._before(path):
+                self._handle_responses(body)
+            return
+        if path == "/api/token":
+            if self._before(path):
+                self._send_json(200, {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600})
+            return
+        self._send_json(404, {"error": "not found"})
+
+    def do_GET(self) -> None:  # noqa: N802
+        u = urlparse(self.path)
+        if u.path == "/v1/audio-features":
+            if not self._before(u.path):
+                return
+            ids = (parse_qs(u.query).get("ids", [""])[0]).split(",")
+            feats = []
+            for tid in ids[:100]:
+                rnd = random.Random(tid)
+                feats.append(
+                    {
+                        "id": tid,
+                        "energy": round(rnd.random(), 3),
+                        "valence": round(rnd.random(), 3),
+                        "tempo": round(rnd.uniform(60, 180), 3),
+                        "danceability": round(rnd.random(), 3),
+                    }
+                )
+            self._send_json(200, {"audio_features": feats})
+            return
+        if u.path == "/v1/search":
+            if not self._before(u.path):
+                return
+            qs = parse_qs(u.query)
+            payload = make_search_payload(
+                q=qs.get("q", [""])[0],
+                market=qs.get("market", ["KR"])[0],
+                limit=min(int(qs.get("limit", ["50"])[0]), self.server.config.n_items),  # type: ignore[attr-defined]
+                offset=int(qs.get("offset", ["0"])[0]),
+            )
+            self._send_json(200, payload)
+            return
+        self._send_json(404, {"error": "not found"})
+
+
+class StubServer:
+    """
+    로컬 stand-in HTTP 서버 (accounts.spotify.com / api.spotify.com / OpenAI Responses 대체).
+    with 문으로 사용: 스레드에서 serve_forever, 종료 시 shutdown.
+    """
+
+    handler_class = _Handler
+
+    def __init__(self, config: Optional[StubConfig] = None) -> None:
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self._httpd.daemon_threads = True
+        self._httpd.config = self.config  # type: ignore[attr-defined]
+        self._httpd.stats = self.stats  # type: ignore[attr-defined]
+        self._httpd.lock = threading.Lock()  # type: ignore[attr-defined]
+        self._httpd.prompt_prefixes = set()  # type: ignore[attr-defined]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def reset_stats(self) -> None:
+        with self._httpd.lock:  # type: ignore[attr-defined]
+            self.stats.requests = 0
+            self.stats.connections = 0
+            self.stats.by_path.clear()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class _RedisHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def _read_command(self) -> Optional[List[str]]:
+        line = self.rfile.readline()
+        if not line.startswith(b"*"):
+            return None
+        args: List[str] = []
+        for _ in range(int(line[1:-2])):
+            n = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(n + 2)[:-2].decode("utf-8"))
+        return args
+
+    def handle(self) -> None:
+        server: Any = self.server
+        while True:
+            args = self._read_command()
+            if not args:
+                return
+            with server.lock:
+                reply = self._run(server.data, [args[0].upper()] + args[1:])
+            self.wfile.write(reply)
+
+    @staticmethod
+    def _bulk(value: Optional[str]) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        b = value.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(b), b)
+
+    def _run(self, data: Dict[str, Tuple[str, Optional[float]]], args: List[str]) -> bytes:
+        cmd, now = args[0], time.monotonic()
+        for k in [k for k, (_, exp) in data.items() if exp is not None and exp <= now]:
+            del data[k]
+        if cmd == "PING":
+            return b"+PONG\r\n"
+        if cmd in ("AUTH", "SELECT"):
+            return b"+OK\r\n"
+        if cmd == "GET":
+            entry = data.get(args[1])
+            return self._bulk(entry[0] if entry else None)
+        if cmd == "SET":
+            key, value, opts = args[1], args[2], [a.upper() for a in args[3:]]
+            if "NX" in opts and key in data:
+                return b"$-1\r\n"
+            expires: Optional[float] = None
+            if "PX" in opts:
+                expires = now + int(args[3 + opts.index("PX") + 1]) / 1000.0
+            elif "EX" in opts:
+                expires = now + int(args[3 + opts.index("EX") + 1])
+            data[key] = (value, expires)
+            return b"+OK\r\n"
+        if cmd == "PTTL":
+            entry = data.get(args[1])
+            if entry is None:
+                return b":-2\r\n"
+            return b":-1\r\n" if entry[1] is None else b":%d\r\n" % int((entry[1] - now) * 1000)
+        if cmd == "DEL":
+            removed = sum(1 for k in args[1:] if data.pop(k, None) is not None)
+            return b":%d\r\n" % removed
+        return b"-ERR unknown command '%s'\r\n" % cmd.encode("utf-8")
+
+
+class RedisStub:
+    """
+    로컬 stand-in Redis 서버 (RESP2, PING/AUTH/SELECT/GET/SET [NX] [PX|EX]/PTTL/DEL만 지원, 메모리 저장).
+    RedisSharedState를 실제 Redis 없이 시험하는 용도. with 문으로 사용.
+    """
+
+    def __init__(self) -> None:
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _RedisHandler)
+        self._server.daemon_threads = True
+        self._server.data = {}  # type: ignore[attr-defined]
+        self._server.lock = threading.Lock()  # type: ignore[attr-defined]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def __enter__(self) -> "RedisStub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def unthrottled_scheduler() -> Any:
+    """transport/캐시만 재는 벤치마크용: 기본 RequestScheduler(초당 10건)를 쓰면 제한 대기를 재게 된다"""
+    from services.rate_limiter import RequestScheduler
+
+    return RequestScheduler(rate_per_s=1_000_000, burst=1_000_000)
+
+
+def point_spotify_at(svc: Any, base_url: str) -> None:
+    """SpotifyService 인스턴스의 엔드포인트를 stand-in 서버로 교체"""
+    svc.TOKEN_URL = f"{base_url}/api/token"
+    svc.SEARCH_URL = f"{base_url}/v1/search"
+    svc.AUDIO_FEATURES_URL = f"{base_url}/v1/audio-features"
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from services.metrics import METRICS
+from services.openai_service import (
+    OpenAIService,
+    StrategyResult,
+    TokenUsage,
+    build_strategy_input,
+    hedge_delay,
+    parse_strategy_text,
+    record_usage,
+    usage_from_response,
+)
+from services.strategy_cache import StrategyCache, StrategyKey
+from services.strategy_stream import SearchQueryStreamParser
+from utils.prompt_templates import PROMPT_CACHE_KEY
+
+
+class AsyncOpenAIService:
+    """
+    OpenAIService의 asyncio 버전 (AsyncOpenAI 클라이언트):
+    - 같은 StrategyResult / 프롬프트 / 파싱·보정 규칙 / 토큰 지표, StrategyCache도 동기 서비스와 공유 가능
+    - 응답 대기와 재시도 backoff 동안 이벤트 루프가 다른 요청을 진행 (스레드를 붙잡지 않음)
+    - 동일 요청 합치기는 진행 중인 Task 하나를 함께 await
+    - hedge: 예비 요청이 먼저 끝나면 1차 요청을 실제로 취소 (동기 버전은 결과만 버림)
+    - 한 이벤트 루프 안에서만 사용 (동기 코드에서는 services.async_runner.AsyncRecommender 경유)
+    """
+
+    HEDGE_WINDOW = OpenAIService.HEDGE_WINDOW
+    HEDGE_MIN_SAMPLES = OpenAIService.HEDGE_MIN_SAMPLES
+
+    def __init__(
+        self,
+        api_key: str,
+        strategy_cache: Optional[StrategyCache] = None,
+        base_url: Optional[str] = None,
+        hedge_quantile: Optional[float] = None,
+        hedge_min_s: float = 2.0,
+    ) -> None:
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        self._strategy_cache = strategy_cache
+        self._inflight: Dict[Hashable, "asyncio.Task[StrategyResult]"] = {}
+        self._hedge_quantile = hedge_quantile
+        self._hedge_min_s = float(hedge_min_s)
+        self._latencies: Deque[float] = deque(maxlen=self.HEDGE_WINDOW)
+
+    @property
+    def strategy_cache(self) -> Optional[StrategyCache]:
+        return self._strategy_cache
+
+    async def aclose(self) -> None:
+        await self._client.close()
+
+    async def generate_strategy_json(
+        self,
+        model: str,
+        prompt: str,
+        max_retries: int = 2,
+        timeout_s: int = 45,
+        cache_key: Optional[StrategyKey] = None,
+        force_fresh: bool = False,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    ) -> StrategyResult:
+        t0 = time.perf_counter()
+        try:
+            cache = self._strategy_cache if cache_key is not None else None
+            if cache is not None and not force_fresh:
+                # 공유 저장소(SQLite/Redis) 조회가 섞일 수 있으므로 루프 밖에서
+                cached = await asyncio.to_thread(cache.get, cache_key)
+                if cached is not None:
+                    METRICS.inc("openai_strategy_cache_hits")
+                    return cached
+
+            key: Hashable = cache_key if cache_key is not None else (model, prompt)
+            task = self._inflight.get(key)
+            if task is not None:
+                METRICS.inc("openai_singleflight_shared")
+                # 기다리던 쪽이 취소돼도 진행 중인 호출은 계속
+                return await asyncio.shield(task)
+
+            async def generate() -> StrategyResult:
+                try:
+                    result = await self._generate_uncached(model, prompt, max_retries, timeout_s, on_query, on_usage)
+                    if cache is not None:
+                        await asyncio.to_thread(cache.put, cache_key, result)
+                    return result
+                finally:
+                    self._inflight.pop(key, None)
+
+            task = asyncio.ensure_future(generate())
+            self._inflight[key] = task
+            return await asyncio.shield(task)
+        finally:
+            METRICS.observe("generate_strategy_json", time.perf_counter() - t0)
+
+    async def _generate_uncached(
+        self,
+        model: str,
+        prompt: str,
+        max_retries: int,
+        timeout_s: int,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    ) -> StrategyResult:
+        last_err: Optional[Exception] = None
+
+        for attempt in range(max_retries + 1):
+            METRICS.inc("openai_requests")
+            if attempt > 0:
+                METRICS.inc("openai_retries")
+            try:
+                stream_to = on_query if attempt == 0 else None
+                request = self._hedged_text if self._hedge_quantile is not None else self._request_text
+                text_out = await request(model, prompt, timeout_s, stream_to, on_usage)
+                return parse_strategy_text(text_out)
+            except Exception as e:
+                last_err = e
+                METRICS.inc(f"openai_errors_{type(e).__name__}")
+                t_backoff = time.perf_counter()
+                await asyncio.sleep(0.6 * (attempt + 1))
+                METRICS.observe("openai_backoff", time.perf_counter() - t_backoff)
+
+        assert last_err is not None
+        raise last_err
+
+    async def _request_text(
+        self,
+        model: str,
+        prompt: str,
+        timeout_s: int,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    ) -> str:
+        t0 = time.perf_counter()
+        if on_query is not None:
+            text_out, usage = await self._stream_text(model, prompt, timeout_s, on_query)
+        else:
+            resp = await self._client.responses.create(
+                model=model,
+                input=build_strategy_input(prompt),
+                text={"format": {"type": "json_object"}},
+                prompt_cache_key=PROMPT_CACHE_KEY,
+                timeout=timeout_s,
+            )
+            text_out = resp.output_text
+            elapsed = time.perf_counter() - t0
+            usage = usage_from_response(resp, ttft_s=elapsed, total_s=elapsed, streamed=False)
+        elapsed = time.perf_counter() - t0
+        METRICS.observe("openai_request", elapsed)
+        self._latencies.append(elapsed)
+        record_usage(usage)
+        if on_usage is not None:
+            on_usage(usage)
+        return text_out
+
+    def hedge_delay_s(self) -> float:
+        return hedge_delay(list(self._latencies), self._hedge_quantile, self._hedge_min_s, self.HEDGE_MIN_SAMPLES)
+
+    async def _hedged_text(
+        self,
+        model: str,
+        prompt: str,
+        timeout_s: int,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    ) -> str:
+        """1차 요청이 hedge_delay_s 안에 끝나지 않으면 예비 요청(스트리밍 없음)을 보내 먼저 성공한 쪽을 쓰고 나머지는 취소"""
+        primary = asyncio.ensure_future(self._request_text(model, prompt, timeout_s, on_query, on_usage))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay_s())
+        if done:
+            return primary.result()
+
+        METRICS.inc("openai_hedges")
+        backup = asyncio.ensure_future(self._request_text(model, prompt, timeout_s, None, on_usage))
+        pending = {primary, backup}
+        last_err: Optional[BaseException] = None
+        try:
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for f in finished:
+                    err = f.exception()
+                    if err is None:
+                        if f is backup:
+                            METRICS.inc("openai_hedge_wins")
+                        return f.result()
+                    last_err = err
+        finally:
+            for f in pending:
+                f.cancel()
+        assert last_err is not None
+        raise last_err
+
+    async def _stream_text(
+        self,
+        model: str,
+        prompt: str,
+        timeout_s: int,
+        on_query: Callable[[str], None],
+    ) -> Tuple[str, TokenUsage]:
+        parser = SearchQueryStreamParser(on_query=on_query)
+        chunks: List[str] = []
+        t0 = time.perf_counter()
+        ttft: Optional[float] = None
+        completed: Any = None
+        stream = await self._client.responses.create(
+            model=model,
+            input=build_strategy_input(prompt),
+            text={"format": {"type": "json_object"}},
+            prompt_cache_key=PROMPT_CACHE_KEY,
+            timeout=timeout_s,
+            stream=True,
+        )
+        async for event in stream:
+            etype = getattr(event, "type", "")
+            if etype == "response.output_text.delta":
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                chunks.append(event.delta)
+                parser.feed(event.delta)
+            elif etype == "response.completed":
+                completed = getattr(event, "response", None)
+            elif etype in ("response.failed", "error"):
+                raise RuntimeError(f"OpenAI stream failed: {etype}")
+        total = time.perf_counter() - t0
+        usage = usage_from_response(completed, ttft_s=total if ttft is None else ttft, total_s=total, streamed=True)
+        return "".join(chunks), usage
+
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, List, Optional, Tuple, TypeVar
+
+from services.async_openai_service import AsyncOpenAIService
+from services.async_spotify_service import AsyncSpotifyService
+from services.metrics import METRICS
+from services.openai_service import StrategyResult, TokenUsage
+from services.pipeline import (
+    STRATEGY_FALLBACK,
+    STRATEGY_LLM,
+    STRATEGY_LOCAL,
+    STRATEGY_MODES,
+    RecommendationRequest,
+    build_prompt,
+    local_strategy,
+)
+from services.reranker import target_profile
+from services.spotify_service import TrackRow
+
+T = TypeVar("T")
+
+
+async def _cancel_pending() -> None:
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class EventLoopThread:
+    """
+    전용 스레드에서 도는 asyncio 이벤트 루프 1개.
+    - run(coro): 아무 스레드에서나 코루틴을 루프에 넣고 결과를 기다림 (Streamlit 스크립트 스레드용)
+    - submit(coro): concurrent.futures.Future 반환 (배치에서 여러 건을 한꺼번에 띄울 때)
+    """
+
+    def __init__(self, name: str = "async-services") -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        return self.submit(coro).result(timeout=timeout)
+
+    def close(self) -> None:
+        if self._loop.is_running():
+            # 남은 Task(미리 검색, 예산 넘긴 LLM 호출 등)를 정리한 뒤 멈춘다
+            self.run(_cancel_pending())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        self._loop.close()
+
+
+async def recommend_async(
+    openai_svc: AsyncOpenAIService,
+    spotify_svc: AsyncSpotifyService,
+    req: RecommendationRequest,
+    force_fresh: bool = False,
+    stream: bool = True,
+    rerank: bool = True,
+    on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    strategy_mode: str = STRATEGY_LLM,
+    llm_budget_s: float = 8.0,
+) -> Tuple[StrategyResult, List[TrackRow]]:
+    """pipeline.run_recommendation의 코루틴 버전 (같은 단계 / 같은 strategy_mode 규칙)"""
+    if strategy_mode not in STRATEGY_MODES:
+        raise ValueError(f"unknown strategy_mode: {strategy_mode}")
+
+    prefetch = spotify_svc.start_prefetch(market=req.market)
+    try:
+        if strategy_mode == STRATEGY_LOCAL:
+            strategy = local_strategy(req)
+        else:
+            prompt, cache_key = build_prompt(req)
+            pending = asyncio.ensure_future(
+                openai_svc.generate_strategy_json(
+                    model=req.model,
+                    prompt=prompt,
+                    max_retries=2,
+                    cache_key=cache_key,
+                    force_fresh=force_fresh,
+                    on_query=prefetch.submit if stream else None,
+                    on_usage=on_usage,
+                )
+            )
+            if strategy_mode == STRATEGY_FALLBACK:
+                # 예산을 넘겨도 LLM Task는 루프에서 끝까지 진행 → 전략 캐시에 남아 다음 요청에 쓰인다
+                pending.add_done_callback(lambda t: t.cancelled() or t.exception())
+                try:
+                    strategy = await asyncio.wait_for(asyncio.shield(pending), timeout=llm_budget_s)
+                except asyncio.TimeoutError:
+                    METRICS.inc("strategy_local_fallback_timeout")
+                    strategy = local_strategy(req)
+                except Exception:
+                    METRICS.inc("strategy_local_fallback_error")
+                    strategy = local_strategy(req)
+            else:
+                strategy = await pending
+        tracks = await spotify_svc.search_tracks_from_strategy(
+            strategy=strategy,
+            market=req.market,
+            target_count=req.n_tracks,
+            allow_explicit=req.allow_explicit,
+            prefetch=prefetch,
+            target=target_profile(req.energy, req.tone) if rerank else None,
+        )
+    finally:
+        prefetch.close()
+    return strategy, tracks
+
+
+class AsyncRecommender:
+    """
+    비동기 서비스의 동기 facade: 프로세스당 이벤트 루프 1개에서 모든 추천을 진행한다.
+    - run(req): 호출 스레드는 결과만 기다리고, 네트워크 대기는 루프에서 다른 추천과 겹쳐 진행
+    - submit(req): Future 반환 (배치: 스레드 풀 없이 수백 건을 동시에 띄움)
+    - 서비스 객체는 이 루프에서만 쓰이므로 생성도 factory로 루프 스레드에서 한다
+    """
+
+    def __init__(
+        self,
+        make_openai: Callable[[], AsyncOpenAIService],
+        make_spotify: Callable[[], AsyncSpotifyService],
+        loop: Optional[EventLoopThread] = None,
+    ) -> None:
+        self._own_loop = loop is None
+        self._loop = loop or EventLoopThread()
+
+        async def build() -> Tuple[AsyncOpenAIService, AsyncSpotifyService]:
+            return make_openai(), make_spotify()
+
+        self.openai_svc, self.spotify_svc = self._loop.run(build())
+
+    def submit(self, req: RecommendationRequest, **kwargs: Any) -> "Future[Tuple[StrategyResult, List[TrackRow]]]":
+        return self._loop.submit(recommend_async(self.openai_svc, self.spotify_svc, req, **kwargs))
+
+    def run(
+        self, req: RecommendationRequest, timeout: Optional[float] = None, **kwargs: Any
+    ) -> Tuple[StrategyResult, List[TrackRow]]:
+        return self.submit(req, **kwargs).result(timeout=timeout)
+
+    def close(self) -> None:
+        async def shutdown() -> None:
+            await self.openai_svc.aclose()
+            await self.spotify_svc.aclose()
+
+        if self._own_loop:
+            self._loop.run(_cancel_pending())
+        self._loop.run(shutdown())
+        if self._own_loop:
+            self._loop.close()
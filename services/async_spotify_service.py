@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import httpx
+
+from services.metrics import METRICS
+from services.query_planner import FALLBACK, STRATEGY, QueryPlanner, query_signature
+from services.rate_limiter import RequestScheduler
+from services.reranker import TargetProfile, rank_order
+from services.search_cache import SearchCache, make_key
+from services.shared_state import SharedState
+from services.spotify_decode import TrackFields, search_track_fields
+from services.spotify_service import (
+    SpotifyService,
+    TrackRow,
+    audio_features_from_payload,
+    build_fallback_queries,
+    plan_deep_pages,
+)
+from services.track_corpus import TrackCorpus
+
+# 재시도할 전송 오류 (연결 실패/타임아웃 등, HTTP 상태 오류는 스케줄러가 상태 코드로 판단)
+_TRANSIENT_ERRORS = (httpx.TransportError,)
+
+
+class AsyncSearchPrefetch:
+    """
+    SearchPrefetch의 asyncio 버전: LLM 스트리밍 도중 완성된 쿼리 첫 페이지를 Task로 미리 띄워 둔다.
+    on_query 콜백은 이벤트 루프 안에서 불리므로 submit은 Task 생성만 한다.
+    키는 SearchPrefetch와 같은 query_signature (공백/대소문자/단어 순서 차이로 같은 검색을 두 번 보내지 않도록).
+    """
+
+    def __init__(self, service: "AsyncSpotifyService", market: str, max_queries: int) -> None:
+        self._service = service
+        self._market = market
+        self._max_queries = max_queries
+        self._tasks: Dict[Tuple[str, ...], "asyncio.Task[List[TrackRow]]"] = {}
+        self._closed = False
+
+    @property
+    def market(self) -> str:
+        return self._market
+
+    def submit(self, q: str) -> None:
+        q = " ".join(q.split())
+        sig = query_signature(q)
+        if self._closed or not q or sig in self._tasks or len(self._tasks) >= self._max_queries:
+            return
+        METRICS.inc("spotify_prefetch_submitted")
+        task = asyncio.ensure_future(self._service._search_once(q=q, market=self._market, limit=SpotifyService.PAGE_SIZE))
+        # 쓰이지 않은 Task의 예외가 "never retrieved" 경고로 남지 않도록
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._tasks[sig] = task
+
+    def take(self, q: str) -> Optional["asyncio.Task[List[TrackRow]]"]:
+        return self._tasks.get(query_signature(q))
+
+    def close(self) -> None:
+        # 진행 중인 Task는 끝까지 두어 검색 캐시를 채우게 한다
+        self._closed = True
+
+
+class AsyncSpotifyService:
+    """
+    SpotifyService의 asyncio 버전 (httpx.AsyncClient):
+    - 같은 TrackRow / SearchCache / TrackCorpus / QueryPlanner / RequestScheduler / SharedState 사용
+      (스케줄러를 넘기면 동기 서비스와 같은 속도 제한 버킷을 공유)
+    - Retry-After / backoff 대기는 asyncio.sleep → 기다리는 동안 같은 루프의 다른 추천이 진행
+    - 동시 요청 상한은 Semaphore(max_in_flight), 진행 중인 동일 검색/토큰 갱신은 Task 하나로 합침
+    - SearchCache / TrackCorpus / SharedState 호출(SQLite·Redis 블로킹 I/O)은 asyncio.to_thread로 루프 밖에서 실행
+    - 검색 순서와 중단 규칙은 동기 버전과 같음: 코퍼스 → 전략 첫 페이지 → 깊은 페이지 → 대체 쿼리,
+      앞에서부터 max_in_flight개씩 띄우고 목표 곡 수를 채우면 남은 요청 취소
+    - 한 이벤트 루프 안에서만 사용 (동기 코드에서는 services.async_runner.AsyncRecommender 경유)
+    """
+
+    TOKEN_URL = SpotifyService.TOKEN_URL
+    SEARCH_URL = SpotifyService.SEARCH_URL
+    AUDIO_FEATURES_URL = SpotifyService.AUDIO_FEATURES_URL
+    AUDIO_FEATURES_BATCH = SpotifyService.AUDIO_FEATURES_BATCH
+    PAGE_SIZE = SpotifyService.PAGE_SIZE
+    MAX_OFFSET = SpotifyService.MAX_OFFSET
+    TOKEN_LEASE_S = SpotifyService.TOKEN_LEASE_S
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        max_in_flight: int = 8,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        search_cache: Optional[SearchCache] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        track_corpus: Optional[TrackCorpus] = None,
+        shared_state: Optional[SharedState] = None,
+    ) -> None:
+        self._client_id = client_id
+        self._client_secret = client_secret
+        self._token: Optional[str] = None
+        self._token_expire_at: float = 0.0
+        self._shared_state = shared_state
+        self._token_key = "spotify:token:" + hashlib.sha256(client_id.encode("utf-8")).hexdigest()[:16]
+        self._max_in_flight = max(1, int(max_in_flight))
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=self._max_in_flight, max_keepalive_connections=self._max_in_flight),
+        )
+        self._search_cache = search_cache
+        self._scheduler = scheduler or RequestScheduler()
+        self._track_corpus = track_corpus
+        self._planner = QueryPlanner()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self._features: "OrderedDict[str, Optional[Tuple[float, float, float]]]" = OrderedDict()
+        self._features_max = 50_000
+        self._features_disabled_until = 0.0
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+        if self._search_cache is not None:
+            self._search_cache.close()
+        if self._track_corpus is not None:
+            self._track_corpus.close()
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        return self._scheduler
+
+    @property
+    def search_cache(self) -> Optional[SearchCache]:
+        return self._search_cache
+
+    @property
+    def query_planner(self) -> QueryPlanner:
+        return self._planner
+
+    @property
+    def features_available(self) -> bool:
+        """audio-features를 쓸 수 있는지 (403/404 이후 한동안 False → 재정렬용 후보를 더 모을 필요 없음)"""
+        return time.time() >= self._features_disabled_until
+
+    async def _single_flight(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        task = self._inflight.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+
+        async def run() -> Any:
+            try:
+                return await fn()
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        self._inflight[key] = task
+        return await asyncio.shield(task), False
+
+    async def _send(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        # 세마포어는 처음 쓰는 루프에서 만든다 (생성 시점에 루프가 없을 수 있음)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_in_flight)
+        async with self._semaphore:
+            return await self._scheduler.acall(
+                lambda: self._client.request(method, url, **kwargs),
+                _TRANSIENT_ERRORS,
+            )
+
+    # ---- token ----
+    async def _get_access_token(self) -> str:
+        if self._token and time.time() < (self._token_expire_at - 30):
+            return self._token
+        token, _ = await self._single_flight("token", self._refresh_token)
+        return str(token)
+
+    async def _adopt_shared_token(self) -> bool:
+        assert self._shared_state is not None
+        entry = await asyncio.to_thread(self._shared_state.get, self._token_key)
+        if entry is None or entry[1] <= 30:
+            return False
+        self._token = entry[0]
+        self._token_expire_at = time.time() + entry[1]
+        return True
+
+    async def _refresh_token(self) -> str:
+        if self._shared_state is not None:
+            if await self._adopt_shared_token():
+                METRICS.inc("spotify_token_shared_hits")
+                return self._token  # type: ignore[return-value]
+            # 이미 선점돼 있을 때(False)만 대기, 저장소 장애(None)면 바로 갱신
+            leased = await asyncio.to_thread(
+                self._shared_state.add, self._token_key + ":lease", str(os.getpid()), self.TOKEN_LEASE_S
+            )
+            if leased is False:
+                deadline = time.monotonic() + self.TOKEN_LEASE_S
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                    if await self._adopt_shared_token():
+                        METRICS.inc("spotify_token_shared_hits")
+                        return self._token  # type: ignore[return-value]
+
+        METRICS.inc("spotify_token_refreshes")
+        now = time.time()
+        auth = base64.b64encode(f"{self._client_id}:{self._client_secret}".encode("utf-8")).decode("utf-8")
+        resp = await self._send(
+            "POST",
+            self.TOKEN_URL,
+            headers={"Authorization": f"Basic {auth}"},
+            data={"grant_type": "client_credentials"},
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        self._token = data["access_token"]
+        self._token_expire_at = now + int(data.get("expires_in", 3600))
+        if self._shared_state is not None:
+            await asyncio.to_thread(self._publish_token, self._shared_state, self._token, self._token_expire_at)
+        return self._token
+
+    def _publish_token(self, shared_state: SharedState, token: str, expire_at: float) -> None:
+        shared_state.set(self._token_key, token, expire_at - time.time())
+        shared_state.delete(self._token_key + ":lease")
+
+    # ---- search ----
+    async def _search_once(self, q: str, market: str, limit: int = 50, offset: int = 0) -> List[TrackRow]:
+        key = make_key(q, market, limit, offset)
+        if self._search_cache is not None:
+            cached = await asyncio.to_thread(self._search_cache.get, key)
+            if cached is not None:
+                METRICS.inc("spotify_search_cache_hits")
+                return [TrackRow(*v) for v in cached]
+
+        async def fetch() -> List[TrackRow]:
+            fields = await self._fetch_search(q=q, market=market, limit=limit, offset=offset)
+            if self._search_cache is not None:
+                await asyncio.to_thread(self._search_cache.put, key, fields)
+            return [TrackRow(*f) for f in fields]
+
+        rows, shared = await self._single_flight(("search", key), fetch)
+        if shared:
+            METRICS.inc("spotify_singleflight_shared")
+        return rows
+
+    async def _fetch_search(self, q: str, market: str, limit: int, offset: int) -> List[TrackFields]:
+        token = await self._get_access_token()
+        METRICS.inc("spotify_calls")
+        t0 = time.perf_counter()
+        resp = await self._send(
+            "GET",
+            self.SEARCH_URL,
+            headers={"Authorization": f"Bearer {token}"},
+            params={"q": q, "type": "track", "market": market, "limit": limit, "offset": offset},
+        )
+        resp.raise_for_status()
+        fields = search_track_fields(resp.content)
+        METRICS.observe("spotify_search", time.perf_counter() - t0)
+        if self._track_corpus is not None:
+            try:
+                await asyncio.to_thread(self._track_corpus.add, fields, query=q, market=market)
+            except sqlite3.Error:
+                METRICS.inc("track_corpus_errors")
+        return fields
+
+    def start_prefetch(self, market: str, max_queries: Optional[int] = None) -> AsyncSearchPrefetch:
+        return AsyncSearchPrefetch(self, market=market, max_queries=max_queries or self._max_in_flight)
+
+    async def _run_pages(
+        self,
+        pages: Iterable[Tuple[str, int]],
+        market: str,
+        prefetch: Optional[AsyncSearchPrefetch],
+        consume: Callable[[str, int, List[TrackRow]], bool],
+    ) -> None:
+        """
+        (query, offset) 페이지를 최대 max_in_flight개씩 미리 띄우고 **입력 순서대로** consume에 넘긴다.
+        consume이 True(목표 달성)를 돌려주면 아직 대기 중인 Task를 취소하고 끝낸다.
+        """
+        if prefetch is not None and prefetch.market != market:
+            prefetch = None
+
+        def start(q: str, offset: int) -> "asyncio.Future[List[TrackRow]]":
+            ready = prefetch.take(q) if prefetch is not None and offset == 0 else None
+            if ready is not None:
+                return ready
+            return asyncio.ensure_future(self._search_once(q=q, market=market, limit=self.PAGE_SIZE, offset=offset))
+
+        pending: List[Tuple[str, int, "asyncio.Future[List[TrackRow]]"]] = []
+        it = iter(pages)
+        try:
+            for q, offset in it:
+                pending.append((q, offset, start(q, offset)))
+                if len(pending) >= self._max_in_flight:
+                    break
+            while pending:
+                q, offset, head = pending.pop(0)
+                rows = await head
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append((nxt[0], nxt[1], start(*nxt)))
+                if consume(q, offset, rows):
+                    return
+        finally:
+            for q, _, f in pending:
+                # prefetch Task는 캐시를 채우도록 남겨 둔다
+                if prefetch is None or prefetch.take(q) is not f:
+                    f.cancel()
+
+    async def search_tracks_from_strategy(
+        self,
+        strategy: object,
+        market: str,
+        target_count: int,
+        allow_explicit: bool,
+        prefetch: Optional[AsyncSearchPrefetch] = None,
+        use_corpus: bool = True,
+        target: Optional[TargetProfile] = None,
+        rerank_pool: int = 2,
+        max_deep_pages: int = 4,
+    ) -> List[TrackRow]:
+        """SpotifyService.search_tracks_from_strategy(concurrent=True)와 같은 결과 순서/규칙"""
+        t0 = time.perf_counter()
+        # audio-features가 막혀 있으면 재정렬할 근거가 없으므로 후보를 더 모으지 않는다
+        expand = target is not None and self.features_available
+        pool_size = target_count * max(1, rerank_pool) if expand else target_count
+        search_queries: List[str] = list(getattr(strategy, "search_queries"))
+        keywords: List[str] = list(getattr(strategy, "keywords"))
+        seed_genres: List[str] = list(getattr(strategy, "seed_genres"))
+
+        plan = self._planner.plan(search_queries, build_fallback_queries(keywords=keywords, seed_genres=seed_genres))
+        sources = dict(plan)
+        seen: Set[str] = set()
+        first_pages: Dict[str, Tuple[int, int]] = {}
+        out: List[TrackRow] = []
+
+        if use_corpus and self._track_corpus is not None:
+            try:
+                local = await asyncio.to_thread(
+                    self._track_corpus.search, keywords + seed_genres, market, allow_explicit, pool_size
+                )
+            except sqlite3.Error:
+                METRICS.inc("track_corpus_errors")
+                local = []
+            METRICS.inc("track_corpus_served", len(local))
+            for v in local:
+                row = TrackRow(*v)
+                if row.track_id not in seen and len(out) < pool_size:
+                    seen.add(row.track_id)
+                    out.append(row)
+
+        def consume(q: str, offset: int, rows: List[TrackRow]) -> bool:
+            source = sources.get(q, FALLBACK)
+            if offset > 0:
+                METRICS.inc("spotify_deep_pages")
+            elif source == FALLBACK:
+                METRICS.inc("spotify_fallback_queries")
+            passed = 0
+            for r in rows:
+                if r.track_id in seen:
+                    continue
+                seen.add(r.track_id)
+                if not allow_explicit and r.explicit:
+                    continue
+                passed += 1
+                out.append(r)
+                if len(out) >= pool_size:
+                    # 동기 버전과 같이 중간에 끊긴 페이지는 수율 통계에 넣지 않는다
+                    return True
+            if offset == 0:
+                self._planner.record(q, source, passed)
+                first_pages[q] = (len(rows), passed)
+            return False
+
+        try:
+            if len(out) < pool_size:
+                await self._run_pages(((q, 0) for q, s in plan if s == STRATEGY), market, prefetch, consume)
+            if len(out) < pool_size:
+                deep = plan_deep_pages(first_pages, max(0, max_deep_pages), self.PAGE_SIZE, self.MAX_OFFSET)
+                await self._run_pages(deep, market, prefetch, consume)
+            if len(out) < pool_size:
+                await self._run_pages(((q, 0) for q, s in plan if s != STRATEGY), market, prefetch, consume)
+        finally:
+            METRICS.observe("search_tracks_from_strategy", time.perf_counter() - t0)
+
+        tracks = out[:pool_size]
+        if target is None:
+            return tracks
+        return await self.rerank_tracks(tracks, target, limit=target_count)
+
+    # ---- audio features / rerank ----
+    async def _fetch_audio_features_batch(self, ids: List[str]) -> Dict[str, Optional[Tuple[float, float, float]]]:
+        token = await self._get_access_token()
+        METRICS.inc("spotify_audio_features_calls")
+        resp = await self._send(
+            "GET",
+            self.AUDIO_FEATURES_URL,
+            headers={"Authorization": f"Bearer {token}"},
+            params={"ids": ",".join(ids)},
+        )
+        if resp.status_code in (403, 404):
+            self._features_disabled_until = time.time() + 3600
+            return {}
+        resp.raise_for_status()
+        return audio_features_from_payload(resp.json(), ids)
+
+    async def get_audio_features(self, track_ids: List[str]) -> Dict[str, Tuple[float, float, float]]:
+        known = {tid: self._features[tid] for tid in track_ids if tid in self._features}
+        missing = [tid for tid in dict.fromkeys(track_ids) if tid not in known]
+
+        if missing and self.features_available:
+            step = self.AUDIO_FEATURES_BATCH
+            batches = [missing[i : i + step] for i in range(0, len(missing), step)]
+            try:
+                fetched = await asyncio.gather(*(self._fetch_audio_features_batch(b) for b in batches))
+            except httpx.HTTPError:
+                METRICS.inc("spotify_audio_features_errors")
+                fetched = []
+            for part in fetched:
+                for tid, f in part.items():
+                    self._features[tid] = f
+                    known[tid] = f
+            while len(self._features) > self._features_max:
+                self._features.popitem(last=False)
+
+        return {tid: f for tid, f in known.items() if f is not None}
+
+    async def rerank_tracks(self, tracks: List[TrackRow], target: TargetProfile, limit: int) -> List[TrackRow]:
+        if not tracks:
+            return []
+        ids = [t.track_id for t in tracks]
+        features = await self.get_audio_features(ids)
+        with METRICS.timer("rerank"):
+            order = rank_order(ids, features, target)
+        return [tracks[i] for i in order[: max(0, limit)]]
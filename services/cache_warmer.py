@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import fields
+from typing import Any, Dict, List, Optional
+
+from services.metrics import METRICS
+from services.openai_service import OpenAIService, StrategyResult
+from services.pipeline import RecommendationRequest, build_prompt, local_strategy
+from services.spotify_service import SpotifyService
+from services.traffic_log import TrafficLog
+
+_REQUEST_FIELDS = {f.name for f in fields(RecommendationRequest)}
+
+
+def request_from_dict(data: Dict[str, Any]) -> RecommendationRequest:
+    return RecommendationRequest(**{k: v for k, v in data.items() if k in _REQUEST_FIELDS})
+
+
+class CacheWarmer:
+    """
+    인기 입력 조합의 전략/검색 결과를 백그라운드에서 미리 캐시에 채운다.
+    - 대상: TrafficLog 빈도 상위 top_n 조합
+    - 전략 캐시: 없거나 refresh_margin_s 안에 만료되면 새로 생성 (force_fresh)
+    - 검색 캐시: LLM 전략 + 로컬 전략의 쿼리 첫 페이지를 같은 기준으로 갱신
+    - 한 주기의 OpenAI / Spotify 호출 수는 max_openai_calls / max_spotify_calls 이하 (빈도 높은 조합부터 소진)
+    - start(): 시작 직후 1회 + interval_s마다 반복하는 데몬 스레드
+    """
+
+    def __init__(
+        self,
+        openai_svc: OpenAIService,
+        spotify_svc: SpotifyService,
+        traffic: TrafficLog,
+        top_n: int = 20,
+        interval_s: float = 600.0,
+        refresh_margin_s: float = 900.0,
+        max_openai_calls: int = 10,
+        max_spotify_calls: int = 120,
+        queries_per_strategy: int = 4,
+    ) -> None:
+        self._openai_svc = openai_svc
+        self._spotify_svc = spotify_svc
+        self._traffic = traffic
+        self._top_n = int(top_n)
+        self._interval_s = float(interval_s)
+        self._refresh_margin_s = float(refresh_margin_s)
+        self._max_openai_calls = int(max_openai_calls)
+        self._max_spotify_calls = int(max_spotify_calls)
+        # 보통 앞쪽 쿼리 몇 개로 목표 곡 수가 채워진다 (SearchPrefetch와 같은 기준, QueryPlanner 순서로 앞쪽)
+        self._queries_per_strategy = int(queries_per_strategy)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Dict[str, Any] = {}
+
+    def run_once(self) -> Dict[str, Any]:
+        """한 주기 실행. 반환: 이번 주기 보고 (조합 수, 호출 수, 예산 때문에 건너뛴 수)"""
+        t0 = time.perf_counter()
+        openai_calls = spotify_calls = skipped = errors = 0
+        targets = self._traffic.top(self._top_n)
+        cache = self._openai_svc.strategy_cache
+
+        for data in targets:
+            try:
+                req = request_from_dict(data)
+                strategies: List[StrategyResult] = [local_strategy(req)]
+
+                if cache is not None:
+                    prompt, key = build_prompt(req)
+                    peeked = cache.peek(key)
+                    if peeked is not None and peeked[1] > self._refresh_margin_s:
+                        strategies.append(peeked[0])
+                    elif openai_calls < self._max_openai_calls:
+                        strategies.append(
+                            self._openai_svc.generate_strategy_json(
+                                model=req.model, prompt=prompt, cache_key=key, force_fresh=True
+                            )
+                        )
+                        openai_calls += 1
+                    else:
+                        skipped += 1
+                        if peeked is not None:
+                            strategies.append(peeked[0])
+
+                for strategy in strategies:
+                    budget = self._max_spotify_calls - spotify_calls
+                    if budget <= 0:
+                        skipped += 1
+                        break
+                    spotify_calls += self._spotify_svc.warm_search(
+                        strategy.search_queries,
+                        market=req.market,
+                        refresh_within_s=self._refresh_margin_s,
+                        max_calls=budget,
+                        max_queries=self._queries_per_strategy,
+                    )
+            except Exception:
+                # 미리 채우기는 best-effort: 한 조합이 실패해도 나머지는 계속
+                errors += 1
+
+        METRICS.inc("cache_warmer_openai_calls", openai_calls)
+        METRICS.inc("cache_warmer_spotify_calls", spotify_calls)
+        METRICS.inc("cache_warmer_errors", errors)
+        METRICS.observe("cache_warmer_cycle", time.perf_counter() - t0)
+        self.last_report = {
+            "at": time.time(),
+            "targets": len(targets),
+            "openai_calls": openai_calls,
+            "spotify_calls": spotify_calls,
+            "skipped_budget": skipped,
+            "errors": errors,
+        }
+        return self.last_report
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                # 조합 밖 오류(예: TrafficLog.top의 sqlite3.Error)로 스레드가 죽지 않게: 다음 주기에 재시도
+                METRICS.inc("cache_warmer_errors")
+            self._stop.wait(self._interval_s)
+
+    def start(self) -> bool:
+        if self._thread is not None:
+            return False
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
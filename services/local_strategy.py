@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Tuple
+
+from services.openai_service import StrategyResult
+
+# 장르 → (Spotify 장르 문자열, 영어 검색어, 인접 장르)
+GENRE_TABLE: Dict[str, Tuple[str, List[str], List[str]]] = {
+    "k-pop": ("k-pop", ["kpop"], ["pop", "k-indie"]),
+    "pop": ("pop", ["pop hits"], ["dance pop", "k-pop"]),
+    "hip-hop": ("hip-hop", ["hip hop"], ["r&b", "trap"]),
+    "r&b": ("r&b", ["rnb", "soul"], ["neo soul", "hip-hop"]),
+    "rock": ("rock", ["rock"], ["alternative", "indie"]),
+    "indie": ("indie", ["indie"], ["indie pop", "acoustic"]),
+    "edm": ("edm", ["edm", "electronic"], ["house", "dance pop"]),
+    "j-pop": ("j-pop", ["jpop"], ["city pop", "anime"]),
+    "lofi": ("lo-fi", ["lofi", "lofi beats"], ["chillhop", "jazz"]),
+    "jazz": ("jazz", ["jazz"], ["bossa nova", "lo-fi"]),
+    "classical": ("classical", ["classical", "piano"], ["ambient", "soundtrack"]),
+    "metal": ("metal", ["metal"], ["hard rock", "rock"]),
+    "acoustic": ("acoustic", ["acoustic"], ["folk", "indie"]),
+}
+
+# 감정 톤 → (한국어 키워드, 영어 무드 검색어, 장르 선택이 없을 때 기본 장르)
+TONE_TABLE: Dict[str, Tuple[List[str], List[str], List[str]]] = {
+    "밝고 신나는": (["신나는", "설렘", "기분 좋은"], ["happy", "feel good", "upbeat"], ["pop", "k-pop", "dance pop"]),
+    "차분하고 안정적인": (["차분한", "편안한", "안정"], ["calm", "chill", "relax"], ["acoustic", "lo-fi", "indie"]),
+    "감성적이고 잔잔한": (["감성", "잔잔한", "새벽"], ["emotional", "mellow", "sad"], ["indie", "r&b", "acoustic"]),
+    "강렬하고 공격적인": (["강렬한", "파워풀", "질주"], ["intense", "aggressive", "power"], ["rock", "metal", "hip-hop"]),
+    "몽환적이고 판타지한": (["몽환적인", "꿈같은", "판타지"], ["dreamy", "ethereal", "dream pop"], ["dream pop", "ambient", "indie"]),
+    "코믹/가벼운": (["유쾌한", "가벼운", "발랄한"], ["fun", "playful", "cheerful"], ["pop", "k-pop", "funk"]),
+}
+DEFAULT_TONE = "차분하고 안정적인"
+
+# 에너지 구간(상한 포함) → 템포/에너지 검색어
+ENERGY_TABLE: List[Tuple[int, List[str]]] = [
+    (3, ["slow", "sleepy", "soft"]),
+    (6, ["chill", "groove", "mid tempo"]),
+    (8, ["upbeat", "energetic", "bright"]),
+    (10, ["workout", "high energy", "hype"]),
+]
+
+# 상황 입력에 포함된 단어 → (한국어 키워드, 영어 검색어)
+# 두 글자 이상은 어절 안 어디에 있어도 인정, 한 글자(비/밤/잠)는 _context_match 규칙만
+CONTEXT_TABLE: List[Tuple[Tuple[str, ...], str, str]] = [
+    (("공부", "시험", "집중", "작업", "코딩"), "집중", "focus"),
+    (("운동", "헬스", "러닝", "달리기", "조깅"), "운동", "workout"),
+    (("드라이브", "운전"), "드라이브", "driving"),
+    (("출근", "퇴근", "등굣", "하굣", "통학", "지하철", "버스"), "출퇴근길", "commute"),
+    (("야근", "밤", "밤새", "새벽"), "밤", "late night"),
+    (("잠", "잠들", "수면", "취침"), "잠들기 전", "sleep"),
+    (("카페", "커피"), "카페", "cafe"),
+    (("파티", "클럽"), "파티", "party"),
+    (("비", "비오는", "장마"), "비 오는 날", "rainy day"),
+    (("여행", "산책"), "산책", "walk"),
+]
+
+# 한 글자 키 뒤에 붙어도 같은 단어로 보는 조사 ("비가", "밤에", "잠이")
+_PARTICLES = frozenset({"", "가", "이", "은", "는", "을", "를", "에", "엔", "에는", "도", "만", "의", "에서", "이나", "로"})
+
+CLEAN_TERM = "clean"
+
+
+def _energy_terms(energy: int) -> List[str]:
+    e = min(10, max(1, int(energy)))
+    for upper, terms in ENERGY_TABLE:
+        if e <= upper:
+            return terms
+    return ENERGY_TABLE[-1][1]
+
+
+def _context_match(word: str, tokens: List[str]) -> bool:
+    if len(word) > 1:
+        return any(word in t for t in tokens)
+    # 한 글자 키는 부분 문자열로 찾으면 비행기/밤새/잠깐 같은 단어에 걸리므로 어절 전체(+조사)만
+    return any(t[:1] == word and t[1:] in _PARTICLES for t in tokens)
+
+
+def _dedupe(items: List[str]) -> List[str]:
+    seen = set()
+    out: List[str] = []
+    for x in items:
+        key = " ".join(x.lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            out.append(x)
+    return out
+
+
+def build_local_strategy(
+    mood_text: str,
+    context_text: str,
+    preferred_genres: List[str],
+    energy: int,
+    tone: str,
+    market: str,
+    allow_explicit: bool,
+    n_tracks: int,
+) -> StrategyResult:
+    """
+    폼 입력만으로 LLM 없이 전략을 만든다 (표 조회 + 문자열 조합, 결정적, 1ms 미만).
+    build_strategy_prompt와 같은 인자를 받고 같은 규칙(장르 2~5개, 쿼리 6~12개, 인접 장르 확장)을 따른다.
+    """
+    tone_ko, tone_en, tone_genres = TONE_TABLE.get(tone, TONE_TABLE[DEFAULT_TONE])
+    energy_en = _energy_terms(energy)
+
+    ctx_ko: List[str] = []
+    ctx_en: List[str] = []
+    tokens = re.findall(r"\w+", context_text)
+    for words, ko, en in CONTEXT_TABLE:
+        if any(_context_match(w, tokens) for w in words):
+            ctx_ko.append(ko)
+            ctx_en.append(en)
+
+    # 장르: 선택한 장르(최대 3) + 첫 장르의 인접 장르 1~2개, 선택이 없으면 톤 기본 장르
+    picked = [GENRE_TABLE[g] for g in preferred_genres if g in GENRE_TABLE][:3]
+    if picked:
+        seed_genres = [name for name, _, _ in picked]
+        seed_genres += picked[0][2][: 2 if len(picked) == 1 else 1]
+        genre_terms = [terms[0] for _, terms, _ in picked]
+    else:
+        seed_genres = list(tone_genres)
+        genre_terms = list(tone_genres[:2])
+    seed_genres = _dedupe(seed_genres)[:5]
+
+    mood_words = [w for w in mood_text.split() if len(w) > 1][:2]
+    keywords = _dedupe(mood_words + tone_ko[:2] + ctx_ko[:2] + tone_en[:2] + energy_en[:1])[:10]
+
+    queries: List[str] = []
+    for g in genre_terms[:3]:
+        queries.append(f"{tone_en[0]} {g}")
+        queries.append(f"{energy_en[0]} {g}")
+    for en in ctx_en[:2]:
+        queries.append(f"{en} {genre_terms[0]}")
+        queries.append(f"{en} {tone_en[1]}")
+    queries.append(f"{tone_en[1]} {energy_en[1]}")
+    queries.append(f"{tone_en[2]} playlist")
+    if not allow_explicit:
+        queries.append(f"{CLEAN_TERM} {tone_en[0]} {genre_terms[0]}")
+    search_queries = _dedupe(queries)[:12]
+
+    situation = ", ".join(ctx_ko) if ctx_ko else "지금"
+    return StrategyResult(
+        mood_summary=f"{tone_ko[0]} 분위기의 {situation}에 어울리는 음악" if ctx_ko else f"{tone_ko[0]} 분위기에 어울리는 음악",
+        keywords=keywords,
+        seed_genres=seed_genres,
+        search_queries=search_queries,
+        playlist_theme=f"{situation} · {tone_ko[0]} {seed_genres[0]} 플레이리스트",
+        reason=f"선택한 감정 톤({tone})과 에너지 {energy}에 맞춰 장르/템포 키워드를 조합했어요.",
+    )
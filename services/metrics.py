@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 초 단위 지연 버킷 (prompt 빌드 ~ LLM 전체 생성까지 커버)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)  # 마지막 = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """버킷 상한 기준 근사 분위수"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    프로세스 전역 계측 (상시 켜 두는 용도):
+    - observe(stage, seconds): 단계별 지연 히스토그램
+    - inc(name): 카운터
+    - set_gauge(name, value): 현재값
+    - 락 1개 + O(log buckets) 연산만 하므로 요청당 오버헤드는 마이크로초 수준
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._started_at = time.time()
+
+    def inc(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        # 현재값 지표 (메모리 사용량, 항목 수 등)
+        with self._lock:
+            self._gauges[name] = float(value)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            h = self._histograms.get(stage)
+            if h is None:
+                h = self._histograms[stage] = Histogram()
+            h.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._started_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self._started_at, 1),
+                "counters": dict(sorted(self._counters.items())),
+                "gauges": dict(sorted(self._gauges.items())),
+                "stages": {
+                    name: {
+                        "count": h.count,
+                        "sum_s": round(h.sum, 4),
+                        "mean_ms": round(h.sum / h.count * 1000, 2) if h.count else 0.0,
+                        "p50_ms": round(h.quantile(0.5) * 1000, 1),
+                        "p95_ms": round(h.quantile(0.95) * 1000, 1),
+                        "p99_ms": round(h.quantile(0.99) * 1000, 1),
+                    }
+                    for name, h in sorted(self._histograms.items())
+                },
+            }
+
+    def render_prometheus(self, prefix: str = "playlist") -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f"{prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value:g}")
+            for name, value in sorted(self._gauges.items()):
+                metric = f"{prefix}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value:g}")
+            metric = f"{prefix}_stage_duration_seconds"
+            if self._histograms:
+                lines.append(f"# TYPE {metric} histogram")
+            for stage, h in sorted(self._histograms.items()):
+                acc = 0
+                for bound, c in zip(h.buckets, h.counts):
+                    acc += c
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound:g}"}} {acc}')
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def export_json(self, path: str) -> None:
+        # 원자적 교체: 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+METRICS = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.startswith("/metrics.json"):
+            body = json.dumps(METRICS.to_dict(), ensure_ascii=False).encode("utf-8")
+            ctype = "application/json"
+        elif self.path.startswith("/metrics"):
+            body = METRICS.render_prometheus().encode("utf-8")
+            ctype = "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """/metrics (Prometheus text), /metrics.json 을 제공하는 백그라운드 HTTP 서버"""
+    try:
+        httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError:
+        # 이미 다른 워커가 포트를 잡고 있음
+        return None
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
+    return httpd
@@ -1,12 +1,23 @@
 from __future__ import annotations
 
 import json
+import threading
 import time
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
 
 from openai import OpenAI
 
+from services.metrics import METRICS
+from services.singleflight import SingleFlight
+from services.strategy_cache import StrategyCache, StrategyKey
+from services.strategy_repair import extract_json_object, repair_strategy_fields
+from services.strategy_stream import SearchQueryStreamParser
+from utils.prompt_templates import PROMPT_CACHE_KEY, STRATEGY_SYSTEM_PROMPT
+
 
 @dataclass(frozen=True)
 class StrategyResult:
@@ -18,15 +29,146 @@ class StrategyResult:
     reason: str
 
 
+def strategy_to_json(strategy: StrategyResult) -> str:
+    return json.dumps(asdict(strategy), ensure_ascii=False)
+
+
+def strategy_from_json(payload: str) -> StrategyResult:
+    return StrategyResult(**json.loads(payload))
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    """OpenAI 호출 1회의 토큰/지연 (cached_tokens = 프롬프트 캐시 적중분)"""
+
+    input_tokens: int
+    cached_tokens: int
+    output_tokens: int
+    ttft_s: float
+    total_s: float
+    streamed: bool
+
+
+def usage_from_response(response: Any, ttft_s: float, total_s: float, streamed: bool) -> TokenUsage:
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "input_tokens_details", None)
+    return TokenUsage(
+        input_tokens=int(getattr(usage, "input_tokens", 0) or 0),
+        cached_tokens=int(getattr(details, "cached_tokens", 0) or 0),
+        output_tokens=int(getattr(usage, "output_tokens", 0) or 0),
+        ttft_s=ttft_s,
+        total_s=total_s,
+        streamed=streamed,
+    )
+
+
+def build_strategy_input(prompt: str) -> List[Dict[str, str]]:
+    # 고정 접두부(system) → 가변 입력(user) 순서 유지: 순서를 바꾸면 프롬프트 캐시가 깨진다
+    return [
+        {"role": "system", "content": STRATEGY_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def record_usage(usage: TokenUsage) -> None:
+    METRICS.observe("openai_ttft_stream" if usage.streamed else "openai_ttft_blocking", usage.ttft_s)
+    METRICS.inc("openai_input_tokens", usage.input_tokens)
+    METRICS.inc("openai_cached_input_tokens", usage.cached_tokens)
+    METRICS.inc("openai_output_tokens", usage.output_tokens)
+
+
+def parse_strategy_text(text_out: str) -> StrategyResult:
+    """모델 출력 → StrategyResult (JSON 추출 + 필드 로컬 보정, 실패 시 ValueError)"""
+    try:
+        data = extract_json_object(text_out)
+    except ValueError:
+        METRICS.inc("openai_json_parse_failures")
+        raise
+
+    fields, repaired = repair_strategy_fields(data)
+    if repaired:
+        METRICS.inc("openai_strategy_repairs")
+        for name in repaired:
+            METRICS.inc(f"openai_strategy_repaired_{name}")
+    return StrategyResult(**fields)
+
+
+def hedge_delay(latencies: List[float], quantile: Optional[float], min_s: float, min_samples: int) -> float:
+    """예비 요청까지 기다릴 시간: max(min_s, 최근 응답 시간의 quantile 분위수), 표본이 적으면 min_s"""
+    if quantile is None:
+        return float("inf")
+    samples = sorted(latencies)
+    if len(samples) < min_samples:
+        return min_s
+    idx = min(len(samples) - 1, int(quantile * len(samples)))
+    return max(min_s, samples[idx])
+
+
+def _start_thread(fn: Callable[..., Any], *args: Any) -> "Future[Any]":
+    """fn(*args)를 전용 데몬 스레드에서 바로 시작하고 Future로 결과 전달"""
+    future: "Future[Any]" = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="openai-primary", daemon=True).start()
+    return future
+
+
 class OpenAIService:
     """
     - 응답은 JSON only를 강제
     - JSON 파싱 실패 시 1~2회 재시도
     - 민감정보(키) 로그 출력 금지
+    - strategy_cache + cache_key 지정 시 동일(정규화) 입력은 저장된 전략 재사용
+    - on_query 지정 시 스트리밍 모드: search_queries 원소가 완성되는 즉시 콜백 (검증은 완료 후)
+    - 동시에 들어온 동일 요청은 진행 중인 호출 하나를 함께 기다린다 (single-flight)
+    - 필드 누락/타입 불일치는 재생성 대신 로컬 보정 (검색어가 하나도 없을 때만 재시도)
+    - hedge_quantile 지정 시: 최근 응답 시간의 해당 분위수를 넘기면 예비 요청을 하나 더 보내 먼저 끝난 쪽 사용
+      (1차 요청은 호출마다 전용 스레드에서 바로 시작, 예비 요청은 HEDGE_MAX_BACKUPS개까지만 → 꽉 차면 보내지 않음)
+    - 정적 규칙/스키마는 system 메시지(고정 접두부), 사용자 값은 마지막 user 메시지
+      (접두부가 1024토큰 미만이라 현재는 프롬프트 캐시 대상이 아님, utils/prompt_templates 참고)
+    - 호출마다 입력/캐시/출력 토큰과 첫 토큰까지 시간(TTFT)을 METRICS에 기록 (on_usage로 요청별 확인)
     """
 
-    def __init__(self, api_key: str) -> None:
-        self._client = OpenAI(api_key=api_key)
+    # 분위수 계산에 쓰는 최근 응답 시간 개수 / 이보다 적으면 hedge_min_s만 사용
+    HEDGE_WINDOW = 200
+    HEDGE_MIN_SAMPLES = 20
+    # 동시에 진행할 수 있는 예비 요청 수 (포화 상태에서 예비 요청이 부하를 더 키우지 않도록)
+    HEDGE_MAX_BACKUPS = 8
+
+    def __init__(
+        self,
+        api_key: str,
+        strategy_cache: Optional[StrategyCache] = None,
+        base_url: Optional[str] = None,
+        hedge_quantile: Optional[float] = None,
+        hedge_min_s: float = 2.0,
+    ) -> None:
+        self._client = OpenAI(api_key=api_key, base_url=base_url)
+        self._strategy_cache = strategy_cache
+        # 세션 간 동일 요청 합치기 (서비스가 프로세스 전역 싱글톤이므로 모든 세션이 공유)
+        self._inflight = SingleFlight()
+
+        self._hedge_quantile = hedge_quantile
+        self._hedge_min_s = float(hedge_min_s)
+        self._latency_lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=self.HEDGE_WINDOW)
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_slots = threading.BoundedSemaphore(self.HEDGE_MAX_BACKUPS)
+        if hedge_quantile is not None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=self.HEDGE_MAX_BACKUPS, thread_name_prefix="openai-hedge"
+            )
+
+    @property
+    def strategy_cache(self) -> Optional[StrategyCache]:
+        return self._strategy_cache
 
     def generate_strategy_json(
         self,
@@ -34,41 +176,200 @@ class OpenAIService:
         prompt: str,
         max_retries: int = 2,
         timeout_s: int = 45,
+        cache_key: Optional[StrategyKey] = None,
+        force_fresh: bool = False,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
     ) -> StrategyResult:
-        last_err: Optional[Exception] = None
+        with METRICS.timer("generate_strategy_json"):
+            cache = self._strategy_cache if cache_key is not None else None
+            if cache is not None and not force_fresh:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    METRICS.inc("openai_strategy_cache_hits")
+                    return cached
 
-        for attempt in range(max_retries + 1):
-            try:
-                # Responses API: JSON mode -> text.format: {"type":"json_object"}  :contentReference[oaicite:0]{index=0}
-                resp = self._client.responses.create(
+            def generate() -> StrategyResult:
+                result = self._generate_uncached(
                     model=model,
-                    input=[
-                        {
-                            "role": "system",
-                            "content": "You are a helpful assistant that ONLY outputs valid JSON objects.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    text={"format": {"type": "json_object"}},
-                    timeout=timeout_s,
+                    prompt=prompt,
+                    max_retries=max_retries,
+                    timeout_s=timeout_s,
+                    on_query=on_query,
+                    on_usage=on_usage,
                 )
+                if cache is not None:
+                    cache.put(cache_key, result)
+                return result
 
-                text_out = resp.output_text
-                data = json.loads(text_out)
+            # follower는 on_query를 받지 못하지만, leader의 미리 검색 결과가 검색 캐시에 남는다
+            result, shared = self._inflight.do(cache_key if cache_key is not None else (model, prompt), generate)
+            if shared:
+                METRICS.inc("openai_singleflight_shared")
+            return result
 
-                return StrategyResult(
-                    mood_summary=str(data["mood_summary"]),
-                    keywords=list(data["keywords"]),
-                    seed_genres=list(data["seed_genres"]),
-                    search_queries=list(data["search_queries"]),
-                    playlist_theme=str(data["playlist_theme"]),
-                    reason=str(data["reason"]),
-                )
+    def _generate_uncached(
+        self,
+        model: str,
+        prompt: str,
+        max_retries: int,
+        timeout_s: int,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    ) -> StrategyResult:
+        last_err: Optional[Exception] = None
+
+        for attempt in range(max_retries + 1):
+            METRICS.inc("openai_requests")
+            if attempt > 0:
+                METRICS.inc("openai_retries")
+            try:
+                # 스트리밍은 첫 시도만: 재시도 시에는 이미 전달된 쿼리를 다시 보내지 않도록 일반 호출
+                stream_to = on_query if attempt == 0 else None
+                request = self._hedged_text if self._hedge_executor is not None else self._request_text
+                text_out = request(model=model, prompt=prompt, timeout_s=timeout_s, on_query=stream_to, on_usage=on_usage)
+                return parse_strategy_text(text_out)
             except Exception as e:
                 last_err = e
+                METRICS.inc(f"openai_errors_{type(e).__name__}")
                 # 짧은 backoff
-                time.sleep(0.6 * (attempt + 1))
+                with METRICS.timer("openai_backoff"):
+                    time.sleep(0.6 * (attempt + 1))
 
         # 여기까지 오면 실패
         assert last_err is not None
         raise last_err
+
+    def _request_text(
+        self,
+        model: str,
+        prompt: str,
+        timeout_s: int,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    ) -> str:
+        t0 = time.perf_counter()
+        if on_query is not None:
+            text_out, usage = self._stream_text(model=model, prompt=prompt, timeout_s=timeout_s, on_query=on_query)
+        else:
+            # Responses API: JSON mode -> text.format: {"type":"json_object"}  :contentReference[oaicite:0]{index=0}
+            resp = self._client.responses.create(
+                model=model,
+                input=build_strategy_input(prompt),
+                text={"format": {"type": "json_object"}},
+                prompt_cache_key=PROMPT_CACHE_KEY,
+                timeout=timeout_s,
+            )
+            text_out = resp.output_text
+            # 비스트리밍은 첫 토큰 시점을 알 수 없으므로 전체 응답 시간으로 기록
+            elapsed = time.perf_counter() - t0
+            usage = usage_from_response(resp, ttft_s=elapsed, total_s=elapsed, streamed=False)
+        elapsed = time.perf_counter() - t0
+        METRICS.observe("openai_request", elapsed)
+        with self._latency_lock:
+            self._latencies.append(elapsed)
+        record_usage(usage)
+        if on_usage is not None:
+            on_usage(usage)
+        return text_out
+
+    def hedge_delay_s(self) -> float:
+        """예비 요청을 보내기까지 기다릴 시간: max(hedge_min_s, 최근 응답 시간의 hedge_quantile 분위수)"""
+        with self._latency_lock:
+            samples = list(self._latencies)
+        return hedge_delay(samples, self._hedge_quantile, self._hedge_min_s, self.HEDGE_MIN_SAMPLES)
+
+    def _hedged_text(
+        self,
+        model: str,
+        prompt: str,
+        timeout_s: int,
+        on_query: Optional[Callable[[str], None]] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    ) -> str:
+        """
+        1차 요청이 hedge_delay_s 안에 끝나지 않으면 같은 요청을 하나 더 보내 먼저 성공한 결과를 쓴다.
+        진 쪽 요청은 취소할 수 없으므로 백그라운드에서 끝나게 두고 결과만 버린다.
+        예비 요청은 스트리밍하지 않는다 (쿼리 콜백은 1차 요청만, 결과가 정해지면 더 이상 전달하지 않음).
+        1차 요청은 공용 풀을 거치지 않고 바로 시작 → 대기열에서 기다린 시간이 응답 지연으로 잡히지 않는다.
+        """
+        assert self._hedge_executor is not None
+        done_flag = threading.Event()
+
+        def forward(q: str) -> None:
+            if not done_flag.is_set() and on_query is not None:
+                on_query(q)
+
+        primary = _start_thread(
+            self._request_text, model, prompt, timeout_s, forward if on_query is not None else None, on_usage
+        )
+        try:
+            return primary.result(timeout=self.hedge_delay_s())
+        except FutureTimeoutError:
+            pass
+        finally:
+            if primary.done():
+                done_flag.set()
+
+        if not self._hedge_slots.acquire(blocking=False):
+            # 예비 요청이 이미 가득 참 = 서비스 포화 → 더 보내지 않고 1차 요청만 기다림
+            METRICS.inc("openai_hedges_skipped")
+            try:
+                return primary.result()
+            finally:
+                done_flag.set()
+
+        METRICS.inc("openai_hedges")
+        backup = self._hedge_executor.submit(self._request_text, model, prompt, timeout_s, None, on_usage)
+        backup.add_done_callback(lambda _: self._hedge_slots.release())
+        pending = {primary, backup}
+        last_err: Optional[BaseException] = None
+        try:
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    err = f.exception()
+                    if err is None:
+                        if f is backup:
+                            METRICS.inc("openai_hedge_wins")
+                        return f.result()
+                    last_err = err
+        finally:
+            done_flag.set()
+        assert last_err is not None
+        raise last_err
+
+    def _stream_text(
+        self,
+        model: str,
+        prompt: str,
+        timeout_s: int,
+        on_query: Callable[[str], None],
+    ) -> Tuple[str, TokenUsage]:
+        parser = SearchQueryStreamParser(on_query=on_query)
+        chunks: List[str] = []
+        t0 = time.perf_counter()
+        ttft: Optional[float] = None
+        completed: Any = None
+        stream = self._client.responses.create(
+            model=model,
+            input=build_strategy_input(prompt),
+            text={"format": {"type": "json_object"}},
+            prompt_cache_key=PROMPT_CACHE_KEY,
+            timeout=timeout_s,
+            stream=True,
+        )
+        for event in stream:
+            etype = getattr(event, "type", "")
+            if etype == "response.output_text.delta":
+                if ttft is None:
+                    ttft = time.perf_counter() - t0
+                chunks.append(event.delta)
+                parser.feed(event.delta)
+            elif etype == "response.completed":
+                completed = getattr(event, "response", None)
+            elif etype in ("response.failed", "error"):
+                raise RuntimeError(f"OpenAI stream failed: {etype}")
+        total = time.perf_counter() - t0
+        usage = usage_from_response(completed, ttft_s=total if ttft is None else ttft, total_s=total, streamed=True)
+        return "".join(chunks), usage
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple, TypeVar
+
+from services.metrics import METRICS
+from services.openai_service import OpenAIService, StrategyResult, TokenUsage
+from services.local_strategy import build_local_strategy
+from services.reranker import target_profile
+from services.spotify_service import SpotifyService, TrackRow
+from services.strategy_cache import StrategyKey, make_strategy_key
+from utils.prompt_templates import build_strategy_prompt
+
+
+@dataclass(frozen=True)
+class RecommendationRequest:
+    """app.py 입력 폼과 같은 필드 (배치/벤치마크용)"""
+
+    mood_text: str
+    context_text: str = ""
+    genres: List[str] = field(default_factory=list)
+    energy: int = 5
+    tone: str = "밝고 신나는"
+    market: str = "KR"
+    allow_explicit: bool = False
+    n_tracks: int = 10
+    model: str = "gpt-4o-mini"
+
+
+# 전략 생성 방식
+STRATEGY_LLM = "llm"  # LLM 응답을 끝까지 기다림
+STRATEGY_FALLBACK = "fallback"  # LLM을 llm_budget_s까지만 기다리고, 넘기거나 실패하면 로컬 전략
+STRATEGY_LOCAL = "local"  # 로컬 규칙 전략만 사용
+STRATEGY_MODES = (STRATEGY_LLM, STRATEGY_FALLBACK, STRATEGY_LOCAL)
+
+T = TypeVar("T")
+
+
+def _start_background(fn: Callable[..., T], **kwargs: Any) -> "Future[T]":
+    """
+    호출마다 전용 스레드에서 바로 시작 (고정 크기 풀이면 동시 세션이 많을 때 대기열에서 예산을 다 써 버린다).
+    예산 초과 후에도 LLM 호출은 끝까지 진행 → 결과는 전략 캐시에 남아 다음 요청에 쓰인다.
+    """
+    future: "Future[T]" = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(**kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="strategy-bg", daemon=True).start()
+    return future
+
+
+def strategy_key(req: RecommendationRequest) -> StrategyKey:
+    return make_strategy_key(
+        model=req.model,
+        mood_text=req.mood_text,
+        context_text=req.context_text,
+        preferred_genres=list(req.genres),
+        energy=req.energy,
+        tone=req.tone,
+        market=req.market,
+        allow_explicit=req.allow_explicit,
+        n_tracks=req.n_tracks,
+    )
+
+
+def build_prompt(req: RecommendationRequest) -> Tuple[str, StrategyKey]:
+    with METRICS.timer("build_strategy_prompt"):
+        prompt = build_strategy_prompt(
+            mood_text=req.mood_text,
+            context_text=req.context_text,
+            preferred_genres=list(req.genres),
+            energy=req.energy,
+            tone=req.tone,
+            market=req.market,
+            allow_explicit=req.allow_explicit,
+            n_tracks=req.n_tracks,
+        )
+    return prompt, strategy_key(req)
+
+
+def local_strategy(req: RecommendationRequest) -> StrategyResult:
+    with METRICS.timer("local_strategy"):
+        return build_local_strategy(
+            mood_text=req.mood_text,
+            context_text=req.context_text,
+            preferred_genres=list(req.genres),
+            energy=req.energy,
+            tone=req.tone,
+            market=req.market,
+            allow_explicit=req.allow_explicit,
+            n_tracks=req.n_tracks,
+        )
+
+
+def submit_llm_strategy(
+    openai_svc: OpenAIService,
+    req: RecommendationRequest,
+    force_fresh: bool = False,
+    on_query: Optional[Callable[[str], None]] = None,
+    on_usage: Optional[Callable[[TokenUsage], None]] = None,
+) -> "Future[StrategyResult]":
+    """LLM 전략 생성을 백그라운드로 시작 (즉시 모드의 '다듬기' / 예산 대기용)"""
+    prompt, cache_key = build_prompt(req)
+    return _start_background(
+        openai_svc.generate_strategy_json,
+        model=req.model,
+        prompt=prompt,
+        max_retries=2,
+        cache_key=cache_key,
+        force_fresh=force_fresh,
+        on_query=on_query,
+        on_usage=on_usage,
+    )
+
+
+def strategy_within_budget(
+    pending: "Future[StrategyResult]",
+    req: RecommendationRequest,
+    budget_s: float,
+) -> Tuple[StrategyResult, str]:
+    """
+    LLM 전략을 budget_s까지 기다리고, 넘기거나 실패하면 로컬 전략으로 대체.
+    반환: (전략, 사용한 방식 STRATEGY_LLM / STRATEGY_LOCAL)
+    """
+    try:
+        return pending.result(timeout=budget_s), STRATEGY_LLM
+    except FutureTimeoutError:
+        # 아직 시작하지 않은 호출이면 취소 (이미 진행 중이면 끝까지 진행해 캐시에 남긴다)
+        pending.cancel()
+        METRICS.inc("strategy_local_fallback_timeout")
+    except Exception:
+        METRICS.inc("strategy_local_fallback_error")
+    return local_strategy(req), STRATEGY_LOCAL
+
+
+def run_recommendation(
+    openai_svc: OpenAIService,
+    spotify_svc: SpotifyService,
+    req: RecommendationRequest,
+    force_fresh: bool = False,
+    stream: bool = True,
+    rerank: bool = True,
+    on_usage: Optional[Callable[[TokenUsage], None]] = None,
+    strategy_mode: str = STRATEGY_LLM,
+    llm_budget_s: float = 8.0,
+) -> Tuple[StrategyResult, List[TrackRow]]:
+    """
+    app.py와 같은 순서로 추천 1건 실행:
+    build_strategy_prompt → generate_strategy_json(스트리밍 + 미리 검색) → search_tracks_from_strategy
+    strategy_mode로 LLM 대기 / 예산 초과 시 로컬 대체 / 로컬 전용을 고른다.
+    """
+    if strategy_mode not in STRATEGY_MODES:
+        raise ValueError(f"unknown strategy_mode: {strategy_mode}")
+
+    prefetch = spotify_svc.start_prefetch(market=req.market)
+    try:
+        if strategy_mode == STRATEGY_LOCAL:
+            strategy = local_strategy(req)
+        elif strategy_mode == STRATEGY_FALLBACK:
+            pending = submit_llm_strategy(
+                openai_svc,
+                req,
+                force_fresh=force_fresh,
+                on_query=prefetch.submit if stream else None,
+                on_usage=on_usage,
+            )
+            strategy, _ = strategy_within_budget(pending, req, llm_budget_s)
+        else:
+            prompt, cache_key = build_prompt(req)
+            strategy = openai_svc.generate_strategy_json(
+                model=req.model,
+                prompt=prompt,
+                max_retries=2,
+                cache_key=cache_key,
+                force_fresh=force_fresh,
+                on_query=prefetch.submit if stream else None,
+                on_usage=on_usage,
+            )
+        tracks = spotify_svc.search_tracks_from_strategy(
+            strategy=strategy,
+            market=req.market,
+            target_count=req.n_tracks,
+            allow_explicit=req.allow_explicit,
+            concurrent=True,
+            prefetch=prefetch,
+            target=target_profile(req.energy, req.tone) if rerank else None,
+        )
+    finally:
+        prefetch.close()
+    return strategy, tracks
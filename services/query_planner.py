@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+STRATEGY = "llm"
+FALLBACK = "fallback"
+
+
+def query_signature(q: str) -> Tuple[str, ...]:
+    # 대소문자/공백/단어 순서만 다른 쿼리는 같은 쿼리로 취급
+    return tuple(sorted(q.lower().split()))
+
+
+def query_shape(q: str, source: str) -> str:
+    norm = " ".join(q.lower().split())
+    if norm == "top hits":
+        kind = "top_hits"
+    elif norm.startswith("genre:"):
+        kind = "genre_filter"
+    elif norm.startswith('"'):
+        kind = "quoted"
+    else:
+        kind = f"free_{min(len(norm.split()), 4)}w"
+    return f"{source}:{kind}"
+
+
+class QueryPlanner:
+    """
+    검색 쿼리 실행 계획:
+    - 전송 전 정규화 + 중복 제거 (대소문자/공백/단어 순서 차이 무시, 먼저 나온 원문 유지)
+    - 쿼리 모양(shape)별로 '중복 제거 + 필터 통과 곡 수'의 지수 이동 평균을 누적
+    - 전략 쿼리 → 대체 쿼리 순서는 유지하되, 각 그룹 안에서는 기대 수율이 높은 순으로 실행
+      (통계가 없으면 기존 순서 그대로: 안정 정렬)
+    """
+
+    def __init__(self, alpha: float = 0.2) -> None:
+        self._alpha = float(alpha)
+        self._lock = threading.Lock()
+        self._yield: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+
+    def plan(self, strategy_queries: List[str], fallback_queries: List[str]) -> List[Tuple[str, str]]:
+        """(query, source) 목록. source는 STRATEGY / FALLBACK"""
+        seen = set()
+        groups: List[List[Tuple[str, str]]] = [[], []]
+        for idx, (source, queries) in enumerate(((STRATEGY, strategy_queries), (FALLBACK, fallback_queries))):
+            for q in queries:
+                q = " ".join(q.split())
+                sig = query_signature(q)
+                if not q or sig in seen:
+                    continue
+                seen.add(sig)
+                groups[idx].append((q, source))
+
+        with self._lock:
+            prior = sum(self._yield.values()) / len(self._yield) if self._yield else 0.0
+            expected = dict(self._yield)
+
+        def score(item: Tuple[str, str]) -> float:
+            return -expected.get(query_shape(*item), prior)
+
+        return sorted(groups[0], key=score) + sorted(groups[1], key=score)
+
+    def record(self, q: str, source: str, passed: int) -> None:
+        shape = query_shape(q, source)
+        with self._lock:
+            prev: Optional[float] = self._yield.get(shape)
+            self._yield[shape] = float(passed) if prev is None else prev + self._alpha * (passed - prev)
+            self._samples[shape] = self._samples.get(shape, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                shape: {"expected_yield": round(y, 2), "samples": self._samples.get(shape, 0)}
+                for shape, y in sorted(self._yield.items(), key=lambda kv: -kv[1])
+            }
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+import requests
+
+from services.metrics import METRICS
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class RequestScheduler:
+    """
+    프로세스 전역 요청 스케줄러 (SpotifyService 싱글톤 → 모든 세션이 공유):
+    - 토큰 버킷(rate_per_s, burst)으로 전체 요청 속도 제한
+    - 429 응답의 Retry-After 동안 모든 요청 일시 정지
+    - 429 / 일시적 5xx / 연결 오류는 지수 backoff + jitter로 재시도
+    - 대기열 깊이, 누적 대기(throttle) 시간 등 통계 제공 (stats() + METRICS: spotify_scheduler_* 게이지/카운터,
+      spotify_scheduler_wait 히스토그램 → /metrics, 관리자 패널에서 확인)
+    - call()은 스레드에서 time.sleep으로, acall()은 이벤트 루프에서 asyncio.sleep으로 대기 (같은 버킷 공유)
+    """
+
+    def __init__(
+        self,
+        rate_per_s: float = 10.0,
+        burst: int = 10,
+        max_retries: int = 3,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 8.0,
+        max_retry_after_s: float = 30.0,
+    ) -> None:
+        self._rate = float(rate_per_s)
+        self._burst = float(max(1, burst))
+        self._max_retries = max(0, int(max_retries))
+        self._backoff_base_s = float(backoff_base_s)
+        self._backoff_max_s = float(backoff_max_s)
+        self._max_retry_after_s = float(max_retry_after_s)
+
+        self._lock = threading.Lock()
+        self._tokens = self._burst
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._throttle_s = 0.0
+        self._requests = 0
+        self._retries = 0
+        self._rate_limited = 0
+        self._server_errors = 0
+
+    def _enter_queue(self) -> None:
+        with self._lock:
+            self._queue_depth += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+            # 락 안에서 갱신해야 게이지가 늦게 도착한 옛 값으로 덮이지 않는다
+            METRICS.set_gauge("spotify_scheduler_queue_depth", self._queue_depth)
+            METRICS.set_gauge("spotify_scheduler_max_queue_depth", self._max_queue_depth)
+
+    def _leave_queue(self) -> None:
+        with self._lock:
+            self._queue_depth -= 1
+            METRICS.set_gauge("spotify_scheduler_queue_depth", self._queue_depth)
+
+    def _reserve(self, waited: float) -> float:
+        """토큰 1개를 가져가면 0, 아니면 다시 시도하기까지 기다릴 시간 (Retry-After 차단 포함)"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self._requests += 1
+                self._throttle_s += waited
+                METRICS.observe("spotify_scheduler_wait", waited)
+                if waited > 0:
+                    METRICS.inc("spotify_scheduler_throttle_seconds", waited)
+                return 0.0
+            return (1.0 - self._tokens) / self._rate
+
+    def _acquire(self) -> None:
+        """버킷 토큰 1개를 얻을 때까지 대기"""
+        waited = 0.0
+        self._enter_queue()
+        try:
+            while True:
+                delay = self._reserve(waited)
+                if delay <= 0:
+                    return
+                time.sleep(delay)
+                waited += delay
+        finally:
+            self._leave_queue()
+
+    async def _aacquire(self) -> None:
+        waited = 0.0
+        self._enter_queue()
+        try:
+            while True:
+                delay = self._reserve(waited)
+                if delay <= 0:
+                    return
+                await asyncio.sleep(delay)
+                waited += delay
+        finally:
+            self._leave_queue()
+
+    def _block_for(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, min(self._backoff_max_s, self._backoff_base_s * (2**attempt)))
+
+    @staticmethod
+    def _retry_after(resp: Any) -> Optional[float]:
+        raw = resp.headers.get("Retry-After")
+        if raw is None:
+            return None
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            return None
+
+    def call(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        send()를 스케줄러 규칙에 따라 실행한다.
+        재시도 횟수를 모두 쓰면 마지막 응답을 그대로 반환 (raise_for_status는 호출 측 책임).
+        """
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                resp = send()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self._max_retries:
+                    raise
+                with self._lock:
+                    self._retries += 1
+                    METRICS.inc("spotify_scheduler_retries")
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if resp.status_code not in RETRYABLE_STATUS or attempt >= self._max_retries:
+                return resp
+
+            with self._lock:
+                self._retries += 1
+                METRICS.inc("spotify_scheduler_retries")
+                if resp.status_code == 429:
+                    self._rate_limited += 1
+                    METRICS.inc("spotify_scheduler_rate_limited")
+                else:
+                    self._server_errors += 1
+                    METRICS.inc("spotify_scheduler_server_errors")
+
+            if resp.status_code == 429:
+                retry_after = self._retry_after(resp)
+                # Retry-After가 너무 길면 사용자를 붙잡지 않고 바로 실패 처리
+                if retry_after is not None and retry_after > self._max_retry_after_s:
+                    return resp
+                self._block_for(retry_after if retry_after is not None else self._backoff(attempt))
+            else:
+                time.sleep(self._backoff(attempt))
+            resp.close()
+            attempt += 1
+
+    async def acall(
+        self,
+        send: Callable[[], Awaitable[Any]],
+        transient_errors: Tuple[Type[BaseException], ...],
+    ) -> Any:
+        """
+        call()의 asyncio 버전. send()는 응답(status_code, headers)을 돌려주는 코루틴 함수,
+        transient_errors는 재시도할 연결/타임아웃 예외 (HTTP 클라이언트마다 다름).
+        """
+        attempt = 0
+        while True:
+            await self._aacquire()
+            try:
+                resp = await send()
+            except transient_errors:
+                if attempt >= self._max_retries:
+                    raise
+                with self._lock:
+                    self._retries += 1
+                    METRICS.inc("spotify_scheduler_retries")
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if resp.status_code not in RETRYABLE_STATUS or attempt >= self._max_retries:
+                return resp
+
+            with self._lock:
+                self._retries += 1
+                METRICS.inc("spotify_scheduler_retries")
+                if resp.status_code == 429:
+                    self._rate_limited += 1
+                    METRICS.inc("spotify_scheduler_rate_limited")
+                else:
+                    self._server_errors += 1
+                    METRICS.inc("spotify_scheduler_server_errors")
+
+            if resp.status_code == 429:
+                retry_after = self._retry_after(resp)
+                if retry_after is not None and retry_after > self._max_retry_after_s:
+                    return resp
+                self._block_for(retry_after if retry_after is not None else self._backoff(attempt))
+            else:
+                await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue_depth,
+                "max_queue_depth": self._max_queue_depth,
+                "throttle_s_total": round(self._throttle_s, 3),
+                "blocked_for_s": round(max(0.0, self._blocked_until - time.monotonic()), 3),
+                "requests": self._requests,
+                "retries": self._retries,
+                "rate_limited": self._rate_limited,
+                "server_errors": self._server_errors,
+            }
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# 감정 톤 → (valence 0~1, tempo BPM) 목표값. 에너지는 슬라이더 값에서 직접 계산.
+TONE_PROFILES: Dict[str, Tuple[float, float]] = {
+    "밝고 신나는": (0.80, 125.0),
+    "차분하고 안정적인": (0.45, 90.0),
+    "감성적이고 잔잔한": (0.30, 80.0),
+    "강렬하고 공격적인": (0.35, 140.0),
+    "몽환적이고 판타지한": (0.40, 100.0),
+    "코믹/가벼운": (0.85, 115.0),
+}
+DEFAULT_TONE_PROFILE = (0.5, 110.0)
+
+# 거리 가중치: energy / valence / tempo
+WEIGHTS = np.array([0.5, 0.3, 0.2])
+TEMPO_SCALE = 200.0
+
+
+@dataclass(frozen=True)
+class TargetProfile:
+    energy: float
+    valence: float
+    tempo: float
+
+    def as_vector(self) -> np.ndarray:
+        return np.array([self.energy, self.valence, self.tempo / TEMPO_SCALE])
+
+
+def target_profile(energy: int, tone: str) -> TargetProfile:
+    """사용자 입력(에너지 1~10, 감정 톤) → audio features 목표값"""
+    valence, tempo = TONE_PROFILES.get(tone, DEFAULT_TONE_PROFILE)
+    e = (min(10, max(1, int(energy))) - 1) / 9.0
+    return TargetProfile(energy=e, valence=valence, tempo=tempo)
+
+
+def rank_order(
+    track_ids: Sequence[str],
+    features: Dict[str, Tuple[float, float, float]],
+    target: TargetProfile,
+) -> List[int]:
+    """
+    후보 전체를 한 번에 벡터 연산으로 점수화해 인덱스 순서를 반환.
+    - features: track_id → (energy, valence, tempo)
+    - feature가 없는 곡은 후보 평균 거리로 취급 (검색 순서 유지 쪽으로)
+    - 동점은 원래 검색 순서 유지 (stable sort)
+    """
+    n = len(track_ids)
+    if n == 0:
+        return []
+    mat = np.full((n, 3), np.nan)
+    for i, tid in enumerate(track_ids):
+        f = features.get(tid)
+        if f is not None:
+            mat[i] = f
+    mat[:, 2] /= TEMPO_SCALE
+
+    dist = np.sqrt(np.nansum(WEIGHTS * (mat - target.as_vector()) ** 2, axis=1))
+    missing = np.isnan(mat).any(axis=1)
+    if missing.all():
+        return list(range(n))
+    dist[missing] = dist[~missing].mean()
+    return np.argsort(dist, kind="stable").tolist()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.metrics import METRICS
+from services.openai_service import StrategyResult
+from services.spotify_service import TrackRow
+
+
+def table_columns(tracks: Sequence[TrackRow]) -> Dict[str, List[Any]]:
+    """TrackRow 목록 → 컬럼별 리스트 (st.dataframe에 그대로 전달, 행마다 dict를 만들지 않는다)"""
+    return {
+        "순번": list(range(1, len(tracks) + 1)),
+        "곡명": [t.track_name for t in tracks],
+        "아티스트": [t.artist_name for t in tracks],
+        "앨범": [t.album_name for t in tracks],
+        "preview_url": [t.preview_url for t in tracks],
+        "spotify_url": [t.spotify_url for t in tracks],
+    }
+
+
+class StoredResult:
+    __slots__ = ("strategy", "source", "track_ids", "stored_at")
+
+    def __init__(self, strategy: StrategyResult, source: str, track_ids: Tuple[str, ...], stored_at: float) -> None:
+        self.strategy = strategy
+        self.source = source
+        self.track_ids = track_ids
+        self.stored_at = stored_at
+
+
+def _row_bytes(row: TrackRow) -> int:
+    # 인스턴스 + 필드 문자열 (intern된 아티스트/앨범명은 곡마다 중복 계산되므로 상한 추정치)
+    return sys.getsizeof(row) + sum(
+        sys.getsizeof(v) for v in (row.track_id, row.track_name, row.artist_name, row.album_name, row.preview_url, row.spotify_url)
+    )
+
+
+def _strategy_bytes(strategy: StrategyResult) -> int:
+    size = sys.getsizeof(strategy)
+    for v in (strategy.mood_summary, strategy.playlist_theme, strategy.reason):
+        size += sys.getsizeof(v)
+    for items in (strategy.keywords, strategy.seed_genres, strategy.search_queries):
+        size += sys.getsizeof(items) + sum(sys.getsizeof(x) for x in items)
+    return size
+
+
+class ResultStore:
+    """
+    추천 결과의 프로세스 전역 저장소 (세션 상태에는 handle 문자열만 둔다).
+    - 곡은 track_id 기준으로 한 번만 보관하고 결과들이 공유 (참조 카운트가 0이 되면 삭제)
+    - 곡 문자열은 sys.intern: 같은 아티스트/앨범명은 세션과 곡을 가리지 않고 한 벌
+    - 결과 = (전략, 출처, track_id 튜플). 전략 객체는 전략 캐시와 같은 인스턴스를 그대로 참조
+    - LRU(max_entries) + TTL, 추정 메모리 사용량은 result_store_bytes 게이지로 노출
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_s: float = 6 * 3600) -> None:
+        self._max_entries = max(1, int(max_entries))
+        self._ttl_s = float(ttl_s)
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._tracks: Dict[str, TrackRow] = {}
+        self._refs: Dict[str, int] = {}
+        self._bytes = 0
+
+    def put(self, strategy: StrategyResult, source: str, tracks: Sequence[TrackRow]) -> str:
+        handle = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            ids = tuple(self._intern(t) for t in tracks)
+            result = StoredResult(strategy, sys.intern(source), ids, now)
+            self._results[handle] = result
+            self._bytes += self._result_bytes(result)
+            self._evict(now)
+            self._publish()
+        return handle
+
+    def get(self, handle: Optional[str]) -> Optional[StoredResult]:
+        if not handle:
+            return None
+        with self._lock:
+            result = self._results.get(handle)
+            if result is None:
+                return None
+            if time.time() - result.stored_at >= self._ttl_s:
+                self._drop(handle)
+                self._publish()
+                return None
+            self._results.move_to_end(handle)
+            return result
+
+    def tracks(self, result: StoredResult) -> List[TrackRow]:
+        with self._lock:
+            return [self._tracks[tid] for tid in result.track_ids if tid in self._tracks]
+
+    def columns(self, handle: Optional[str]) -> Optional[Dict[str, List[Any]]]:
+        result = self.get(handle)
+        return table_columns(self.tracks(result)) if result is not None else None
+
+    def discard(self, handle: Optional[str]) -> None:
+        if not handle:
+            return
+        with self._lock:
+            if handle in self._results:
+                self._drop(handle)
+                self._publish()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"results": len(self._results), "tracks": len(self._tracks), "bytes": self._bytes}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+    def _intern(self, row: TrackRow) -> str:
+        tid = row.track_id
+        if tid in self._tracks:
+            self._refs[tid] += 1
+            return tid
+        shared = TrackRow(
+            track_id=sys.intern(tid),
+            track_name=sys.intern(row.track_name),
+            artist_name=sys.intern(row.artist_name),
+            album_name=sys.intern(row.album_name),
+            preview_url=row.preview_url,
+            spotify_url=row.spotify_url,
+            explicit=row.explicit,
+        )
+        self._tracks[shared.track_id] = shared
+        self._refs[shared.track_id] = 1
+        self._bytes += _row_bytes(shared)
+        return shared.track_id
+
+    @staticmethod
+    def _result_bytes(result: StoredResult) -> int:
+        # 결과 객체 + id 튜플 + 전략 (전략 캐시와 공유되더라도 보수적으로 포함)
+        return sys.getsizeof(result) + sys.getsizeof(result.track_ids) + _strategy_bytes(result.strategy)
+
+    def _drop(self, handle: str) -> None:
+        result = self._results.pop(handle)
+        self._bytes -= self._result_bytes(result)
+        for tid in result.track_ids:
+            self._refs[tid] -= 1
+            if self._refs[tid] <= 0:
+                del self._refs[tid]
+                self._bytes -= _row_bytes(self._tracks.pop(tid))
+
+    def _evict(self, now: float) -> None:
+        # 오래 안 쓴 것부터: TTL 지난 항목 + 용량 초과분
+        while self._results:
+            handle, oldest = next(iter(self._results.items()))
+            if len(self._results) <= self._max_entries and now - oldest.stored_at < self._ttl_s:
+                break
+            self._drop(handle)
+            METRICS.inc("result_store_evictions")
+
+    def _publish(self) -> None:
+        METRICS.set_gauge("result_store_bytes", self._bytes)
+        METRICS.set_gauge("result_store_results", len(self._results))
+        METRICS.set_gauge("result_store_tracks", len(self._tracks))
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.shared_state import SharedState
+
+CacheKey = Tuple[str, str, int, int]
+
+
+def normalize_query(q: str) -> str:
+    # 대소문자/공백 차이만 있는 쿼리는 같은 키로
+    return " ".join(q.lower().split())
+
+
+def make_key(q: str, market: str, limit: int, offset: int) -> CacheKey:
+    return (normalize_query(q), market.strip().upper(), int(limit), int(offset))
+
+
+def _shared_key(key: CacheKey) -> str:
+    return "search:" + json.dumps(list(key), ensure_ascii=False)
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    shared_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.memory_hits + self.shared_hits + self.disk_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class SearchCache:
+    """
+    Spotify 검색 결과 캐시 (2단):
+    - 메모리 LRU (max_memory_entries)
+    - SQLite 디스크 저장소 (max_disk_entries) → Streamlit 재시작/재배포 후에도 유지
+    - TTL 경과 항목은 조회 시 만료 처리, 크기 초과 시 가장 오래 안 쓴 항목부터 삭제
+    - 값은 JSON 직렬화 가능한 리스트 (TrackRow 필드 튜플 목록 등)
+    - shared 지정 시 메모리와 디스크 사이에 워커 간 공유 계층 추가 (한 워커가 받은 결과를 모든 워커가 사용)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_s: float = 6 * 3600,
+        max_memory_entries: int = 512,
+        max_disk_entries: int = 20000,
+        shared: Optional[SharedState] = None,
+    ) -> None:
+        self._ttl_s = float(ttl_s)
+        self._max_memory = max(1, int(max_memory_entries))
+        self._max_disk = max(1, int(max_disk_entries))
+        # 매 put마다 COUNT(*) 하지 않도록 이 횟수마다만 디스크 크기 확인 (정리할 때 10% 여유를 두므로 그 안에서)
+        self._evict_every = max(1, min(100, self._max_disk // 10))
+        self._disk_writes = 0
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[CacheKey, Tuple[float, List[Any]]]" = OrderedDict()
+        self.stats = CacheStats()
+        self._shared = shared
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    q TEXT NOT NULL,
+                    market TEXT NOT NULL,
+                    lim INTEGER NOT NULL,
+                    off INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    used_at REAL NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (q, market, lim, off)
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_used ON search_cache(used_at)")
+
+    def get(self, key: CacheKey) -> Optional[List[Any]]:
+        # 공유 저장소 I/O(네트워크 왕복)는 락 밖에서: 느린 Redis가 메모리 적중까지 막지 않도록
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                stored_at, value = hit
+                if now - stored_at < self._ttl_s:
+                    self._mem.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    return value
+                del self._mem[key]
+                self.stats.expired += 1
+
+        if self._shared is not None:
+            shared = self._shared.get(_shared_key(key))
+            if shared is not None:
+                payload, remaining = shared
+                value = json.loads(payload)
+                with self._lock:
+                    self._put_memory(key, now - max(0.0, self._ttl_s - remaining), value)
+                    self.stats.shared_hits += 1
+                return value
+
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT stored_at, payload FROM search_cache WHERE q=? AND market=? AND lim=? AND off=?",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    stored_at, payload = row
+                    if now - stored_at < self._ttl_s:
+                        value = json.loads(payload)
+                        self._db.execute(
+                            "UPDATE search_cache SET used_at=? WHERE q=? AND market=? AND lim=? AND off=?",
+                            (now, *key),
+                        )
+                        self._put_memory(key, stored_at, value)
+                        self.stats.disk_hits += 1
+                        return value
+                    self._db.execute(
+                        "DELETE FROM search_cache WHERE q=? AND market=? AND lim=? AND off=?",
+                        key,
+                    )
+                    self.stats.expired += 1
+
+            self.stats.misses += 1
+            return None
+
+    def remaining_ttl(self, key: CacheKey) -> Optional[float]:
+        """남은 TTL(초), 없거나 만료면 None. 통계/LRU/used_at은 건드리지 않는다 (캐시 미리 채우기용)"""
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+        stored_at: Optional[float] = hit[0] if hit is not None else None
+        if stored_at is None and self._shared is not None:
+            shared = self._shared.get(_shared_key(key))
+            stored_at = now - max(0.0, self._ttl_s - shared[1]) if shared is not None else None
+        if stored_at is None:
+            with self._lock:
+                if self._db is not None:
+                    row = self._db.execute(
+                        "SELECT stored_at FROM search_cache WHERE q=? AND market=? AND lim=? AND off=?",
+                        key,
+                    ).fetchone()
+                    stored_at = row[0] if row is not None else None
+        if stored_at is None:
+            return None
+        remaining = self._ttl_s - (now - stored_at)
+        return remaining if remaining > 0 else None
+
+    def put(self, key: CacheKey, value: List[Any]) -> None:
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._put_memory(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (*key, now, now, payload),
+                )
+                self._disk_writes += 1
+                if self._disk_writes % self._evict_every == 0:
+                    self._evict_disk()
+        if self._shared is not None:
+            self._shared.set(_shared_key(key), payload, self._ttl_s)
+
+    def _put_memory(self, key: CacheKey, stored_at: float, value: List[Any]) -> None:
+        self._mem[key] = (stored_at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self._max_memory:
+            self._mem.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _evict_disk(self) -> None:
+        assert self._db is not None
+        (count,) = self._db.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        if count <= self._max_disk:
+            return
+        # 매번 1건씩 지우지 않도록 10% 여유를 두고 정리
+        excess = count - int(self._max_disk * 0.9)
+        self._db.execute(
+            "DELETE FROM search_cache WHERE rowid IN "
+            "(SELECT rowid FROM search_cache ORDER BY used_at ASC LIMIT ?)",
+            (excess,),
+        )
+        self._db.execute("DELETE FROM search_cache WHERE stored_at < ?", (time.time() - self._ttl_s,))
+        self.stats.evictions += excess
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
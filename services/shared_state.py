@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import BinaryIO, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from services.metrics import METRICS
+
+
+class SharedState:
+    """
+    여러 워커 프로세스/레플리카가 함께 쓰는 키-값 저장소 (토큰, 검색 캐시, 전략 캐시 공유용).
+    - 값은 문자열, 항목마다 TTL
+    - add(): 키가 없을 때만 저장 (토큰 갱신 같은 일을 워커 하나만 하도록 잠깐 선점)
+    - 공유 저장소 장애는 요청 실패로 번지지 않음: 조회는 None, 저장은 무시, add()는 None (shared_state_errors 카운터)
+    """
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(값, 남은 TTL 초), 없거나 만료면 None"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl_s: float) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl_s: float) -> Optional[bool]:
+        """저장했으면 True, 다른 쪽이 이미 가진 키면 False, 저장소 장애면 None"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteSharedState(SharedState):
+    """
+    한 호스트용: 같은 SQLite 파일을 여러 프로세스가 연다.
+    - 프로세스 간 배타는 SQLite 파일 잠금 (WAL: 읽기는 서로 막지 않고, 쓰기만 busy_timeout 동안 대기)
+    - add()는 BEGIN IMMEDIATE 트랜잭션 안에서 확인 후 저장 → 동시에 시도해도 한 프로세스만 성공
+    - 만료 항목은 쓰기 max_rows/10회마다 정리
+    """
+
+    def __init__(self, path: str, max_rows: int = 50_000, busy_timeout_s: float = 5.0) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._max_rows = max(1, int(max_rows))
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout_s)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS shared_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_shared_state_expires ON shared_state(expires_at)")
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM shared_state WHERE key=? AND expires_at > ?", (key, now)
+                ).fetchone()
+        except sqlite3.Error:
+            METRICS.inc("shared_state_errors")
+            return None
+        return (row[0], row[1] - now) if row is not None else None
+
+    def set(self, key: str, value: str, ttl_s: float) -> None:
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO shared_state VALUES (?, ?, ?)", (key, value, time.time() + ttl_s)
+                )
+                self._after_write()
+        except sqlite3.Error:
+            METRICS.inc("shared_state_errors")
+
+    def add(self, key: str, value: str, ttl_s: float) -> Optional[bool]:
+        now = time.time()
+        try:
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._db.execute(
+                        "SELECT 1 FROM shared_state WHERE key=? AND expires_at > ?", (key, now)
+                    ).fetchone()
+                    if row is None:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO shared_state VALUES (?, ?, ?)", (key, value, now + ttl_s)
+                        )
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+                self._after_write()
+                return row is None
+        except sqlite3.Error:
+            METRICS.inc("shared_state_errors")
+            return None
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                self._db.execute("DELETE FROM shared_state WHERE key=?", (key,))
+        except sqlite3.Error:
+            METRICS.inc("shared_state_errors")
+
+    def _after_write(self) -> None:
+        self._writes += 1
+        if self._writes % max(1, self._max_rows // 10) == 0:
+            self._db.execute("DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class RedisProtocolError(RuntimeError):
+    pass
+
+
+class RedisSharedState(SharedState):
+    """
+    Redis 프로토콜(RESP2) 클라이언트: GET/SET PX/SET NX PX/PTTL/DEL만 사용 (redis 패키지 불필요).
+    - 키는 prefix로 네임스페이스 분리, 연결 1개를 락으로 직렬화 (명령이 작아 대부분 1 RTT)
+    - get()은 GET + PTTL을 한 번에 보내고(파이프라이닝) 응답 2개를 읽는다
+    - 연결이 끊기면 다음 명령에서 다시 연결
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "playlist:",
+        timeout_s: float = 1.0,
+    ) -> None:
+        self._addr = (host, int(port))
+        self._db = int(db)
+        self._password = password
+        self._prefix = prefix
+        self._timeout_s = float(timeout_s)
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader: Optional[BinaryIO] = None
+
+    # ---- RESP ----
+    @staticmethod
+    def _encode(*args: str) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a.encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        return b"".join(out)
+
+    def _read_reply(self) -> object:
+        assert self._reader is not None
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            raise RedisProtocolError(body.decode("utf-8"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            n = int(body)
+            if n < 0:
+                return None
+            data = self._reader.read(n + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            n = int(body)
+            return None if n < 0 else [self._read_reply() for _ in range(n)]
+        raise RedisProtocolError(f"unexpected reply: {line!r}")
+
+    def _connect(self) -> None:
+        sock = socket.create_connection(self._addr, timeout=self._timeout_s)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        setup: List[Tuple[str, ...]] = []
+        if self._password:
+            setup.append(("AUTH", self._password))
+        if self._db:
+            setup.append(("SELECT", str(self._db)))
+        if setup:
+            self._send(setup)
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def _send(self, commands: List[Tuple[str, ...]]) -> List[object]:
+        assert self._sock is not None
+        self._sock.sendall(b"".join(self._encode(*c) for c in commands))
+        return [self._read_reply() for _ in commands]
+
+    def _execute(self, *commands: Tuple[str, ...]) -> Optional[List[object]]:
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._send(list(commands))
+            except (OSError, ConnectionError, RedisProtocolError):
+                self._disconnect()
+                METRICS.inc("shared_state_errors")
+                return None
+
+    # ---- SharedState ----
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        k = self._prefix + key
+        replies = self._execute(("GET", k), ("PTTL", k))
+        if replies is None or replies[0] is None:
+            return None
+        value, pttl = replies
+        # PTTL -1 = 만료 없음 (이 클라이언트는 항상 PX로 저장하므로 외부에서 넣은 키)
+        remaining = float("inf") if pttl == -1 else int(pttl) / 1000.0  # type: ignore[arg-type]
+        return (str(value), remaining) if remaining > 0 else None
+
+    def set(self, key: str, value: str, ttl_s: float) -> None:
+        self._execute(("SET", self._prefix + key, value, "PX", str(max(1, int(ttl_s * 1000)))))
+
+    def add(self, key: str, value: str, ttl_s: float) -> Optional[bool]:
+        replies = self._execute(("SET", self._prefix + key, value, "NX", "PX", str(max(1, int(ttl_s * 1000)))))
+        if replies is None:
+            return None
+        return replies[0] == "OK"
+
+    def delete(self, key: str) -> None:
+        self._execute(("DEL", self._prefix + key))
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+
+def make_shared_state(url: str) -> SharedState:
+    """
+    URL로 백엔드 선택:
+    - sqlite:///.cache/shared.sqlite (상대 경로) / sqlite:////var/run/app/shared.sqlite (절대 경로)
+    - redis://[:password@]host[:port][/db]
+    """
+    u = urlparse(url)
+    if u.scheme == "sqlite":
+        path = u.path[1:] if u.path.startswith("/") else u.path
+        if not path:
+            raise ValueError(f"sqlite URL에 파일 경로가 없습니다: {url}")
+        return SQLiteSharedState(path)
+    if u.scheme == "redis":
+        db = u.path.lstrip("/")
+        return RedisSharedState(
+            host=u.hostname or "127.0.0.1",
+            port=u.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(u.password) if u.password else None,
+        )
+    raise ValueError(f"지원하지 않는 공유 상태 URL입니다: {url}")
@@ -1,14 +1,39 @@
 from __future__ import annotations
 
 import base64
+import hashlib
+import http.cookiejar
+import itertools
+import os
+import sqlite3
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from services.metrics import METRICS
+from services.query_planner import FALLBACK, STRATEGY, QueryPlanner, query_signature
+from services.rate_limiter import RequestScheduler
+from services.reranker import TargetProfile, rank_order
+from services.search_cache import CacheKey, SearchCache, make_key
+from services.shared_state import SharedState
+from services.singleflight import SingleFlight
+from services.spotify_decode import TrackFields, search_track_fields
+from services.track_corpus import TrackCorpus
 
-@dataclass(frozen=True)
+
+class _RejectAllCookies(http.cookiejar.DefaultCookiePolicy):
+    def set_ok(self, cookie: http.cookiejar.Cookie, request: object) -> bool:
+        return False
+
+
+# 검색/캐시/결과 저장소에 대량으로 쌓이므로 인스턴스 __dict__ 없이 (slots, Python 3.10+)
+@dataclass(frozen=True, slots=True)
 class TrackRow:
     track_id: str
     track_name: str
@@ -18,6 +43,18 @@ class TrackRow:
     spotify_url: str
     explicit: bool
 
+    def to_tuple(self) -> TrackFields:
+        # dataclasses.astuple은 필드마다 deepcopy를 거쳐 곡당 ~15us → 캐시/코퍼스 저장용 직접 구성
+        return (
+            self.track_id,
+            self.track_name,
+            self.artist_name,
+            self.album_name,
+            self.preview_url,
+            self.spotify_url,
+            self.explicit,
+        )
+
     def to_dict(self) -> Dict[str, str]:
         return {
             "track_id": self.track_id,
@@ -30,6 +67,56 @@ class TrackRow:
         }
 
 
+class SearchPrefetch:
+    """
+    전략 생성(LLM 스트리밍) 도중 완성된 쿼리를 미리 검색해 두는 핸들.
+    search_tracks_from_strategy(prefetch=...)가 같은 쿼리를 만나면 이 Future를 그대로 사용한다.
+    - 키는 QueryPlanner와 같은 query_signature: 대소문자/공백/단어 순서만 다른 쿼리는 한 번만 검색
+    """
+
+    def __init__(self, service: "SpotifyService", market: str, max_queries: int) -> None:
+        self._service = service
+        self._market = market
+        # 앞쪽 쿼리 몇 개만 미리 검색 (보통 이것만으로 목표 곡 수가 채워짐 → 불필요한 호출 방지)
+        self._remaining = max(0, int(max_queries))
+        self._lock = threading.Lock()
+        self._futures: Dict[Tuple[str, ...], Future] = {}
+        self._closed = False
+
+    @property
+    def market(self) -> str:
+        return self._market
+
+    def submit(self, q: str) -> None:
+        q = " ".join(q.split())
+        sig = query_signature(q)
+        with self._lock:
+            # close 이후의 제출(백그라운드로 계속 도는 LLM 스트림 등)은 무시
+            if self._closed or not q or sig in self._futures or self._remaining <= 0:
+                return
+            self._remaining -= 1
+            if not self._futures:
+                # 워커들이 동시에 토큰을 갱신하지 않도록 첫 제출 전에 확보
+                try:
+                    self._service._get_access_token()
+                except Exception:
+                    # 미리 검색은 best-effort: 오류는 본 검색 단계에서 드러난다
+                    return
+            self._futures[sig] = self._service._submit_search(q=q, market=self._market)
+
+    def take(self, q: str) -> Optional[Future]:
+        with self._lock:
+            return self._futures.pop(query_signature(q), None)
+
+    def close(self) -> None:
+        # 최종 전략에 포함되지 않았거나 쓰이지 않은 미리 검색은 취소
+        with self._lock:
+            self._closed = True
+            for f in self._futures.values():
+                f.cancel()
+            self._futures.clear()
+
+
 class SpotifyService:
     """
     Client Credentials Flow 기반:
@@ -37,97 +124,412 @@ class SpotifyService:
     - market 파라미터 적용
     - 결과 병합 + 중복 제거
     - 결과 부족 시 대체 쿼리 재검색
+    - concurrent 모드: 공유 워커 풀로 쿼리 병렬 실행 (max_in_flight로 동시 요청 상한)
+    - keep-alive 커넥션 풀(requests.Session) 재사용, gzip 응답, connect/read 타임아웃 분리
+    - search_cache 지정 시 (q, market, limit, offset) 단위로 검색 결과 캐시
+    - 모든 요청은 공유 RequestScheduler 경유 (토큰 버킷, Retry-After, 5xx 재시도)
+    - track_corpus 지정 시 받은 곡을 로컬 코퍼스에 쌓고, 전략 keywords/seed_genres로 먼저 조회
+    - 동시에 들어온 동일 검색/토큰 갱신은 진행 중인 요청 하나를 공유 (single-flight)
+    - QueryPlanner: 쿼리 정규화/중복 제거 후 기대 수율이 높은 쿼리부터 실행
+    - target 지정 시 후보 풀의 audio features(100개 단위 일괄 조회)로 에너지/톤 재정렬
+    - 전략 쿼리 첫 페이지로 부족하면 수율 높은 쿼리의 다음 페이지(offset 50, 100, …)를 병렬로 더 읽음
+    - shared_state 지정 시 토큰을 워커 간 공유: 갱신은 잠깐 선점한 워커 하나만 하고 나머지는 결과를 기다림
     """
 
     TOKEN_URL = "https://accounts.spotify.com/api/token"
     SEARCH_URL = "https://api.spotify.com/v1/search"
+    AUDIO_FEATURES_URL = "https://api.spotify.com/v1/audio-features"
+    AUDIO_FEATURES_BATCH = 100
+    PAGE_SIZE = 50
+    # Spotify 검색은 offset + limit <= 1000 까지만 허용
+    MAX_OFFSET = 1000
+    # 다른 워커가 토큰을 갱신 중일 때 기다리는 최대 시간 (넘기면 직접 갱신)
+    TOKEN_LEASE_S = 5.0
 
-    def __init__(self, client_id: str, client_secret: str) -> None:
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        max_in_flight: int = 4,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        pool_maxsize: Optional[int] = None,
+        search_cache: Optional[SearchCache] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        track_corpus: Optional[TrackCorpus] = None,
+        shared_state: Optional[SharedState] = None,
+    ) -> None:
         self._client_id = client_id
         self._client_secret = client_secret
         self._token: Optional[str] = None
         self._token_expire_at: float = 0.0
+        self._shared_state = shared_state
+        self._token_key = "spotify:token:" + hashlib.sha256(client_id.encode("utf-8")).hexdigest()[:16]
+        self._timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self._session = self._build_session(pool_maxsize or max(4, int(max_in_flight)))
+        self._search_cache = search_cache
+        self._scheduler = scheduler or RequestScheduler()
+        self._track_corpus = track_corpus
+        self._inflight = SingleFlight()
+        self._planner = QueryPlanner()
+
+        # audio features는 곡마다 고정값 → 프로세스 메모리에 LRU 보관
+        self._features_lock = threading.Lock()
+        self._features: "OrderedDict[str, Optional[Tuple[float, float, float]]]" = OrderedDict()
+        self._features_max = 50_000
+        # 앱이 audio-features 권한이 없으면(403 등) 한동안 호출하지 않음
+        self._features_disabled_until = 0.0
+
+        # 프로세스 전역 싱글톤(st.cache_resource)으로 공유되므로
+        # 풀 크기 = 모든 세션을 합친 Spotify 동시 요청 상한
+        self._max_in_flight = max(1, int(max_in_flight))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self._max_in_flight > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_in_flight,
+                thread_name_prefix="spotify-search",
+            )
+
+    @staticmethod
+    def _build_session(pool_maxsize: int) -> requests.Session:
+        """
+        세션 간 공유되는 HTTP transport.
+        - 호스트(accounts / api)별 커넥션 풀, 풀이 가득 차면 대기(pool_block)하여 호스트당 연결 수 상한 유지
+        - urllib3 커넥션 풀은 thread-safe. 세션 자체의 상태(헤더/쿠키)는 생성 후 변경하지 않는다.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        # 요청별 Authorization만 쓰므로 쿠키는 저장하지 않는다 (세션 간 상태 공유 방지)
+        session.cookies.set_policy(_RejectAllCookies())
+        return session
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._session.close()
+        if self._search_cache is not None:
+            self._search_cache.close()
+        if self._track_corpus is not None:
+            self._track_corpus.close()
 
     def _get_access_token(self) -> str:
         now = time.time()
         if self._token and now < (self._token_expire_at - 30):
             return self._token
+        # 만료 시점에 여러 세션이 동시에 갱신하지 않도록 하나로 합친다
+        token, _ = self._inflight.do("token", self._refresh_token)
+        return token
+
+    def _refresh_token(self) -> str:
+        now = time.time()
+        if self._token and now < (self._token_expire_at - 30):
+            # 직전에 다른 스레드가 이미 갱신함
+            return self._token
+
+        if self._shared_state is not None:
+            if self._adopt_shared_token():
+                METRICS.inc("spotify_token_shared_hits")
+                return self._token  # type: ignore[return-value]
+            # 한 워커만 갱신하도록 선점, 이미 선점돼 있으면 선점한 워커가 올려 둘 때까지 대기
+            # (저장소 장애(None)면 기다려도 토큰이 올라오지 않으므로 바로 갱신)
+            if self._shared_state.add(self._token_key + ":lease", str(os.getpid()), self.TOKEN_LEASE_S) is False:
+                deadline = time.monotonic() + self.TOKEN_LEASE_S
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    if self._adopt_shared_token():
+                        METRICS.inc("spotify_token_shared_hits")
+                        return self._token  # type: ignore[return-value]
 
         # Client Credentials Flow  :contentReference[oaicite:1]{index=1}
+        METRICS.inc("spotify_token_refreshes")
         basic = f"{self._client_id}:{self._client_secret}".encode("utf-8")
         auth = base64.b64encode(basic).decode("utf-8")
 
-        resp = requests.post(
-            self.TOKEN_URL,
-            headers={"Authorization": f"Basic {auth}"},
-            data={"grant_type": "client_credentials"},
-            timeout=30,
+        resp = self._scheduler.call(
+            lambda: self._session.post(
+                self.TOKEN_URL,
+                headers={"Authorization": f"Basic {auth}"},
+                data={"grant_type": "client_credentials"},
+                timeout=self._timeout,
+            )
         )
         resp.raise_for_status()
         data = resp.json()
 
         self._token = data["access_token"]
         self._token_expire_at = now + int(data.get("expires_in", 3600))
+        if self._shared_state is not None:
+            self._shared_state.set(self._token_key, self._token, self._token_expire_at - time.time())
+            self._shared_state.delete(self._token_key + ":lease")
         return self._token
 
+    def _adopt_shared_token(self) -> bool:
+        assert self._shared_state is not None
+        entry = self._shared_state.get(self._token_key)
+        if entry is None or entry[1] <= 30:
+            return False
+        self._token = entry[0]
+        self._token_expire_at = time.time() + entry[1]
+        return True
+
+    @property
+    def scheduler(self) -> RequestScheduler:
+        return self._scheduler
+
+    @property
+    def search_cache(self) -> Optional[SearchCache]:
+        return self._search_cache
+
+    @property
+    def track_corpus(self) -> Optional[TrackCorpus]:
+        return self._track_corpus
+
+    @property
+    def query_planner(self) -> QueryPlanner:
+        return self._planner
+
+    @property
+    def features_available(self) -> bool:
+        """audio-features를 쓸 수 있는지 (403/404 이후 한동안 False → 재정렬용 후보를 더 모을 필요 없음)"""
+        return time.time() >= self._features_disabled_until
+
     def _search_once(
         self,
         q: str,
         market: str,
         limit: int = 50,
+        offset: int = 0,
+    ) -> List[TrackRow]:
+        key = make_key(q, market, limit, offset)
+        if self._search_cache is not None:
+            cached = self._search_cache.get(key)
+            if cached is not None:
+                METRICS.inc("spotify_search_cache_hits")
+                return [TrackRow(*v) for v in cached]
+
+        def fetch() -> List[TrackRow]:
+            rows = self._fetch_search(q=q, market=market, limit=limit, offset=offset)
+            if self._search_cache is not None:
+                self._search_cache.put(key, [r.to_tuple() for r in rows])
+            return rows
+
+        # 다른 세션이 같은 검색을 진행 중이면 그 결과를 기다려 공유
+        rows, shared = self._inflight.do(("search", key), fetch)
+        if shared:
+            METRICS.inc("spotify_singleflight_shared")
+        return rows
+
+    def _fetch_search(
+        self,
+        q: str,
+        market: str,
+        limit: int,
+        offset: int,
     ) -> List[TrackRow]:
         token = self._get_access_token()
-        resp = requests.get(
-            self.SEARCH_URL,
-            headers={"Authorization": f"Bearer {token}"},
-            params={
-                "q": q,
-                "type": "track",
-                "market": market,
-                "limit": limit,
-            },
-            timeout=30,
+        METRICS.inc("spotify_calls")
+        t0 = time.perf_counter()
+        resp = self._scheduler.call(
+            lambda: self._session.get(
+                self.SEARCH_URL,
+                headers={"Authorization": f"Bearer {token}"},
+                params={
+                    "q": q,
+                    "type": "track",
+                    "market": market,
+                    "limit": limit,
+                    "offset": offset,
+                },
+                timeout=self._timeout,
+            )
         )
         resp.raise_for_status()
-        data = resp.json()
-        items = (data.get("tracks") or {}).get("items") or []
-
-        rows: List[TrackRow] = []
-        for it in items:
-            track_id = it.get("id") or ""
-            name = it.get("name") or ""
-            artists = it.get("artists") or []
-            artist_name = artists[0].get("name") if artists else ""
-            album = it.get("album") or {}
-            album_name = album.get("name") or ""
-            preview_url = it.get("preview_url") or "미리듣기 없음"
-            spotify_url = ((it.get("external_urls") or {}).get("spotify")) or ""
-            explicit = bool(it.get("explicit", False))
-
-            if track_id and spotify_url:
-                rows.append(
-                    TrackRow(
-                        track_id=track_id,
-                        track_name=name,
-                        artist_name=artist_name,
-                        album_name=album_name,
-                        preview_url=preview_url,
-                        spotify_url=spotify_url,
-                        explicit=explicit,
-                    )
-                )
+        fields = search_track_fields(resp.content)
+        METRICS.observe("spotify_search", time.perf_counter() - t0)
+        rows = [TrackRow(*f) for f in fields]
+        if self._track_corpus is not None:
+            try:
+                self._track_corpus.add(fields, query=q, market=market)
+            except sqlite3.Error:
+                # 코퍼스는 보조 저장소: 실패해도 검색 결과는 그대로 반환
+                METRICS.inc("track_corpus_errors")
+        return rows
+
+    def warm_search(
+        self,
+        queries: Iterable[str],
+        market: str,
+        refresh_within_s: float = 0.0,
+        max_calls: Optional[int] = None,
+        max_queries: Optional[int] = None,
+    ) -> int:
+        """
+        검색 캐시 미리 채우기: 쿼리 첫 페이지가 캐시에 없거나 refresh_within_s 안에 만료되면 새로 받아 둔다.
+        max_queries: 실제 요청과 같은 QueryPlanner 순서로 앞에서부터 이만큼만 (요청이 먼저 읽는 페이지)
+        사용자 요청과 워커 풀을 다투지 않도록 순차 실행 (RequestScheduler 속도 제한은 그대로 적용).
+        반환: 실제 Spotify 호출 수
+        """
+        if self._search_cache is None:
+            return 0
+        calls = 0
+        planned = self._planner.plan(list(queries), [])
+        if max_queries is not None:
+            planned = planned[: max(0, max_queries)]
+        for q, _ in planned:
+            if max_calls is not None and calls >= max_calls:
+                break
+            key = make_key(q, market, self.PAGE_SIZE, 0)
+            remaining = self._search_cache.remaining_ttl(key)
+            if remaining is not None and remaining > refresh_within_s:
+                continue
+
+            def fetch(q: str = q, key: CacheKey = key) -> List[TrackRow]:
+                rows = self._fetch_search(q=q, market=market, limit=self.PAGE_SIZE, offset=0)
+                assert self._search_cache is not None
+                self._search_cache.put(key, [r.to_tuple() for r in rows])
+                return rows
+
+            self._inflight.do(("search", key), fetch)
+            calls += 1
+        return calls
+
+    def start_prefetch(self, market: str, max_queries: Optional[int] = None) -> SearchPrefetch:
+        return SearchPrefetch(
+            self,
+            market=market,
+            max_queries=self._max_in_flight if max_queries is None else max_queries,
+        )
+
+    def _submit_search(self, q: str, market: str, offset: int = 0) -> Future:
+        if self._executor is None:
+            f: Future = Future()
+            try:
+                f.set_result(self._search_once(q=q, market=market, limit=self.PAGE_SIZE, offset=offset))
+            except Exception as e:
+                f.set_exception(e)
+            return f
+        return self._executor.submit(self._search_once, q=q, market=market, limit=self.PAGE_SIZE, offset=offset)
+
+    def _iter_search_results(
+        self,
+        pages: Iterable[Tuple[str, int]],
+        market: str,
+        concurrent: bool,
+        prefetch: Optional[SearchPrefetch] = None,
+    ) -> Iterator[Tuple[str, int, List[TrackRow]]]:
+        """
+        (query, offset) 페이지별 (query, offset, 검색 결과)를 **입력 순서대로** 내보낸다.
+        - concurrent=False: 한 번에 하나씩 순차 실행
+        - concurrent=True: 최대 max_in_flight개를 미리 띄워두고 앞에서부터 소비
+        - prefetch에 이미 띄워둔 쿼리(첫 페이지)는 그 결과를 재사용
+        호출 측이 break 하면(generator close) 아직 시작 안 한 요청은 취소된다.
+        """
+        if prefetch is not None and prefetch.market != market:
+            prefetch = None
+
+        def take(q: str, offset: int) -> Optional[Future]:
+            return prefetch.take(q) if prefetch is not None and offset == 0 else None
+
+        if not concurrent or self._executor is None:
+            for q, offset in pages:
+                ready = take(q, offset)
+                if ready is not None:
+                    rows = ready.result()
+                else:
+                    rows = self._search_once(q=q, market=market, limit=self.PAGE_SIZE, offset=offset)
+                yield q, offset, rows
+            return
+
+        # 워커 스레드들이 동시에 토큰을 갱신하지 않도록 미리 확보
+        self._get_access_token()
+
+        def submit(q: str, offset: int) -> Future:
+            ready = take(q, offset)
+            return ready if ready is not None else self._submit_search(q=q, market=market, offset=offset)
+
+        pending: Deque[Tuple[str, int, Future]] = deque()
+        it = iter(pages)
+        try:
+            for q, offset in it:
+                pending.append((q, offset, submit(q, offset)))
+                if len(pending) >= self._max_in_flight:
+                    break
+            while pending:
+                q, offset, head = pending.popleft()
+                rows = head.result()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append((nxt[0], nxt[1], submit(*nxt)))
+                yield q, offset, rows
+        finally:
+            # 조기 종료 시 남은 요청 취소 (이미 실행 중인 요청은 결과만 버림)
+            for _, _, f in pending:
+                f.cancel()
+
+    def _corpus_rows(
+        self,
+        terms: List[str],
+        market: str,
+        allow_explicit: bool,
+        limit: int,
+    ) -> List[TrackRow]:
+        assert self._track_corpus is not None
+        try:
+            rows = [TrackRow(*v) for v in self._track_corpus.search(terms, market, allow_explicit, limit)]
+        except sqlite3.Error:
+            METRICS.inc("track_corpus_errors")
+            return []
+        METRICS.inc("track_corpus_served", len(rows))
         return rows
 
     @staticmethod
-    def _dedupe_keep_order(rows: Iterable[TrackRow]) -> List[TrackRow]:
-        seen: Set[str] = set()
-        out: List[TrackRow] = []
+    def _iter_unique(rows: Iterable[TrackRow], seen: Set[str]) -> Iterator[TrackRow]:
+        # O(1) 증분 중복 제거: seen은 호출 측이 소유
         for r in rows:
             if r.track_id in seen:
                 continue
             seen.add(r.track_id)
-            out.append(r)
-        return out
+            yield r
+
+    def _iter_passing(
+        self,
+        results: Iterable[Tuple[str, int, List[TrackRow]]],
+        sources: Dict[str, str],
+        seen: Set[str],
+        allow_explicit: bool,
+        first_pages: Optional[Dict[str, Tuple[int, int]]] = None,
+    ) -> Iterator[TrackRow]:
+        """
+        중복 제거 + explicit 필터를 통과한 곡만 내보내고,
+        끝까지 소비된 쿼리의 수율(통과 곡 수)을 QueryPlanner에 기록한다.
+        first_pages가 주어지면 첫 페이지의 (받은 곡 수, 통과 곡 수)를 query별로 남긴다.
+        """
+        for q, offset, rows in results:
+            source = sources.get(q, FALLBACK)
+            if offset > 0:
+                METRICS.inc("spotify_deep_pages")
+            elif source == FALLBACK:
+                METRICS.inc("spotify_fallback_queries")
+            passed = 0
+            for r in rows:
+                if r.track_id in seen:
+                    continue
+                seen.add(r.track_id)
+                if not allow_explicit and r.explicit:
+                    continue
+                passed += 1
+                yield r
+            # 수율 통계는 첫 페이지 기준 (깊은 페이지는 쿼리 모양과 무관하게 수율이 떨어짐)
+            if offset == 0:
+                self._planner.record(q, source, passed)
+                if first_pages is not None:
+                    first_pages[q] = (len(rows), passed)
+
+    def _deep_pages(self, first_pages: Dict[str, Tuple[int, int]], budget: int) -> List[Tuple[str, int]]:
+        return plan_deep_pages(first_pages, budget, self.PAGE_SIZE, self.MAX_OFFSET)
 
     def search_tracks_from_strategy(
         self,
@@ -135,52 +537,199 @@ class SpotifyService:
         market: str,
         target_count: int,
         allow_explicit: bool,
+        concurrent: bool = False,
+        prefetch: Optional[SearchPrefetch] = None,
+        use_corpus: bool = True,
+        target: Optional[TargetProfile] = None,
+        rerank_pool: int = 2,
+        max_deep_pages: int = 4,
     ) -> List[TrackRow]:
+        """
+        target(에너지/톤 목표) 지정 시 target_count * rerank_pool 개의 후보를 모은 뒤
+        audio features 거리로 재정렬해 target_count개를 반환 (audio-features가 막혀 있으면 후보를 늘리지 않음).
+        """
+        # audio-features가 막혀 있으면 재정렬할 근거가 없으므로 후보를 더 모으지 않는다
+        expand = target is not None and self.features_available
+        pool_size = target_count * max(1, rerank_pool) if expand else target_count
+        tracks = list(
+            self.iter_tracks_from_strategy(
+                strategy=strategy,
+                market=market,
+                target_count=pool_size,
+                allow_explicit=allow_explicit,
+                concurrent=concurrent,
+                prefetch=prefetch,
+                use_corpus=use_corpus,
+                max_deep_pages=max_deep_pages,
+            )
+        )
+        if target is None:
+            return tracks
+        return self.rerank_tracks(tracks, target, limit=target_count)
+
+    def iter_tracks_from_strategy(
+        self,
+        strategy: object,
+        market: str,
+        target_count: int,
+        allow_explicit: bool,
+        concurrent: bool = False,
+        prefetch: Optional[SearchPrefetch] = None,
+        use_corpus: bool = True,
+        max_deep_pages: int = 4,
+    ) -> Iterator[TrackRow]:
+        """
+        search_tracks_from_strategy의 스트리밍 버전: 최종 순서대로 곡을 하나씩 내보낸다.
+        (점진적 렌더링용. 도중에 close 하면 남은 쿼리 취소)
+        max_deep_pages: 전략 쿼리 첫 페이지로 모자랄 때 대체 쿼리 전에 더 읽을 페이지 수 상한 (요청당)
+        """
         # StrategyResult duck-typing
         search_queries: List[str] = list(getattr(strategy, "search_queries"))
         keywords: List[str] = list(getattr(strategy, "keywords"))
         seed_genres: List[str] = list(getattr(strategy, "seed_genres"))
 
-        # 1) 1차 검색 (전략 쿼리 기반)
-        merged: List[TrackRow] = []
-        for q in search_queries:
-            merged.extend(self._search_once(q=q, market=market, limit=50))
-            if len(merged) >= target_count * 3:
-                break
+        # 1) 전략 쿼리 → 2) 대체 쿼리 (키워드/장르 조합), 정규화/중복 제거 후 수율 순 정렬
+        plan = self._planner.plan(
+            search_queries,
+            build_fallback_queries(keywords=keywords, seed_genres=seed_genres),
+        )
+        sources = dict(plan)
+        seen: Set[str] = set()
+        first_pages: Dict[str, Tuple[int, int]] = {}
 
-        # 2) 결과 부족 시: 대체 쿼리 자동 생성 (키워드/장르 조합)
-        if len(self._dedupe_keep_order(merged)) < target_count:
-            fallbacks = self._build_fallback_queries(keywords=keywords, seed_genres=seed_genres)
-            for q in fallbacks:
-                merged.extend(self._search_once(q=q, market=market, limit=50))
-                if len(self._dedupe_keep_order(merged)) >= target_count:
-                    break
+        def stage(pages: Iterable[Tuple[str, int]]) -> Iterator[TrackRow]:
+            results = self._iter_search_results(pages, market=market, concurrent=concurrent, prefetch=prefetch)
+            yield from self._iter_passing(
+                results, sources, seen=seen, allow_explicit=allow_explicit, first_pages=first_pages
+            )
 
-        # 3) 중복 제거
-        merged = self._dedupe_keep_order(merged)
+        def staged() -> Iterator[TrackRow]:
+            # 1) 전략 쿼리 첫 페이지
+            yield from stage((q, 0) for q, source in plan if source == STRATEGY)
+            # 2) 아직 모자라면 수율 좋은 전략 쿼리의 다음 페이지들 (대체 쿼리보다 관련도가 높음)
+            yield from stage(self._deep_pages(first_pages, max(0, max_deep_pages)))
+            # 3) 대체 쿼리
+            yield from stage((q, 0) for q, source in plan if source != STRATEGY)
 
-        # 4) explicit 필터링
-        if not allow_explicit:
-            merged = [r for r in merged if not r.explicit]
+        # fetch → 중복 제거 → explicit 필터 → take(n)
+        # 필터를 통과한 곡 수로 중단을 판단하므로 필요한 만큼만 Spotify를 호출한다.
+        # concurrent 여부와 관계없이 결과는 요청 순서대로 병합 → 순차 실행과 동일한 결과
+        results = staged()
+        t0 = time.perf_counter()
+        try:
+            allowed: Iterable[TrackRow] = results
+            # 0) 로컬 코퍼스 우선: 채워지면 Spotify 결과 generator는 시작조차 하지 않는다
+            if use_corpus and self._track_corpus is not None:
+                local = self._corpus_rows(keywords + seed_genres, market, allow_explicit, target_count)
+                allowed = itertools.chain(self._iter_unique(local, seen=seen), allowed)
+            yield from itertools.islice(allowed, max(0, target_count))
+        finally:
+            # 목표 수를 채우면 남은(대기 중) 쿼리 취소
+            results.close()
+            METRICS.observe("search_tracks_from_strategy", time.perf_counter() - t0)
 
-        # 5) target_count로 컷
-        return merged[:target_count]
+    def _fetch_audio_features_batch(self, ids: List[str]) -> Dict[str, Optional[Tuple[float, float, float]]]:
+        token = self._get_access_token()
+        METRICS.inc("spotify_audio_features_calls")
+        resp = self._scheduler.call(
+            lambda: self._session.get(
+                self.AUDIO_FEATURES_URL,
+                headers={"Authorization": f"Bearer {token}"},
+                params={"ids": ",".join(ids)},
+                timeout=self._timeout,
+            )
+        )
+        if resp.status_code in (403, 404):
+            self._features_disabled_until = time.time() + 3600
+            return {}
+        resp.raise_for_status()
+        return audio_features_from_payload(resp.json(), ids)
 
-    @staticmethod
-    def _build_fallback_queries(keywords: List[str], seed_genres: List[str]) -> List[str]:
-        kws = [k.strip() for k in keywords if k.strip()]
-        gens = [g.strip() for g in seed_genres if g.strip()]
-
-        out: List[str] = []
-        # 최대한 과도한 쿼리 폭발 방지
-        for g in gens[:3]:
-            out.append(f'genre:"{g}"')
-        for k in kws[:5]:
-            out.append(f'"{k}"')
-        # 혼합
-        for g in gens[:2]:
-            for k in kws[:3]:
-                out.append(f'{k} {g}')
-        # 마지막 광역
-        out.append("top hits")
-        return out
+    def get_audio_features(self, track_ids: List[str]) -> Dict[str, Tuple[float, float, float]]:
+        """track_id → (energy, valence, tempo). 캐시에 없는 곡만 100개 단위로 묶어 조회"""
+        with self._features_lock:
+            known = {tid: self._features[tid] for tid in track_ids if tid in self._features}
+        missing = [tid for tid in dict.fromkeys(track_ids) if tid not in known]
+
+        if missing and self.features_available:
+            step = self.AUDIO_FEATURES_BATCH
+            batches = [missing[i : i + step] for i in range(0, len(missing), step)]
+            try:
+                if self._executor is not None and len(batches) > 1:
+                    fetched = list(self._executor.map(self._fetch_audio_features_batch, batches))
+                else:
+                    fetched = [self._fetch_audio_features_batch(b) for b in batches]
+            except requests.RequestException:
+                # 재정렬은 부가 기능: 실패 시 검색 순서 그대로
+                METRICS.inc("spotify_audio_features_errors")
+                fetched = []
+            with self._features_lock:
+                for part in fetched:
+                    for tid, f in part.items():
+                        self._features[tid] = f
+                        known[tid] = f
+                while len(self._features) > self._features_max:
+                    self._features.popitem(last=False)
+
+        return {tid: f for tid, f in known.items() if f is not None}
+
+    def rerank_tracks(self, tracks: List[TrackRow], target: TargetProfile, limit: int) -> List[TrackRow]:
+        if not tracks:
+            return []
+        ids = [t.track_id for t in tracks]
+        features = self.get_audio_features(ids)
+        with METRICS.timer("rerank"):
+            order = rank_order(ids, features, target)
+        return [tracks[i] for i in order[: max(0, limit)]]
+
+
+def audio_features_from_payload(data: Dict, ids: List[str]) -> Dict[str, Optional[Tuple[float, float, float]]]:
+    """/v1/audio-features 응답 → track_id별 (energy, valence, tempo), 응답에 없는 곡은 None"""
+    out: Dict[str, Optional[Tuple[float, float, float]]] = {tid: None for tid in ids}
+    for f in data.get("audio_features") or []:
+        if f and f.get("id"):
+            out[f["id"]] = (float(f.get("energy", 0.0)), float(f.get("valence", 0.0)), float(f.get("tempo", 0.0)))
+    return out
+
+
+def build_fallback_queries(keywords: List[str], seed_genres: List[str]) -> List[str]:
+    kws = [k.strip() for k in keywords if k.strip()]
+    gens = [g.strip() for g in seed_genres if g.strip()]
+
+    out: List[str] = []
+    # 최대한 과도한 쿼리 폭발 방지
+    for g in gens[:3]:
+        out.append(f'genre:"{g}"')
+    for k in kws[:5]:
+        out.append(f'"{k}"')
+    # 혼합
+    for g in gens[:2]:
+        for k in kws[:3]:
+            out.append(f'{k} {g}')
+    # 마지막 광역
+    out.append("top hits")
+    return out
+
+
+def plan_deep_pages(
+    first_pages: Dict[str, Tuple[int, int]],
+    budget: int,
+    page_size: int,
+    max_offset: int,
+) -> List[Tuple[str, int]]:
+    """
+    첫 페이지가 꽉 찼고(뒤에 더 있음) 통과 곡이 있었던 쿼리의 다음 페이지 목록.
+    통과 곡이 많은 쿼리부터 offset 단위로 번갈아 배치하고 budget개에서 자른다.
+    첫 페이지 결과만으로 정해지므로 concurrent 여부와 관계없이 같은 계획이 나온다.
+    """
+    ranked = sorted(
+        (q for q, (n_rows, passed) in first_pages.items() if n_rows >= page_size and passed > 0),
+        key=lambda q: -first_pages[q][1],
+    )
+    out: List[Tuple[str, int]] = []
+    offset = page_size
+    while ranked and len(out) < budget and offset + page_size <= max_offset:
+        for q in ranked[: budget - len(out)]:
+            out.append((q, offset))
+        offset += page_size
+    return out
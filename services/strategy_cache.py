@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import difflib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.metrics import METRICS
+from services.shared_state import SharedState
+
+
+@dataclass(frozen=True)
+class StrategyKey:
+    """build_strategy_prompt 입력의 정규화된 형태 (+ model)"""
+
+    model: str
+    mood_text: str
+    context_text: str
+    genres: Tuple[str, ...]
+    energy_bucket: int
+    tone: str
+    market: str
+    allow_explicit: bool
+    n_tracks: int
+
+    def without_mood(self) -> Tuple[Any, ...]:
+        return (
+            self.model,
+            self.context_text,
+            self.genres,
+            self.energy_bucket,
+            self.tone,
+            self.market,
+            self.allow_explicit,
+            self.n_tracks,
+        )
+
+
+def _shared_key(key: StrategyKey) -> str:
+    return "strategy:" + json.dumps(asdict(key), ensure_ascii=False, sort_keys=True)
+
+
+def _norm_text(s: str) -> str:
+    return " ".join((s or "").split()).lower()
+
+
+def make_strategy_key(
+    model: str,
+    mood_text: str,
+    context_text: str,
+    preferred_genres: List[str],
+    energy: int,
+    tone: str,
+    market: str,
+    allow_explicit: bool,
+    n_tracks: int,
+    energy_bucket_size: int = 2,
+) -> StrategyKey:
+    # 공백 정리 / 장르 정렬·중복 제거 / 에너지 구간화 (1~2, 3~4, ...)
+    genres = tuple(sorted({g.strip().lower() for g in preferred_genres if g.strip()}))
+    return StrategyKey(
+        model=model,
+        mood_text=_norm_text(mood_text),
+        context_text=_norm_text(context_text),
+        genres=genres,
+        energy_bucket=(int(energy) - 1) // max(1, energy_bucket_size),
+        tone=tone.strip(),
+        market=market.strip().upper(),
+        allow_explicit=bool(allow_explicit),
+        n_tracks=int(n_tracks),
+    )
+
+
+class StrategyCache:
+    """
+    StrategyResult 메모이제이션:
+    - LRU(max_entries) + TTL
+    - mood_similarity 지정 시, 나머지 입력이 같고 기분 텍스트가 충분히 비슷하면 재사용
+    - shared 지정 시 정확히 같은 키는 워커 간 공유 (값은 dumps/loads로 문자열 변환, 유사 매칭은 로컬만)
+    - 공유 값을 loads하지 못하면(깨진 값, 다른 버전의 필드 구성) 미스로 처리하고 그 항목은 지운다
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_s: float = 3600.0,
+        mood_similarity: Optional[float] = None,
+        shared: Optional[SharedState] = None,
+        dumps: Callable[[Any], str] = json.dumps,
+        loads: Callable[[str], Any] = json.loads,
+    ) -> None:
+        self._max_entries = max(1, int(max_entries))
+        self._ttl_s = float(ttl_s)
+        self._mood_similarity = mood_similarity
+        self._shared = shared
+        self._dumps = dumps
+        self._loads = loads
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[StrategyKey, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key: StrategyKey) -> Optional[Any]:
+        # 공유 저장소 조회는 락 밖에서 (네트워크 왕복 동안 다른 세션의 로컬 적중을 막지 않도록)
+        now = time.time()
+        with self._lock:
+            hit = self._lookup(key, now)
+            if hit is not None:
+                self.hits += 1
+                return hit
+
+        shared = self._lookup_shared(key, now)
+        if shared is not None:
+            return shared
+
+        with self._lock:
+            if self._mood_similarity is not None and key.mood_text:
+                near = self._lookup_near(key, now)
+                if near is not None:
+                    self.near_hits += 1
+                    return near
+
+            self.misses += 1
+            return None
+
+    def _lookup(self, key: StrategyKey, now: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if now - stored_at >= self._ttl_s:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _lookup_shared(self, key: StrategyKey, now: float) -> Optional[Any]:
+        if self._shared is None:
+            return None
+        entry = self._shared.get(_shared_key(key))
+        if entry is None:
+            return None
+        payload, remaining = entry
+        value = self._decode_shared(key, payload)
+        if value is None:
+            return None
+        with self._lock:
+            # 로컬 만료 시각을 공유 저장소와 맞춘다
+            self._store(key, now - max(0.0, self._ttl_s - remaining), value)
+            self.shared_hits += 1
+        return value
+
+    def _lookup_near(self, key: StrategyKey, now: float) -> Optional[Any]:
+        assert self._mood_similarity is not None
+        rest = key.without_mood()
+        best: Optional[StrategyKey] = None
+        best_ratio = self._mood_similarity
+        for k, (stored_at, _) in self._entries.items():
+            if k.without_mood() != rest or now - stored_at >= self._ttl_s:
+                continue
+            ratio = difflib.SequenceMatcher(None, key.mood_text, k.mood_text).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = k, ratio
+        if best is None:
+            return None
+        self._entries.move_to_end(best)
+        return self._entries[best][1]
+
+    def peek(self, key: StrategyKey) -> Optional[Tuple[Any, float]]:
+        """(값, 남은 TTL 초). 정확히 같은 키만 보고 LRU 순서/통계는 건드리지 않는다 (캐시 미리 채우기용)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            remaining = self._ttl_s - (time.time() - stored_at)
+            if remaining > 0:
+                return (value, remaining)
+        if self._shared is not None:
+            shared = self._shared.get(_shared_key(key))
+            if shared is not None:
+                value = self._decode_shared(key, shared[0])
+                if value is not None:
+                    return (value, shared[1])
+        return None
+
+    def _decode_shared(self, key: StrategyKey, payload: str) -> Optional[Any]:
+        try:
+            return self._loads(payload)
+        except (ValueError, TypeError, KeyError):
+            METRICS.inc("strategy_cache_decode_errors")
+            assert self._shared is not None
+            self._shared.delete(_shared_key(key))
+            return None
+
+    def put(self, key: StrategyKey, value: Any) -> None:
+        with self._lock:
+            self._store(key, time.time(), value)
+        if self._shared is not None:
+            self._shared.set(_shared_key(key), self._dumps(value), self._ttl_s)
+
+    def _store(self, key: StrategyKey, stored_at: float, value: Any) -> None:
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+STRING_FIELDS = ("mood_summary", "playlist_theme", "reason")
+LIST_FIELDS = ("keywords", "seed_genres", "search_queries")
+
+_SPLIT_RE = re.compile(r"[,\n;/|]+")
+# 쿼리는 공백/슬래시가 의미를 가질 수 있으므로 줄/세미콜론으로만 나눈다
+_QUERY_SPLIT_RE = re.compile(r"[\n;]+")
+
+
+class StrategyRepairError(ValueError):
+    """로컬 보정으로는 쓸 수 있는 전략을 만들 수 없는 응답 (재생성 필요)"""
+
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+    """
+    JSON 객체 파싱. 그대로 안 되면 코드펜스/앞뒤 설명문을 걷어내고
+    첫 '{' ~ 마지막 '}' 구간만 다시 시도한다.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end <= start:
+            raise
+        data = json.loads(text[start : end + 1])
+    if not isinstance(data, dict):
+        raise StrategyRepairError("strategy JSON is not an object")
+    return data
+
+
+def _as_text(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, (list, tuple)):
+        return ", ".join(_as_text(x) for x in v if x is not None)
+    if isinstance(v, dict):
+        return ", ".join(_as_text(x) for x in v.values())
+    return str(v).strip()
+
+
+def _as_list(v: Any, split_re: "re.Pattern[str]") -> List[str]:
+    if v is None:
+        items: List[Any] = []
+    elif isinstance(v, str):
+        items = split_re.split(v)
+    elif isinstance(v, (list, tuple)):
+        items = list(v)
+    elif isinstance(v, dict):
+        items = list(v.values())
+    else:
+        items = [v]
+
+    out: List[str] = []
+    seen = set()
+    for x in items:
+        s = " ".join(_as_text(x).split())
+        if s and s.lower() not in seen:
+            seen.add(s.lower())
+            out.append(s)
+    return out
+
+
+def repair_strategy_fields(data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    StrategyResult 필드를 스키마에 맞게 보정한다.
+    반환: (필드 dict, 보정한 필드 이름 목록). 정상 응답이면 목록은 비어 있다.
+    - 문자열 필드: 누락 → 다른 설명 필드로 대체, 리스트/숫자 → 문자열로
+    - 리스트 필드: 문자열 → 구분자(쉼표 등)로 분리, 원소는 문자열로, 빈 값/중복 제거
+    - search_queries가 비면 keywords x seed_genres 조합으로 생성
+    검색에 쓸 단어가 하나도 없으면 StrategyRepairError.
+    """
+    repaired: List[str] = []
+    out: Dict[str, Any] = {}
+
+    for name in LIST_FIELDS:
+        raw = data.get(name)
+        value = _as_list(raw, _QUERY_SPLIT_RE if name == "search_queries" else _SPLIT_RE)
+        if not isinstance(raw, list) or value != raw:
+            repaired.append(name)
+        out[name] = value
+
+    for name in STRING_FIELDS:
+        raw = data.get(name)
+        value = _as_text(raw)
+        if not isinstance(raw, str) or not value:
+            repaired.append(name)
+        out[name] = value
+
+    if not out["search_queries"]:
+        kws, gens = out["keywords"], out["seed_genres"]
+        if not kws and not gens:
+            raise StrategyRepairError("no usable search terms in strategy")
+        if "search_queries" not in repaired:
+            repaired.append("search_queries")
+        out["search_queries"] = [f"{k} {g}" for g in gens[:2] for k in kws[:3]] or (kws or gens)[:5]
+
+    if not out["mood_summary"]:
+        out["mood_summary"] = out["playlist_theme"] or ", ".join(out["keywords"][:3])
+    if not out["playlist_theme"]:
+        out["playlist_theme"] = out["mood_summary"]
+
+    return out, repaired
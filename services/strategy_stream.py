@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from typing import Callable, List, Optional
+
+
+class SearchQueryStreamParser:
+    """
+    스트리밍 중인 전략 JSON 텍스트를 조각 단위로 받아,
+    최상위 "search_queries" 배열의 문자열 원소가 닫히는 즉시 on_query로 전달한다.
+    - 전체 JSON 검증은 하지 않는다 (스트림 완료 후 json.loads로 최종 검증)
+    - 문자열 이스케이프(\\", \\uXXXX 등) 처리
+    """
+
+    TARGET_KEY = "search_queries"
+
+    def __init__(self, on_query: Callable[[str], None]) -> None:
+        self._on_query = on_query
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+        self._last_key: Optional[str] = None
+        self._expect_key = False
+        self._in_target = False
+        self.emitted: List[str] = []
+
+    def feed(self, chunk: str) -> None:
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._buf.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._buf.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    self._close_string("".join(self._buf))
+                    self._buf = []
+                else:
+                    self._buf.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._last_key == self.TARGET_KEY:
+                    self._in_target = True
+                self._expect_key = ch == "{" and self._depth == 1
+            elif ch in "}]":
+                if self._depth == 2 and self._in_target:
+                    self._in_target = False
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+
+    def _close_string(self, raw: str) -> None:
+        try:
+            value = json.loads(f'"{raw}"')
+        except ValueError:
+            return
+        if self._depth == 1 and self._expect_key:
+            self._last_key = value
+            self._expect_key = False
+        elif self._depth == 2 and self._in_target:
+            q = value.strip()
+            if q:
+                self.emitted.append(q)
+                self._on_query(q)
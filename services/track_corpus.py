@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Sequence, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    # genre:"k-pop" 같은 필드 필터에서도 단어만 추출
+    return [t.lower() for t in _TOKEN_RE.findall(text or "") if t.lower() not in {"genre", "track", "artist"}]
+
+
+def term_units(text: str) -> List[str]:
+    """
+    검색어/키워드 → 색인·조회 단위. 공백으로 나눈 덩어리마다 단어들을 이은 구(phrase): "k-pop" → "k pop", "r&b" → "r b".
+    한 글자짜리 단어 하나뿐인 덩어리는 버린다 (거의 모든 곡에 맞음).
+    """
+    units: List[str] = []
+    for chunk in (text or "").split():
+        toks = tokenize(chunk)
+        if not toks or (len(toks) == 1 and len(toks[0]) < 2):
+            continue
+        units.append(" ".join(toks))
+    return units
+
+
+# terms 컬럼의 단위 구분자 (unicode61 토크나이저에서는 구분 문자라 구가 단위 경계를 넘지 않음)
+_UNIT_SEP = " | "
+# 스키마 버전 (이전 버전 파일은 캐시이므로 지우고 다시 쌓는다)
+_SCHEMA_VERSION = 2
+
+
+class TrackCorpus:
+    """
+    지금까지 Spotify 검색으로 받은 트랙을 모아두는 로컬 코퍼스 (SQLite 테이블 + external-content FTS5 역색인).
+    - 색인 대상: 곡명 / 아티스트 / 앨범 / 이 곡을 돌려준 검색어 (term_units 단위)
+    - market 별로 따로 저장 (시장마다 재생 가능 곡이 다름), (track_id, market) 기본 키로 바로 조회
+    - 전략의 keywords/seed_genres로 먼저 조회하고, 모자란 만큼만 Spotify에 요청하는 용도
+    - 행 수가 max_rows를 넘으면 가장 오래 안 보인 곡부터 삭제
+    """
+
+    def __init__(self, path: str, max_rows: int = 200_000) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._max_rows = max(1, int(max_rows))
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        (version,) = self._db.execute("PRAGMA user_version").fetchone()
+        if version < _SCHEMA_VERSION:
+            # v1: FTS5 테이블 하나에 UNINDEXED 컬럼으로 저장 (track_id 조회가 전체 스캔)
+            self._db.execute("DROP TABLE IF EXISTS track_fts")
+            self._db.execute("DROP TABLE IF EXISTS tracks")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tracks (
+                track_id TEXT NOT NULL,
+                market TEXT NOT NULL,
+                track_name TEXT NOT NULL,
+                artist_name TEXT NOT NULL,
+                album_name TEXT NOT NULL,
+                terms TEXT NOT NULL,
+                preview_url TEXT NOT NULL,
+                spotify_url TEXT NOT NULL,
+                explicit INTEGER NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (track_id, market)
+            );
+            CREATE INDEX IF NOT EXISTS tracks_last_seen ON tracks(last_seen);
+            CREATE VIRTUAL TABLE IF NOT EXISTS track_fts USING fts5(
+                track_name,
+                artist_name,
+                album_name,
+                terms,
+                content = 'tracks',
+                content_rowid = 'rowid',
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS tracks_ai AFTER INSERT ON tracks BEGIN
+                INSERT INTO track_fts(rowid, track_name, artist_name, album_name, terms)
+                VALUES (new.rowid, new.track_name, new.artist_name, new.album_name, new.terms);
+            END;
+            CREATE TRIGGER IF NOT EXISTS tracks_ad AFTER DELETE ON tracks BEGIN
+                INSERT INTO track_fts(track_fts, rowid, track_name, artist_name, album_name, terms)
+                VALUES ('delete', old.rowid, old.track_name, old.artist_name, old.album_name, old.terms);
+            END;
+            CREATE TRIGGER IF NOT EXISTS tracks_au AFTER UPDATE OF track_name, artist_name, album_name, terms ON tracks
+            BEGIN
+                INSERT INTO track_fts(track_fts, rowid, track_name, artist_name, album_name, terms)
+                VALUES ('delete', old.rowid, old.track_name, old.artist_name, old.album_name, old.terms);
+                INSERT INTO track_fts(rowid, track_name, artist_name, album_name, terms)
+                VALUES (new.rowid, new.track_name, new.artist_name, new.album_name, new.terms);
+            END;
+            """
+        )
+        self._db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def add(self, rows: Sequence[Tuple[str, str, str, str, str, str, bool]], query: str, market: str) -> None:
+        """rows: TrackRow 필드 순서의 튜플들 (track_id, track_name, artist_name, album_name, preview_url, spotify_url, explicit)"""
+        if not rows:
+            return
+        market = market.upper()
+        q_units = set(term_units(query))
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for track_id, name, artist, album, preview_url, spotify_url, explicit in rows:
+                    prev = self._db.execute(
+                        "SELECT terms FROM tracks WHERE track_id = ? AND market = ?",
+                        (track_id, market),
+                    ).fetchone()
+                    units: Set[str] = set(q_units)
+                    if prev is not None and prev[0]:
+                        units.update(prev[0].split(_UNIT_SEP))
+                    terms = _UNIT_SEP.join(sorted(units))
+                    if prev is not None and prev[0] == terms:
+                        # 색인 내용이 같으면 FTS는 건드리지 않고 재생 정보/최근 시각만 갱신
+                        self._db.execute(
+                            "UPDATE tracks SET preview_url = ?, spotify_url = ?, explicit = ?, last_seen = ? "
+                            "WHERE track_id = ? AND market = ?",
+                            (preview_url, spotify_url, int(bool(explicit)), now, track_id, market),
+                        )
+                        continue
+                    self._db.execute(
+                        "INSERT INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(track_id, market) DO UPDATE SET "
+                        "track_name = excluded.track_name, artist_name = excluded.artist_name, "
+                        "album_name = excluded.album_name, terms = excluded.terms, "
+                        "preview_url = excluded.preview_url, spotify_url = excluded.spotify_url, "
+                        "explicit = excluded.explicit, last_seen = excluded.last_seen",
+                        (
+                            track_id,
+                            market,
+                            name,
+                            artist,
+                            album,
+                            terms,
+                            preview_url,
+                            spotify_url,
+                            int(bool(explicit)),
+                            now,
+                        ),
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+            self._writes += len(rows)
+            if self._writes >= 1000:
+                self._writes = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM tracks").fetchone()
+        if count <= self._max_rows:
+            return
+        self._db.execute(
+            "DELETE FROM tracks WHERE rowid IN (SELECT rowid FROM tracks ORDER BY last_seen ASC LIMIT ?)",
+            (count - int(self._max_rows * 0.9),),
+        )
+
+    def search(
+        self,
+        terms: Iterable[str],
+        market: str,
+        allow_explicit: bool,
+        limit: int,
+    ) -> List[Tuple[str, str, str, str, str, str, bool]]:
+        """terms 중 하나라도 맞는 곡을 bm25 순으로 (동점은 track_id 순 → 결정적). "k-pop"은 구 "k pop"으로 조회"""
+        units = sorted({u for term in terms for u in term_units(term)})
+        if not units or limit <= 0:
+            return []
+        match = " OR ".join('"' + u.replace('"', '""') + '"' for u in units)
+        sql = (
+            "SELECT t.track_id, t.track_name, t.artist_name, t.album_name, t.preview_url, t.spotify_url, t.explicit "
+            "FROM track_fts JOIN tracks t ON t.rowid = track_fts.rowid "
+            "WHERE track_fts MATCH ? AND t.market = ?"
+        )
+        if not allow_explicit:
+            sql += " AND t.explicit = 0"
+        sql += " ORDER BY bm25(track_fts), t.track_id LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, (match, market.upper(), int(limit))).fetchall()
+        return [(r[0], r[1], r[2], r[3], r[4], r[5], bool(r[6])) for r in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM tracks").fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
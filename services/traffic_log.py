@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+
+from services.strategy_cache import StrategyKey
+
+
+class TrafficLog:
+    """
+    실제 들어온 추천 입력 조합의 빈도 기록 (캐시 미리 채우기 대상 선정용).
+    - 집계 단위는 StrategyKey (정규화된 입력) → 전략 캐시와 같은 기준
+    - 조합마다 대표 요청 1건(처음 본 원문 입력)을 함께 보관해 그대로 재실행
+    - path 미지정 시 메모리 전용, 행 수가 max_rows를 넘으면 가장 오래 안 보인 조합부터 삭제
+    """
+
+    def __init__(self, path: Optional[str] = None, max_rows: int = 5000) -> None:
+        self._max_rows = max(1, int(max_rows))
+        self._lock = threading.Lock()
+        self._writes = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS traffic (
+                key TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                hits INTEGER NOT NULL,
+                last_seen REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_traffic_hits ON traffic(hits)")
+
+    def record(self, key: StrategyKey, request: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO traffic VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(key) DO UPDATE SET hits = hits + 1, last_seen = excluded.last_seen",
+                (json.dumps(asdict(key), ensure_ascii=False, sort_keys=True), json.dumps(request, ensure_ascii=False), now),
+            )
+            self._writes += 1
+            # 매 기록마다 COUNT(*) 하지 않도록 가끔만 정리
+            if self._writes % 100 == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        (count,) = self._db.execute("SELECT COUNT(*) FROM traffic").fetchone()
+        if count <= self._max_rows:
+            return
+        self._db.execute(
+            "DELETE FROM traffic WHERE rowid IN (SELECT rowid FROM traffic ORDER BY last_seen ASC LIMIT ?)",
+            (count - int(self._max_rows * 0.9),),
+        )
+
+    def top(self, n: int, window_s: float = 7 * 86400) -> List[Dict[str, Any]]:
+        """최근 window_s 안에 본 조합 중 빈도 상위 n개의 대표 요청 (빈도 내림차순)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT request FROM traffic WHERE last_seen >= ? ORDER BY hits DESC, last_seen DESC LIMIT ?",
+                (time.time() - window_s, max(0, int(n))),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM traffic").fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,51 +1,74 @@
- (cd "$(git rev-parse --show-toplevel)" && git apply --3way <<'EOF' 
-diff --git a/utils/prompt_templates.py b/utils/prompt_templates.py
-new file mode 100644
-index 0000000000000000000000000000000000000000..17875065eeeca3a38476d89f88fb15467bc010b6
---- /dev/null
-+++ b/utils/prompt_templates.py
-@@ -0,0 +1,41 @@
-+from __future__ import annotations
-+
-+from typing import Any
-+
-+
-+USER_INPUT_GUIDE = """
-+- **기분**: 지금 느끼는 감정을 자유롭게 입력하세요.
-+- **상황/활동**: 공부, 운동, 퇴근길 등 현재 맥락을 적어주세요.
-+- **장르/에너지/톤**: 원하는 분위기에 가까울수록 추천 정확도가 높아집니다.
-+"""
-+
-+
-+def build_system_prompt() -> str:
-+    return (
-+        "너는 음악 추천 전략가다. 한국어 사용자 입력을 해석해 Spotify 검색 전략을 JSON으로 반환하라. "
-+        "반드시 JSON만 출력하고, 마크다운/코드블록을 포함하지 마라. "
-+        "장르 편향을 피하고 다양한 트랙이 나오도록 seed_genres와 search_queries를 구성하라."
-+    )
-+
-+
-+def build_user_prompt(user_input: dict[str, Any]) -> str:
-+    return f"""
-+다음 사용자 입력을 기반으로 플레이리스트 추천 전략을 만들어라.
-+
-+입력:
-+- mood: {user_input.get('mood')}
-+- activity: {user_input.get('activity')}
-+- genres: {user_input.get('genres')}
-+- energy(1-10): {user_input.get('energy')}
-+- tone: {user_input.get('tone')}
-+
-+반드시 아래 JSON 스키마를 지켜라:
-+{{
-+  "mood_summary": "string",
-+  "keywords": ["string", "string", "string"],
-+  "seed_genres": ["spotify genre token"],
-+  "search_queries": ["spotify search query"],
-+  "playlist_theme": "string",
-+  "reason": "string"
-+}}
-+""".strip()
- 
-EOF
-)
+from __future__ import annotations
+
+from typing import List
+
+# 프롬프트 캐시 라우팅 키: STRATEGY_SYSTEM_PROMPT 내용을 바꾸면 함께 올린다
+PROMPT_CACHE_KEY = "playlist-strategy-v2"
+
+# 요청마다 바뀌지 않는 부분 (역할/규칙/스키마) → system 메시지로 항상 같은 접두부를 만든다.
+# 주의: 지금 접두부(약 1천 자, 수백 토큰)는 OpenAI 프롬프트 캐시 최소 길이(1024토큰)보다 짧아 캐시 적중은 기대하지 않는다.
+# 분리해 두는 이유는 입력/출력 토큰 예산을 요청별로 재고(on_usage), 규칙이 길어지면 그대로 캐시 대상이 되게 하기 위함.
+# 캐시는 접두부가 바이트 단위로 같아야 적중하므로 여기에 사용자 값(f-string)을 넣지 말 것.
+STRATEGY_SYSTEM_PROMPT = """
+너는 음악 플레이리스트 큐레이터다. 사용자의 한국어 입력을 바탕으로 Spotify에서 곡을 찾기 위한 "검색 전략"을 생성한다.
+아래 JSON 스키마를 **정확히** 만족하는 **JSON 객체만** 출력하라(설명/마크다운/코드블록 금지).
+사용자 입력은 마지막 [사용자 입력] 블록으로 주어진다.
+
+[장르 다양성 확보 규칙]
+- seed_genres는 2~5개.
+- 사용자가 장르를 선택했으면 그 안에서 시작하되, 사용자 입력의 market 기준으로 너무 한 장르에 치우치지 않게 1~2개는 인접 장르로 확장.
+- 무조건 "k-pop"만 고정하지 말고 상황/에너지에 따라 pop, r&b, edm, indie 등으로 분산.
+- seed_genres는 Spotify 장르 문자열처럼 간단한 소문자/하이픈 형태로.
+
+[검색 쿼리 생성 규칙]
+- search_queries는 6~12개.
+- Spotify 검색에 유리하도록 짧고 명확한 조합을 섞어라:
+  - mood/상황 키워드(한국어/영어 혼합 가능)
+  - 장르
+  - 템포/에너지(예: upbeat, chill, energetic, focus, workout 등)
+- 동일한 의미의 쿼리는 중복하지 말 것.
+- explicit 허용이 false이면, 가급적 "clean" 또는 "non explicit" 성격을 암시하는 키워드를 1~2개 섞어라(단 과도하게 반복 금지).
+
+[반드시 출력할 JSON 스키마]
+{
+  "mood_summary": "...",
+  "keywords": ["..."],
+  "seed_genres": ["pop", "k-pop"],
+  "search_queries": ["..."],
+  "playlist_theme": "...",
+  "reason": "..."
+}
+
+추가 조건:
+- mood_summary, playlist_theme, reason은 자연스러운 한국어로.
+- keywords는 5~10개. (한국어 중심 + 필요 시 영어 1~3개)
+""".strip()
+
+
+def build_strategy_prompt(
+    mood_text: str,
+    context_text: str,
+    preferred_genres: List[str],
+    energy: int,
+    tone: str,
+    market: str,
+    allow_explicit: bool,
+    n_tracks: int,
+) -> str:
+    """
+    요청마다 바뀌는 사용자 입력 블록만 만든다 (user 메시지, system 접두부 뒤에 붙음).
+    규칙/스키마는 STRATEGY_SYSTEM_PROMPT 참고.
+    """
+    preferred = preferred_genres if preferred_genres else ["(없음)"]
+
+    return f"""
+[사용자 입력]
+- 오늘의 기분: {mood_text}
+- 현재 상황/활동: {context_text}
+- 선호 장르(선택): {preferred}
+- 에너지 레벨(1~10): {energy}
+- 감정 톤: {tone}
+- market: {market}
+- explicit 허용: {allow_explicit}
+- 목표 곡 수: {n_tracks}
+""".strip()